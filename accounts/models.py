@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import RegexValidator
+from platformb.media import FileCleanupMixin
+from platformb.utils import save_with_unique_value
 
 class User(AbstractUser):
     """
@@ -50,17 +52,19 @@ class User(AbstractUser):
         return f"{self.username} ({self.email})"
 
     def save(self, *args, **kwargs):
-        if not self.username:
-            base_username = self.email.split('@')[0]
-            username = base_username
-            counter = 1
-            while User.objects.filter(username=username).exists():
-                username = f"{base_username}{counter}"
-                counter += 1
+        if self.username:
+            return super().save(*args, **kwargs)
+
+        parent_save = super().save
+
+        def save_with_username(username):
             self.username = username
-        super().save(*args, **kwargs)
+            parent_save(*args, **kwargs)
+
+        base_username = self.email.split('@')[0]
+        save_with_unique_value(User.objects.all(), 'username', base_username, save_with_username, separator='')
 
-class UserProfile(models.Model):
+class UserProfile(FileCleanupMixin, models.Model):
     """
     Extended profile information for users
     """
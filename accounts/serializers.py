@@ -2,6 +2,7 @@ from rest_framework import serializers
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
 from django.db import transaction
+from platformb.utils import save_with_unique_value
 from .models import User, UserProfile
 
 class UserProfileSerializer(serializers.ModelSerializer):
@@ -63,20 +64,14 @@ class UserCreateSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         validated_data.pop('password_confirm', None)
         
-        # Generate username
-        email = validated_data['email']
-        base_username = email.split('@')[0]
-        username = base_username
-        counter = 1
-        while User.objects.filter(username=username).exists():
-            username = f"{base_username}{counter}"
-            counter += 1
-        validated_data['username'] = username
-        
-        # Create user (UserProfile will be created automatically by signal)
-        user = User.objects.create_user(**validated_data)
-        
-        return user
+        # Generate a unique username from the email and create the user
+        # (UserProfile will be created automatically by signal)
+        base_username = validated_data['email'].split('@')[0]
+        return save_with_unique_value(
+            User.objects.all(), 'username', base_username,
+            lambda username: User.objects.create_user(username=username, **validated_data),
+            separator=''
+        )
 
 class UserUpdateSerializer(serializers.ModelSerializer):
     profile = UserProfileSerializer(required=False)
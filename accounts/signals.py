@@ -1,7 +1,10 @@
 from django.db.models.signals import post_save
 from django.dispatch import receiver
+from platformb.media import connect_file_cleanup
 from .models import User, UserProfile
 
+connect_file_cleanup(UserProfile)
+
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
     """Create UserProfile when a User is created"""
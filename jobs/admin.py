@@ -0,0 +1,15 @@
+from django.contrib import admin
+from unfold.admin import ModelAdmin
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(ModelAdmin):
+    list_display = ['task', 'queue', 'status', 'attempts', 'run_at', 'wait_time', 'run_time', 'finished_at']
+    list_filter = ['status', 'queue', 'task']
+    search_fields = ['task', 'last_error']
+    ordering = ['-id']
+    readonly_fields = [
+        'task', 'kwargs', 'queue', 'attempts', 'locked_by', 'locked_at', 'last_error',
+        'created_at', 'finished_at', 'wait_time', 'run_time',
+    ]
@@ -0,0 +1,49 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.db.models import Avg, Count, Max, Q
+from django.utils import timezone
+
+from jobs.models import Job
+
+
+def _seconds(value):
+    return '-' if value is None else f'{value:.3f}'
+
+
+class Command(BaseCommand):
+    help = 'Show per-task job counts and timings'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours', type=float, default=24,
+            help='Only include jobs created in the last N hours (default: 24)'
+        )
+
+    def handle(self, *args, **options):
+        since = timezone.now() - datetime.timedelta(hours=options['hours'])
+        rows = (
+            Job.objects.filter(created_at__gte=since)
+            .values('task')
+            .annotate(
+                queued=Count('id', filter=Q(status=Job.QUEUED)),
+                running=Count('id', filter=Q(status=Job.RUNNING)),
+                succeeded=Count('id', filter=Q(status=Job.SUCCEEDED)),
+                failed=Count('id', filter=Q(status=Job.FAILED)),
+                avg_run=Avg('run_time'),
+                max_run=Max('run_time'),
+                avg_wait=Avg('wait_time'),
+                max_wait=Max('wait_time'),
+            )
+            .order_by('task')
+        )
+        self.stdout.write(
+            f'{"task":<50} {"queued":>7} {"running":>7} {"ok":>7} {"failed":>7} '
+            f'{"avg run":>9} {"max run":>9} {"avg wait":>9} {"max wait":>9}'
+        )
+        for row in rows:
+            self.stdout.write(
+                f'{row["task"]:<50} {row["queued"]:>7} {row["running"]:>7} {row["succeeded"]:>7} {row["failed"]:>7} '
+                f'{_seconds(row["avg_run"]):>9} {_seconds(row["max_run"]):>9} '
+                f'{_seconds(row["avg_wait"]):>9} {_seconds(row["max_wait"]):>9}'
+            )
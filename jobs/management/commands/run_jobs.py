@@ -0,0 +1,47 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from jobs.worker import POOLS, Worker
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs until stopped (SIGINT/SIGTERM finishes the running jobs first)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--queue', action='append', dest='queues', default=None,
+            help='Only run jobs of this queue (repeatable; default: all queues)'
+        )
+        parser.add_argument(
+            '--pool', choices=POOLS, default=None,
+            help='Run jobs of queues without a JOBS_QUEUE_POOLS entry in threads or processes (default: JOBS_POOL)'
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=None,
+            help='Jobs run at the same time (default: JOBS_CONCURRENCY)'
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=None,
+            help='Seconds between checks for new jobs when idle (default: JOBS_POLL_INTERVAL)'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Exit once no job is due instead of waiting for more'
+        )
+
+    def handle(self, *args, **options):
+        worker = Worker(
+            queues=options['queues'],
+            pool=options['pool'],
+            concurrency=options['concurrency'],
+            poll_interval=options['poll_interval'],
+        )
+        signal.signal(signal.SIGINT, worker.stop)
+        signal.signal(signal.SIGTERM, worker.stop)
+        queue_pools = ''.join(f', {kind} pool for {queue!r}' for queue, kind in worker.queue_pools.items())
+        self.stdout.write(f'Worker {worker.worker_id}: {worker.pool_kind} pool of {worker.concurrency}{queue_pools}')
+        stats = worker.run(once=options['once'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{stats["succeeded"]} job(s) succeeded, {stats["retried"]} retried, {stats["failed"]} failed'
+        ))
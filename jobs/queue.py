@@ -0,0 +1,159 @@
+"""
+Database-backed job queue.
+
+Tasks are module-level functions decorated with @task. ``func.enqueue(**kwargs)``
+(or ``func.enqueue_many([kwargs, ...])`` for a batch) inserts Job rows in the
+current transaction, so a job exists exactly when the change that caused it
+is committed, and the request only pays for the insert. Keyword arguments must be JSON serializable (ids, not instances).
+
+``manage.py run_jobs`` workers (jobs.worker) claim due jobs with
+``SELECT ... FOR UPDATE SKIP LOCKED``, or a conditional UPDATE on databases
+without it (SQLite), and run them in a thread or process pool (per queue,
+JOBS_QUEUE_POOLS). Nothing runs jobs unless such a worker is running. A failed job
+is retried after an exponential backoff until it has had max_attempts, then
+kept as failed with its traceback. Every attempt records how long the job
+waited past its run_at and how long it ran.
+"""
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+
+def get_max_attempts():
+    return getattr(settings, 'JOBS_MAX_ATTEMPTS', 3)
+
+
+def retry_delay(attempts):
+    """Seconds before retrying a job that failed its `attempts`-th attempt"""
+    base = getattr(settings, 'JOBS_RETRY_DELAY', 10)
+    return min(base * 2 ** (attempts - 1), getattr(settings, 'JOBS_RETRY_MAX_DELAY', 60 * 60))
+
+
+def task(func=None, *, queue='default', max_attempts=None):
+    """Make a function runnable as a job: ``func.enqueue(**kwargs)``"""
+    def decorate(func):
+        def enqueue_task(delay=0, **kwargs):
+            """Queue a call with `kwargs`, to run no earlier than `delay` seconds from now"""
+            return enqueue(func.task_path, kwargs, queue=queue, delay=delay, max_attempts=max_attempts)
+
+        def enqueue_many(kwargs_list, delay=0):
+            """Queue one call per kwargs dict with a single insert"""
+            return enqueue_batch(func.task_path, kwargs_list, queue=queue, delay=delay, max_attempts=max_attempts)
+
+        func.task_path = f'{func.__module__}.{func.__qualname__}'
+        func.enqueue = enqueue_task
+        func.enqueue_many = enqueue_many
+        return func
+    return decorate(func) if func is not None else decorate
+
+
+def enqueue(task_path, kwargs=None, queue='default', delay=0, max_attempts=None):
+    return Job.objects.create(
+        task=task_path,
+        kwargs=kwargs or {},
+        queue=queue,
+        run_at=timezone.now() + timedelta(seconds=delay),
+        max_attempts=max_attempts or get_max_attempts(),
+    )
+
+
+def enqueue_batch(task_path, kwargs_list, queue='default', delay=0, max_attempts=None):
+    run_at = timezone.now() + timedelta(seconds=delay)
+    return Job.objects.bulk_create([
+        Job(
+            task=task_path,
+            kwargs=kwargs,
+            queue=queue,
+            run_at=run_at,
+            max_attempts=max_attempts or get_max_attempts(),
+        )
+        for kwargs in kwargs_list
+    ])
+
+
+def resolve_task(task_path):
+    func = import_string(task_path)
+    if getattr(func, 'task_path', None) != task_path:
+        raise ImportError(f'{task_path} is not a @task function')
+    return func
+
+
+def claim_jobs(worker_id, limit, queues=None):
+    """Mark up to `limit` due jobs as running for `worker_id` and return them"""
+    if limit <= 0:
+        return []
+    now = timezone.now()
+    due = Job.objects.filter(status=Job.QUEUED, run_at__lte=now).order_by('run_at', 'id')
+    if queues:
+        due = due.filter(queue__in=queues)
+    claim = {'status': Job.RUNNING, 'locked_by': worker_id, 'locked_at': now, 'attempts': F('attempts') + 1}
+    with transaction.atomic(using=due.db):
+        if connections[due.db].features.has_select_for_update_skip_locked:
+            # Rows locked by other workers are skipped rather than waited for
+            ids = list(due.select_for_update(skip_locked=True).values_list('pk', flat=True)[:limit])
+            Job.objects.filter(pk__in=ids).update(**claim)
+        else:
+            # No row locks (SQLite serializes writes): claim those still queued
+            ids = list(due.values_list('pk', flat=True)[:limit])
+            Job.objects.filter(pk__in=ids, status=Job.QUEUED).update(**claim)
+        return list(Job.objects.filter(pk__in=ids, status=Job.RUNNING, locked_by=worker_id, locked_at=now))
+
+
+def run_task(task_path, kwargs):
+    """
+    Run one job in a pool worker. Returns (run time in seconds, traceback or
+    None); the traceback is formatted here because it does not survive
+    process pools.
+    """
+    close_old_connections()
+    started = time.monotonic()
+    error = None
+    try:
+        resolve_task(task_path)(**kwargs)
+    except Exception:
+        error = traceback.format_exc()
+    finally:
+        close_old_connections()
+    return time.monotonic() - started, error
+
+
+def record_result(job, worker_id, run_time, error):
+    """Store the outcome of an attempt; a job reclaimed from this worker meanwhile is left alone"""
+    now = timezone.now()
+    fields = {
+        'locked_by': '',
+        'locked_at': None,
+        'run_time': run_time,
+        'wait_time': max(0.0, (job.locked_at - job.run_at).total_seconds()),
+    }
+    mine = Job.objects.filter(pk=job.pk, status=Job.RUNNING, locked_by=worker_id)
+    if error is None:
+        return mine.update(status=Job.SUCCEEDED, finished_at=now, last_error='', **fields)
+    if job.attempts < job.max_attempts:
+        return mine.update(
+            status=Job.QUEUED, run_at=now + timedelta(seconds=retry_delay(job.attempts)), last_error=error, **fields
+        )
+    return mine.update(status=Job.FAILED, finished_at=now, last_error=error, **fields)
+
+
+def requeue_stale_jobs(timeout):
+    """
+    Jobs running for more than `timeout` seconds belong to a worker that died;
+    count the attempt as failed and retry them (or give up).
+    """
+    now = timezone.now()
+    stale = Job.objects.filter(status=Job.RUNNING, locked_at__lt=now - timedelta(seconds=timeout))
+    error = f'Worker stopped responding (no result after {timeout} seconds)'
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, finished_at=now, last_error=error, locked_by='', locked_at=None
+    )
+    retried = stale.update(status=Job.QUEUED, run_at=now, last_error=error, locked_by='', locked_at=None)
+    return retried + failed
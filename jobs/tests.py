@@ -0,0 +1,131 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from unittest import mock
+
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.utils import timezone
+
+from .models import Job
+from .queue import claim_jobs, requeue_stale_jobs, task
+from .worker import Worker
+
+CALLS = []
+
+
+@task
+def record_call(value):
+    CALLS.append(value)
+
+
+@task(queue='images', max_attempts=2)
+def fail():
+    raise ValueError('broken')
+
+
+def thread_pool(kind, size):
+    return ThreadPoolExecutor(max_workers=size)
+
+
+@override_settings(JOBS_RETRY_DELAY=10)
+class JobQueueTests(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def run_worker(self, **kwargs):
+        return Worker(pool='thread', poll_interval=0.01, **kwargs).run(once=True)
+
+    def test_enqueued_jobs_run(self):
+        record_call.enqueue(value=1)
+        record_call.enqueue_many([{'value': 2}, {'value': 3}])
+        record_call.enqueue(delay=60, value=4)
+
+        self.assertEqual(self.run_worker(), {'succeeded': 3, 'retried': 0, 'failed': 0})
+        self.assertEqual(sorted(CALLS), [1, 2, 3])
+        self.assertEqual(Job.objects.filter(status=Job.SUCCEEDED).count(), 3)
+        self.assertEqual(Job.objects.get(status=Job.QUEUED).kwargs, {'value': 4})
+
+    def test_failed_job_is_retried_then_kept(self):
+        job = fail.enqueue()
+        with mock.patch('jobs.worker.make_pool', thread_pool), self.assertLogs('jobs.worker', 'WARNING'):
+            self.assertEqual(self.run_worker()['retried'], 1)
+            job.refresh_from_db()
+            self.assertEqual(job.status, Job.QUEUED)
+            self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=5))
+
+            Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+            self.assertEqual(self.run_worker()['failed'], 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+        self.assertIn('ValueError: broken', job.last_error)
+
+    @override_settings(JOBS_QUEUE_POOLS={'images': 'process'})
+    def test_jobs_run_in_the_pool_of_their_queue(self):
+        kinds = []
+
+        def make_pool(kind, size):
+            kinds.append(kind)
+            return thread_pool(kind, size)
+
+        record_call.enqueue(value=1)
+        fail.enqueue()
+        with mock.patch('jobs.worker.make_pool', make_pool), self.assertLogs('jobs.worker', 'WARNING'):
+            self.run_worker()
+        self.assertEqual(sorted(kinds), ['process', 'thread'])
+
+    def test_claimed_jobs_are_not_claimed_again(self):
+        record_call.enqueue_many([{'value': value} for value in range(3)])
+        first = claim_jobs('worker-a', 2)
+        second = claim_jobs('worker-b', 2)
+        self.assertEqual(len(first), 2)
+        self.assertEqual(len(second), 1)
+        self.assertFalse({job.pk for job in first} & {job.pk for job in second})
+        self.assertEqual(claim_jobs('worker-c', 2), [])
+
+    def test_claim_by_queue(self):
+        record_call.enqueue(value=1)
+        fail.enqueue()
+        [job] = claim_jobs('worker-a', 5, queues=['images'])
+        self.assertEqual(job.task, fail.task_path)
+
+    def test_stale_jobs_are_requeued(self):
+        now = timezone.now()
+        stale = record_call.enqueue(value=1)
+        exhausted = record_call.enqueue(value=2)
+        fresh = record_call.enqueue(value=3)
+        Job.objects.filter(pk=stale.pk).update(status=Job.RUNNING, attempts=1, locked_at=now - timedelta(hours=1))
+        Job.objects.filter(pk=exhausted.pk).update(status=Job.RUNNING, attempts=3, locked_at=now - timedelta(hours=1))
+        Job.objects.filter(pk=fresh.pk).update(status=Job.RUNNING, attempts=1, locked_at=now)
+
+        self.assertEqual(requeue_stale_jobs(60 * 30), 2)
+        statuses = dict(Job.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses, {stale.pk: Job.QUEUED, exhausted.pk: Job.FAILED, fresh.pk: Job.RUNNING})
+
+
+@skipUnlessDBFeature('has_select_for_update_skip_locked')
+class SkipLockedClaimTests(TransactionTestCase):
+    def test_rows_locked_by_another_worker_are_skipped(self):
+        record_call.enqueue_many([{'value': value} for value in range(2)])
+        locked, release = threading.Event(), threading.Event()
+        held = []
+
+        def hold_first_job():
+            try:
+                with transaction.atomic():
+                    held.extend(Job.objects.select_for_update().order_by('run_at', 'id').values_list('pk', flat=True)[:1])
+                    locked.set()
+                    release.wait(5)
+            finally:
+                connection.close()
+
+        holder = threading.Thread(target=hold_first_job)
+        holder.start()
+        try:
+            self.assertTrue(locked.wait(5))
+            claimed = claim_jobs('worker-a', 2)
+        finally:
+            release.set()
+            holder.join()
+        self.assertEqual(len(claimed), 1)
+        self.assertNotIn(claimed[0].pk, held)
@@ -0,0 +1,117 @@
+"""
+The loop of a ``manage.py run_jobs`` worker (see jobs.queue).
+
+The worker claims no more jobs than it has free slots, so jobs it can't
+start yet stay available to other workers. Jobs run in the pool of their
+queue's kind (JOBS_QUEUE_POOLS, e.g. processes for CPU-bound image
+rendering, which threads would serialize on the GIL), else of JOBS_POOL. Stopping (SIGINT/SIGTERM)
+claims nothing more and waits for the jobs already running.
+"""
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+import django
+from django.conf import settings
+from django.db import close_old_connections
+
+from .queue import claim_jobs, record_result, requeue_stale_jobs, run_task
+
+logger = logging.getLogger(__name__)
+
+POOLS = ('thread', 'process')
+
+
+def get_queue_pools():
+    return getattr(settings, 'JOBS_QUEUE_POOLS', {})
+
+
+def make_pool(kind, size):
+    if kind == 'process':
+        # Spawned rather than forked: children must not share the parent's database connections
+        return ProcessPoolExecutor(
+            max_workers=size, mp_context=multiprocessing.get_context('spawn'), initializer=django.setup
+        )
+    return ThreadPoolExecutor(max_workers=size, thread_name_prefix='job')
+
+
+class Worker:
+    def __init__(self, queues=None, pool=None, concurrency=None, poll_interval=None, stale_timeout=None):
+        self.queues = queues or None
+        self.pool_kind = pool or getattr(settings, 'JOBS_POOL', 'thread')
+        self.queue_pools = get_queue_pools()
+        self.concurrency = concurrency or getattr(settings, 'JOBS_CONCURRENCY', 4)
+        self.poll_interval = poll_interval or getattr(settings, 'JOBS_POLL_INTERVAL', 1.0)
+        self.stale_timeout = stale_timeout or getattr(settings, 'JOBS_STALE_TIMEOUT', 60 * 30)
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self.stats = {'succeeded': 0, 'retried': 0, 'failed': 0}
+        self._stop = threading.Event()
+
+    def pool_kind_for(self, queue):
+        return self.queue_pools.get(queue, self.pool_kind)
+
+    def stop(self, *args):
+        self._stop.set()
+
+    def run(self, once=False):
+        """Run jobs until stopped, or with `once` until no job is due"""
+        # Created on first use; each may run every slot
+        pools = {}
+        running = {}
+        next_stale_check = 0
+        try:
+            while not self._stop.is_set():
+                if time.monotonic() >= next_stale_check:
+                    requeue_stale_jobs(self.stale_timeout)
+                    next_stale_check = time.monotonic() + min(self.stale_timeout, 60)
+                for job in claim_jobs(self.worker_id, self.concurrency - len(running), self.queues):
+                    kind = self.pool_kind_for(job.queue)
+                    if kind not in pools:
+                        pools[kind] = make_pool(kind, self.concurrency)
+                    running[pools[kind].submit(run_task, job.task, job.kwargs)] = job
+                if not running:
+                    close_old_connections()
+                    if once:
+                        break
+                    self._stop.wait(self.poll_interval)
+                    continue
+                done, _ = wait(running, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                for future in done:
+                    self.finish(running.pop(future), future)
+            for future in wait(running).done:
+                self.finish(running.pop(future), future)
+        finally:
+            for pool in pools.values():
+                pool.shutdown(wait=True)
+            close_old_connections()
+        return self.stats
+
+    def finish(self, job, future):
+        try:
+            run_time, error = future.result()
+        except Exception:
+            # The pool itself failed (e.g. a worker process died)
+            run_time, error = None, traceback.format_exc()
+        record_result(job, self.worker_id, run_time, error)
+        if error is None:
+            outcome = 'succeeded'
+        elif job.attempts < job.max_attempts:
+            outcome = 'retried'
+        else:
+            outcome = 'failed'
+        self.stats[outcome] += 1
+        ran = f'{run_time:.3f}s' if run_time is not None else 'an unknown time'
+        if error is None:
+            waited = max(0.0, (job.locked_at - job.run_at).total_seconds())
+            logger.info('Job %s (%s) succeeded in %s, waited %.3fs', job.pk, job.task, ran, waited)
+        else:
+            logger.warning(
+                'Job %s (%s) %s on attempt %s/%s after %s:\n%s',
+                job.pk, job.task, outcome, job.attempts, job.max_attempts, ran, error
+            )
@@ -0,0 +1,314 @@
+"""
+Deferred deletion of uploaded media files.
+
+Deleting or replacing a row with FileFields must not block the request on
+filesystem (or remote storage) I/O, and must not remove a file whose row
+survives because the transaction rolled back. Files are therefore queued with
+transaction.on_commit() and removed by a background thread that drains the
+queue in batches through the field's storage.
+
+Models opt in with FileCleanupMixin, which remembers the file names a row was
+loaded with, and connect_file_cleanup(), which hooks post_save (replaced
+files) and post_delete (deleted rows). Files queued when a process exits are
+left behind; the orphaned-media collector picks those up.
+
+Storages may share one stored file between rows (content-addressed storage).
+They implement retain(names) / release(names), which these hooks call as rows
+gain and drop files, and decline to delete files that are still referenced.
+
+Models listing MEDIA_METADATA_FIELDS ({file attname: JSON field}) also store
+the size, MIME type, SHA-256 and image dimensions of their files, recorded by
+record_file_metadata() when a file is uploaded or replaced. Files stored by
+another tier (direct uploads) carry the metadata measured there as
+``known_metadata``, so it is not read again.
+"""
+import atexit
+import hashlib
+import logging
+import mimetypes
+import os
+import queue
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import FileField
+from django.db.models.signals import post_delete, post_save
+
+try:
+    from PIL import Image, UnidentifiedImageError
+except ImportError:  # pragma: no cover - Pillow is an optional dependency
+    Image = UnidentifiedImageError = None
+
+logger = logging.getLogger(__name__)
+
+
+def get_batch_size():
+    return getattr(settings, 'MEDIA_CLEANUP_BATCH_SIZE', 100)
+
+
+class MediaCleanupWorker:
+    """Daemon thread deleting queued (storage, name) pairs in batches"""
+
+    def __init__(self, batch_size=None):
+        self.batch_size = batch_size or get_batch_size()
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='media-cleanup', daemon=True)
+                self._thread.start()
+
+    def enqueue(self, files):
+        for item in files:
+            self._queue.put(item)
+        self._ensure_started()
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                delete_files(batch)
+            finally:
+                # Storages may query the database to decide what to delete
+                close_old_connections()
+                for _ in batch:
+                    self._queue.task_done()
+
+    def flush(self):
+        """Block until everything queued so far has been deleted"""
+        self._queue.join()
+
+    def drain(self):
+        """Delete whatever is still queued in the calling thread (process shutdown)"""
+        while True:
+            try:
+                batch = [self._queue.get_nowait()]
+            except queue.Empty:
+                return
+            try:
+                delete_files(batch)
+            finally:
+                self._queue.task_done()
+
+
+def delete_files(files):
+    for storage, name in files:
+        try:
+            storage.delete(name)
+        except Exception:
+            # A file that can't be removed now is reclaimed by the orphan collector
+            logger.warning('Could not delete media file %s', name, exc_info=True)
+
+
+cleanup_worker = MediaCleanupWorker()
+atexit.register(cleanup_worker.drain)
+
+
+def _by_storage(files):
+    grouped = {}
+    for file in files:
+        if file:
+            grouped.setdefault(file.storage, []).append(file.name)
+    return grouped.items()
+
+
+def retain_files(files):
+    """Count new references to `files` in storages that share files between rows"""
+    for storage, names in _by_storage(files):
+        if hasattr(storage, 'retain'):
+            storage.retain(names)
+
+
+def release_files(files):
+    """Drop references to `files`; call before delete_on_commit()"""
+    for storage, names in _by_storage(files):
+        if hasattr(storage, 'release'):
+            storage.release(names)
+
+
+def delete_on_commit(files):
+    """
+    Delete `files` (FieldFile instances) once the current transaction commits.
+    Nothing is deleted if it rolls back.
+    """
+    pending = {(file.storage, file.name) for file in files if file}
+    if pending:
+        transaction.on_commit(lambda: cleanup_worker.enqueue(pending))
+
+
+# EXIF orientations that rotate the image by 90 degrees
+EXIF_ORIENTATION = 0x0112
+TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}
+
+
+def image_dimensions(file):
+    """Displayed {width, height, content_type} of an image file; {} for other files or without Pillow"""
+    if Image is None:
+        return {}
+    try:
+        file.seek(0)
+        # Only the header is parsed; pixels are never decoded
+        with Image.open(file) as image:
+            width, height = image.size
+            if image.getexif().get(EXIF_ORIENTATION) in TRANSPOSED_ORIENTATIONS:
+                width, height = height, width
+            dimensions = {'width': width, 'height': height}
+            if Image.MIME.get(image.format):
+                dimensions['content_type'] = Image.MIME[image.format]
+            return dimensions
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, ValueError):
+        return {}
+
+
+def describe_file(file, name, size, digest):
+    """Metadata of a file whose size and SHA-256 are known; `file` is only read for image dimensions"""
+    metadata = {
+        # The name it was uploaded under, which content-addressed storage does not keep
+        'filename': os.path.basename(name),
+        'size': size,
+        'content_type': mimetypes.guess_type(name)[0] or 'application/octet-stream',
+        'sha256': digest,
+    }
+    metadata.update(image_dimensions(file))
+    return metadata
+
+
+def file_metadata(file):
+    """
+    Size, MIME type, SHA-256 and (for images) dimensions of a FieldFile, new
+    upload or stored file, read in chunks. Uploads hashed while they were
+    received are not hashed again.
+    """
+    uploaded = not file._committed
+    digest = getattr(file.file, 'sha256', None) if uploaded else None
+    file.open('rb')
+    try:
+        if digest is None:
+            sha256 = hashlib.sha256()
+            for chunk in file.chunks():
+                sha256.update(chunk)
+            digest = sha256.hexdigest()
+            if uploaded:
+                # Content-addressed storages name the file by it; don't hash twice
+                file.file.sha256 = digest
+        metadata = describe_file(file, file.name, file.size, digest)
+    finally:
+        if uploaded:
+            # Leave the upload ready to be written to storage
+            file.seek(0)
+        else:
+            file.close()
+    return metadata
+
+
+def record_file_metadata(instance, attnames=None):
+    """
+    Refresh the MEDIA_METADATA_FIELDS of `instance` whose file was uploaded,
+    replaced or cleared since it was loaded. Call before the row is written.
+    """
+    loaded = getattr(instance, '_loaded_files', {})
+    for attname, metadata_attname in instance.MEDIA_METADATA_FIELDS.items():
+        if attnames is not None and attname not in attnames:
+            continue
+        file = getattr(instance, attname)
+        if not file:
+            setattr(instance, metadata_attname, {})
+        elif not file._committed or file.name != loaded.get(attname):
+            if getattr(file, 'known_metadata', None) is not None:
+                setattr(instance, metadata_attname, file.known_metadata)
+                continue
+            try:
+                setattr(instance, metadata_attname, file_metadata(file))
+            except OSError:
+                logger.warning('Could not read media file %s', file.name, exc_info=True)
+                setattr(instance, metadata_attname, {})
+
+
+def file_fields(model):
+    return [field for field in model._meta.concrete_fields if isinstance(field, FileField)]
+
+
+class FileCleanupMixin:
+    """
+    Remembers the file names a row was loaded with, so saves can tell which
+    files were replaced.
+    """
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_files()
+        return instance
+
+    def _remember_files(self, attnames=None):
+        loaded = getattr(self, '_loaded_files', {})
+        for field in file_fields(type(self)):
+            if field.attname in self.__dict__ and (attnames is None or field.attname in attnames):
+                loaded[field.attname] = getattr(self, field.attname).name
+        self._loaded_files = loaded
+
+    def replaced_files(self, attnames=None):
+        """FieldFiles of the stored files that no longer belong to this row"""
+        replaced = []
+        for attname, name in getattr(self, '_loaded_files', {}).items():
+            if attnames is not None and attname not in attnames:
+                continue
+            current = getattr(self, attname)
+            if name and name != current.name:
+                replaced.append(current.field.attr_class(self, current.field, name))
+        return replaced
+
+    def added_files(self, attnames=None):
+        """FieldFiles this row references that it was not loaded with (all of them for a new row)"""
+        loaded = getattr(self, '_loaded_files', {})
+        added = []
+        for field in file_fields(type(self)):
+            if attnames is not None and field.attname not in attnames:
+                continue
+            current = getattr(self, field.attname)
+            if current and current.name != loaded.get(field.attname):
+                added.append(current)
+        return added
+
+    def track_file_changes(self, attnames=None):
+        """
+        After the row was written: count references to its new files, release
+        and delete the replaced ones once committed.
+        """
+        replaced = self.replaced_files(attnames)
+        retain_files(self.added_files(attnames))
+        release_files(replaced)
+        delete_on_commit(replaced)
+        self._remember_files(attnames)
+
+
+def delete_replaced_files(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    # Fields left out of update_fields still hold their stored file
+    instance.track_file_changes(update_fields)
+
+
+def delete_row_files(sender, instance, **kwargs):
+    files = [getattr(instance, field.attname) for field in file_fields(sender)]
+    release_files(files)
+    delete_on_commit(files)
+
+
+def connect_file_cleanup(*models):
+    """Remove the files of `models` when rows are deleted or their files replaced"""
+    for model in models:
+        post_save.connect(delete_replaced_files, sender=model, dispatch_uid=f'delete_replaced_files:{model._meta.label}')
+        post_delete.connect(delete_row_files, sender=model, dispatch_uid=f'delete_row_files:{model._meta.label}')
@@ -36,6 +36,7 @@ INSTALLED_APPS = [
     'tinymce',
     'projects',
     'accounts',
+    'jobs',
     'corsheaders',
 ]
 
@@ -93,8 +94,98 @@ DATABASES = {
         "PORT": "",
     }
 }
- 
-DATA_UPLOAD_MAX_MEMORY_SIZE = None
+
+# A cache shared by every process (web workers, `run_jobs` workers, management
+# commands) is required: the project payload cache and its version tokens
+# (projects.cache) live here, and a per-process cache such as LocMemCache would
+# only see the invalidations of its own process. With a per-process cache the
+# payload cache and the ETags of project resources (projects.conditional) are
+# disabled (system check projects.W001). REDIS_URL sets its location; while it
+# cannot be reached the payload cache and ETags are bypassed.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.environ.get("REDIS_URL", "redis://127.0.0.1:6379/1"),
+    }
+}
+
+# Non-file form fields and JSON bodies are held in memory; files are streamed
+# to disk by projects.uploads.LimitedTemporaryFileUploadHandler.
+DATA_UPLOAD_MAX_MEMORY_SIZE = 25 * 1024 * 1024  # 25 MB
+
+# Upload limits (bytes) enforced while multipart bodies are read; None disables a limit
+UPLOAD_MAX_REQUEST_SIZE = 1024 * 1024 * 1024  # 1 GB per request
+UPLOAD_MAX_FILE_SIZE = 200 * 1024 * 1024  # 200 MB per file (site plans, document PDFs)
+UPLOAD_MAX_FIELD_SIZES = {
+    # Matched by field name prefix, e.g. "lots" covers "lots[3].lot_rendering"
+    'uploaded_images': 25 * 1024 * 1024,
+    'uploaded_features_finishes': 25 * 1024 * 1024,
+    'image': 25 * 1024 * 1024,
+    'lots': 25 * 1024 * 1024,
+    'lot_rendering': 25 * 1024 * 1024,
+}
+
+# Direct-to-storage uploads (projects.direct_uploads): upload URLs and unfinalized
+# uploads expire after DIRECT_UPLOAD_EXPIRY seconds. DIRECT_UPLOAD_ENDPOINT is the
+# base URL of separate upload hosts; None uses the local stand-in under /api/uploads/target/.
+DIRECT_UPLOAD_EXPIRY = 60 * 60
+DIRECT_UPLOAD_ENDPOINT = None
+# Resumable chunked uploads (projects.resumable_uploads): part files are kept in
+# CHUNKED_UPLOAD_DIR (shared by all workers) until complete or idle for CHUNKED_UPLOAD_EXPIRY seconds
+CHUNKED_UPLOAD_DIR = os.path.join(BASE_DIR, '.chunked_uploads')
+CHUNKED_UPLOAD_EXPIRY = 60 * 60 * 24
+CHUNKED_UPLOAD_MAX_CHUNK_SIZE = 16 * 1024 * 1024
+
+# Background jobs (jobs.queue), run by `manage.py run_jobs`. At least one worker
+# must be running (e.g. a separate systemd service next to the web server):
+# image variants and inquiry emails are only produced by it.
+JOBS_POOL = 'thread'  # default pool; or 'process'
+# Pool per queue: CPU-bound image rendering runs in processes, off the GIL of I/O-bound jobs
+JOBS_QUEUE_POOLS = {'images': 'process'}
+JOBS_CONCURRENCY = 4
+JOBS_POLL_INTERVAL = 1.0  # seconds between checks for due jobs when idle
+JOBS_MAX_ATTEMPTS = 3
+# Retries wait JOBS_RETRY_DELAY * 2^(attempt - 1) seconds, at most JOBS_RETRY_MAX_DELAY
+JOBS_RETRY_DELAY = 10
+JOBS_RETRY_MAX_DELAY = 60 * 60
+# Jobs running longer than this are assumed lost with their worker and retried
+JOBS_STALE_TIMEOUT = 60 * 30
+JOBS_RETENTION_DAYS = 14
+
+# Email new inquiries to the project's contacts (a background job). Needs the
+# EMAIL_* settings of an SMTP server, which are not configured here.
+INQUIRY_NOTIFICATIONS = False
+INQUIRY_NOTIFICATION_FROM_EMAIL = None  # None uses DEFAULT_FROM_EMAIL
+
+# Public inquiries can be appended to a local buffer file and written to the
+# database in batches (projects.inquiry_buffer); `manage.py flush_inquiries`
+# stores what a killed process left behind. Off by default: buffered inquiries
+# are answered 202 without the id and created_at of the usual 201 response.
+INQUIRY_BUFFER_ENABLED = False
+INQUIRY_BUFFER_DIR = os.path.join(BASE_DIR, '.inquiry_buffer')
+INQUIRY_BUFFER_FSYNC = True  # each inquiry is on disk before the response
+INQUIRY_BUFFER_BATCH_SIZE = 500
+INQUIRY_BUFFER_FLUSH_INTERVAL = 2.0  # seconds
+INQUIRY_DEDUP_WINDOW = 60 * 10  # buffered repeats of an inquiry within one window are stored once; 0 disables
+
+# Streaming CSV/NDJSON exports (projects.exports): rows fetched and sent per chunk
+EXPORT_CHUNK_SIZE = 2000
+
+# Public project detail payloads are cached in the (shared) default cache, versioned
+# and invalidated by projects.signals; the timeout only bounds memory use
+PROJECT_DETAIL_CACHE_TIMEOUT = 60 * 60  # 1 hour
+
+# Delta sync feed (/api/sync/changes/)
+SYNC_PAGE_SIZE = 500  # rows per record type per response
+SYNC_SETTLE_SECONDS = 5  # rows are served once older than this (commit latency, clock skew between hosts)
+SYNC_TOMBSTONE_RETENTION_DAYS = 90  # older cursors must start a full sync; see prune_deleted_records
+
+# Live availability streams (projects.events), served through platformb.asgi.
+# The in-process broadcaster only reaches subscribers of the worker that made the change.
+PROJECT_EVENTS_BROADCASTER = 'projects.events.InProcessBroadcaster'
+PROJECT_EVENTS_MAX_SUBSCRIBERS = 10000  # per process
+PROJECT_EVENTS_QUEUE_SIZE = 100  # undelivered events per subscriber before it is told to resync
+PROJECT_EVENTS_HEARTBEAT_SECONDS = 15
 
 
 # Password validation
@@ -137,6 +228,33 @@ STATIC_ROOT = Path(BASE_DIR, "static/")
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Files removed per batch by the post-commit media cleanup worker (platformb.media)
+MEDIA_CLEANUP_BATCH_SIZE = 100
+# Progress file of the collect_orphaned_media command, so interrupted scans resume
+MEDIA_GC_CHECKPOINT_FILE = os.path.join(BASE_DIR, '.media_gc_checkpoint.json')
+# Shared blobs (projects.storage) are kept this long after being stored for a new
+# row, so they are not deleted before that row commits (seconds)
+MEDIA_BLOB_RESERVATION = 60 * 60 * 24
+# Resized rendering variants (projects.images), generated by background jobs
+# (Pillow is required; system check projects.W002 warns without it);
+# IMAGE_VARIANT_WORKERS processes render backfills
+IMAGE_VARIANT_WIDTHS = (320, 640, 1280)
+IMAGE_VARIANT_FORMATS = ('webp', 'jpeg')
+IMAGE_VARIANT_QUALITY = 80
+IMAGE_VARIANT_WORKERS = 2  # processes
+
+# Media serving (platformb.views.serve_media). Off unless DEBUG: in production the
+# web server serves MEDIA_ROOT, or set MEDIA_SERVE together with MEDIA_SENDFILE.
+# Content-addressed files are cached as immutable; others for MEDIA_CACHE_MAX_AGE seconds.
+# serve_media names downloads after their `?filename=` (the uploaded name); a web
+# server serving MEDIA_ROOT itself ignores it, and files are saved as <sha256>.<ext>.
+MEDIA_SERVE = DEBUG
+MEDIA_CACHE_MAX_AGE = 60 * 60
+MEDIA_IMMUTABLE_PREFIXES = ('blobs/', 'derivatives/blobs/')
+# Hand transfers to the front server: None, 'x-accel-redirect' (nginx, with an
+# internal location MEDIA_SENDFILE_PREFIX aliased to MEDIA_ROOT) or 'x-sendfile'
+MEDIA_SENDFILE = None
+MEDIA_SENDFILE_PREFIX = '/protected-media/'
 
 # CORS Settings for NextAuth
 CORS_ALLOW_ALL_ORIGINS = True
@@ -213,7 +331,7 @@ REST_FRAMEWORK = {
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'projects.pagination.StandardPageNumberPagination',
     'PAGE_SIZE': 10
 }
 
@@ -0,0 +1,50 @@
+import re
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+# How many times a save is retried when a concurrent writer takes the value first
+UNIQUE_VALUE_ATTEMPTS = 5
+
+
+def next_unique_value(queryset, field, base, separator='-'):
+    """
+    Return `base` if it is free, otherwise `base<separator>N` with the smallest
+    free N >= 1. All colliding values are fetched in a single query.
+    """
+    prefix = f'{base}{separator}'
+    taken = set(
+        queryset.filter(Q(**{field: base}) | Q(**{f'{field}__startswith': prefix}))
+        .values_list(field, flat=True)
+    )
+    if base not in taken:
+        return base
+
+    pattern = re.compile(rf'^{re.escape(prefix)}(\d+)$')
+    suffixes = set()
+    for value in taken:
+        match = pattern.match(value)
+        if match:
+            suffixes.add(int(match.group(1)))
+
+    counter = 1
+    while counter in suffixes:
+        counter += 1
+    return f'{prefix}{counter}'
+
+
+def save_with_unique_value(queryset, field, base, save, separator='-'):
+    """
+    Allocate a free value with next_unique_value() and pass it to `save`, which
+    must write the row. The write runs in a savepoint and is retried with a new
+    value if a concurrent insert claims the same one first.
+    """
+    for attempt in range(UNIQUE_VALUE_ATTEMPTS):
+        value = next_unique_value(queryset, field, base, separator)
+        try:
+            with transaction.atomic():
+                return save(value)
+        except IntegrityError:
+            # Only retry collisions on our field; re-raise any other constraint error
+            if attempt == UNIQUE_VALUE_ATTEMPTS - 1 or not queryset.filter(**{field: value}).exists():
+                raise
@@ -0,0 +1,162 @@
+"""
+Serving of uploaded media (MEDIA_URL).
+
+Unlike django.views.static.serve this answers conditional requests
+(If-None-Match / If-Modified-Since) with 304, serves single byte ranges with
+206 so large PDFs can be resumed and scrubbed, and marks content-addressed
+files as immutable. When MEDIA_SENDFILE is set the response only carries a
+header telling the front web server which file to send, so no worker is held
+for the transfer:
+
+* ``'x-accel-redirect'`` (nginx): ``X-Accel-Redirect: <MEDIA_SENDFILE_PREFIX><path>``,
+  with an ``internal`` location aliased to MEDIA_ROOT
+* ``'x-sendfile'`` (Apache mod_xsendfile, lighttpd): ``X-Sendfile: <absolute path>``
+
+A ``?filename=`` query (projects.storage.download_url) names the file in a
+Content-Disposition header, since content-addressed files are stored under
+their checksum.
+
+Media is only served when MEDIA_SERVE is set (by default, when DEBUG is);
+otherwise the front web server is expected to serve MEDIA_ROOT itself.
+"""
+import mimetypes
+import os
+import re
+import stat
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe, quote_etag
+from django.views.decorators.http import require_safe
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+# Content-addressed files never change under the same name
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+
+
+def serving_enabled():
+    return getattr(settings, 'MEDIA_SERVE', settings.DEBUG)
+
+
+def is_immutable(path):
+    return path.startswith(tuple(getattr(settings, 'MEDIA_IMMUTABLE_PREFIXES', ())))
+
+
+def parse_range(header, size):
+    """
+    (start, end) of a single `bytes=` range, inclusive, None to serve the whole
+    file (no, malformed or multi-part range) or False when unsatisfiable.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        return False
+    return start, end
+
+
+def iter_range(path, start, length):
+    with open(path, 'rb') as fh:
+        fh.seek(start)
+        while length > 0:
+            chunk = fh.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def download_filename(request):
+    """Name requested for the downloaded file, or ''"""
+    name = os.path.basename(request.GET.get('filename', '').replace('\\', '/'))
+    return ''.join(char for char in name if char.isprintable()).strip()
+
+
+def _offload(response, path, full_path):
+    backend = getattr(settings, 'MEDIA_SENDFILE', None)
+    if backend == 'x-accel-redirect':
+        prefix = getattr(settings, 'MEDIA_SENDFILE_PREFIX', '/protected-media/')
+        response['X-Accel-Redirect'] = quote(f'{prefix}{path}')
+    elif backend == 'x-sendfile':
+        response['X-Sendfile'] = full_path
+    else:
+        return False
+    return True
+
+
+@require_safe
+def serve_media(request, path):
+    if not serving_enabled():
+        raise Http404('File not found')
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        stat_result = os.stat(full_path)
+    except (ValueError, OSError):
+        raise Http404('File not found')
+    if not stat.S_ISREG(stat_result.st_mode):
+        raise Http404('File not found')
+
+    size = stat_result.st_size
+    last_modified = int(stat_result.st_mtime)
+    etag = quote_etag(f'{stat_result.st_mtime_ns:x}-{size:x}')
+    immutable = is_immutable(path)
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        content_type, encoding = mimetypes.guess_type(full_path)
+        content_type = content_type or 'application/octet-stream'
+
+        byte_range = None
+        if_range = request.headers.get('If-Range')
+        if if_range is None or if_range == etag or parse_http_date_safe(if_range) == last_modified:
+            byte_range = parse_range(request.headers.get('Range'), size)
+
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+        response = HttpResponse(content_type=content_type)
+        if not _offload(response, path, full_path):
+            # The front server handles ranges itself for offloaded files
+            if byte_range is not None:
+                start, end = byte_range
+                response = StreamingHttpResponse(
+                    iter_range(full_path, start, end - start + 1),
+                    status=206, content_type=content_type
+                )
+                response['Content-Range'] = f'bytes {start}-{end}/{size}'
+                response['Content-Length'] = str(end - start + 1)
+            else:
+                response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+        if encoding:
+            response['Content-Encoding'] = encoding
+        filename = download_filename(request)
+        if filename:
+            response['Content-Disposition'] = content_disposition_header(False, filename)
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    if immutable:
+        patch_cache_control(response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+    else:
+        patch_cache_control(response, public=True, max_age=getattr(settings, 'MEDIA_CACHE_MAX_AGE', 60 * 60))
+    return response
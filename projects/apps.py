@@ -6,4 +6,9 @@ class ProjectsConfig(AppConfig):
     name = 'projects'
     
     def ready(self):
-        import projects.signals
\ No newline at end of file
+        import projects.signals
+        from django.core import checks
+        from .cache import check_shared_cache
+        from .images import check_pillow
+        checks.register(check_shared_cache)
+        checks.register(check_pillow)
\ No newline at end of file
@@ -0,0 +1,295 @@
+"""
+Versioned response cache for project detail payloads.
+
+Every project has a content version token in the cache (keyed by slug), and
+there is one catalog-wide token for data shared by many projects (cities,
+states, amenities). A cached payload is stored together with the tokens that
+were current *before* it was built, and is only served while both still
+match. Writers bump tokens instead of deleting entries, so a request that read
+the database before a change can never re-publish stale data after it.
+
+Tokens are bumped from model signals (projects.signals) once the writing
+transaction commits. A lookup is a single ``get_many`` round trip for the
+payload and both tokens.
+
+Invalidation only works if every process (web workers, job workers, management
+commands) uses the same cache. With a per-process backend (LocMemCache) a
+change made by one process would leave the others serving stale payloads, so
+the payload cache (and conditional GET) is bypassed there and system check
+projects.W001 warns.
+
+The cache is an optimization, never a dependency: when it cannot be reached
+lookups are treated as bypassed (no payload cache, no validators) and the
+error is logged, so the views keep answering from the database.
+
+The same tokens double as HTTP validators (projects.conditional): a token
+records when it was issued, which gives Last-Modified, and a list token that
+changes with any project gives the validators of the project lists.
+"""
+import datetime
+import logging
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+try:
+    from redis.exceptions import RedisError
+except ImportError:  # pragma: no cover - only needed with the Redis backend
+    RedisError = OSError
+
+logger = logging.getLogger(__name__)
+
+# What a cache backend raises when its server is down or unreachable
+CACHE_ERRORS = (OSError, RedisError)
+
+KEY_PREFIX = 'projects'
+# Bump when ProjectSerializer's output changes shape so old entries are ignored
+PAYLOAD_VERSION = 5
+
+
+def get_cache_alias():
+    return getattr(settings, 'PROJECT_CACHE_ALIAS', 'default')
+
+
+def get_cache():
+    return caches[get_cache_alias()]
+
+
+def is_shared(cache):
+    """Whether entries written by one process are seen by the others"""
+    return not isinstance(cache, (LocMemCache, DummyCache))
+
+
+def check_shared_cache(app_configs, **kwargs):
+    if is_shared(get_cache()):
+        return []
+    return [
+        checks.Warning(
+            f'The {get_cache_alias()!r} cache is local to each process, so the project payload cache and ETags are disabled.',
+            hint='Configure a shared cache backend (Redis or Memcached) in CACHES.',
+            id='projects.W001',
+        )
+    ]
+
+
+def get_timeout():
+    return getattr(settings, 'PROJECT_DETAIL_CACHE_TIMEOUT', 60 * 60)
+
+
+# Version tokens outlive cached payloads; an expired token only costs one miss
+TOKEN_TIMEOUT = 60 * 60 * 24 * 30
+
+
+def _new_token():
+    return f'{time.time():.6f}-{uuid.uuid4().hex}'
+
+
+def token_time(token):
+    """When a version token was issued"""
+    try:
+        timestamp = float(token.split('-', 1)[0])
+    except (AttributeError, ValueError):
+        return None
+    return datetime.datetime.fromtimestamp(timestamp, tz=datetime.timezone.utc)
+
+
+def project_version_key(slug):
+    return f'{KEY_PREFIX}:version:{slug}'
+
+
+def catalog_version_key():
+    return f'{KEY_PREFIX}:catalog-version'
+
+
+def list_version_key():
+    return f'{KEY_PREFIX}:list-version'
+
+
+def detail_key(slug, variant=''):
+    return f'{KEY_PREFIX}:detail:{PAYLOAD_VERSION}:{slug}:{variant}'
+
+
+class CacheStats:
+    """
+    Hit/miss counters summed over all processes in the shared cache. Each
+    process adds its counts every FLUSH_INTERVAL seconds, so the totals can
+    lag other processes by that much.
+    """
+    FLUSH_INTERVAL = 5
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._pending = {'hits': 0, 'misses': 0}
+        self._flushed_at = time.monotonic()
+
+    def _key(self, counter):
+        return f'{KEY_PREFIX}:stats:{self.name}:{counter}'
+
+    def record(self, hit):
+        with self._lock:
+            self._pending['hits' if hit else 'misses'] += 1
+            due = time.monotonic() - self._flushed_at >= self.FLUSH_INTERVAL
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {'hits': 0, 'misses': 0}
+            self._flushed_at = time.monotonic()
+        cache = get_cache()
+        try:
+            for counter, count in pending.items():
+                if not count or cache.add(self._key(counter), count, None):
+                    continue
+                try:
+                    cache.incr(self._key(counter), count)
+                except ValueError:
+                    # Evicted since add()
+                    cache.add(self._key(counter), count, None)
+        except CACHE_ERRORS:
+            # The counts are dropped; they are only statistics
+            logger.warning('Could not flush %s cache stats', self.name, exc_info=True)
+
+    def reset(self):
+        with self._lock:
+            self._pending = {'hits': 0, 'misses': 0}
+        get_cache().delete_many([self._key('hits'), self._key('misses')])
+
+    def as_dict(self):
+        self.flush()
+        keys = self._key('hits'), self._key('misses')
+        found = get_cache().get_many(keys)
+        hits, misses = found.get(keys[0], 0), found.get(keys[1], 0)
+        lookups = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / lookups, 4) if lookups else None,
+        }
+
+
+detail_stats = CacheStats('detail')
+
+
+class CachedPayload:
+    """
+    Result of a detail cache lookup: the payload on a hit, the tokens to store
+    with on a miss. `tokens` is None when the cache is bypassed.
+    """
+
+    def __init__(self, slug, variant, data, tokens):
+        self.slug = slug
+        self.variant = variant
+        self.data = data
+        self.tokens = tokens
+
+    @property
+    def bypassed(self):
+        return self.tokens is None
+
+    @property
+    def hit(self):
+        return self.data is not None
+
+    @property
+    def version(self):
+        """Opaque content version of the project (changes whenever its payload does)"""
+        return '{}-{}-{}'.format(PAYLOAD_VERSION, *self.tokens)
+
+    def store(self, data):
+        if not self.bypassed:
+            try:
+                get_cache().set(detail_key(self.slug, self.variant), (self.tokens, data), get_timeout())
+            except CACHE_ERRORS:
+                logger.warning('Could not cache the payload of project %s', self.slug, exc_info=True)
+        self.data = data
+
+
+def _initial_token(cache, key):
+    token = _new_token()
+    # add() keeps a token another process has just created
+    if cache.add(key, token, TOKEN_TIMEOUT):
+        return token
+    return cache.get(key) or token
+
+
+def get_project_detail(slug, variant=''):
+    """
+    Look up the cached detail payload of a project. Missing tokens are
+    initialized so the payload built on a miss can be stored against them.
+    Always a miss, and nothing is stored, if the cache is not shared or cannot
+    be reached.
+    """
+    cache = get_cache()
+    if not is_shared(cache):
+        return CachedPayload(slug, variant, None, None)
+    entry_key, project_key, catalog_key = detail_key(slug, variant), project_version_key(slug), catalog_version_key()
+    try:
+        found = cache.get_many([entry_key, project_key, catalog_key])
+        tokens = (
+            found.get(project_key) or _initial_token(cache, project_key),
+            found.get(catalog_key) or _initial_token(cache, catalog_key),
+        )
+    except CACHE_ERRORS:
+        logger.warning('Project cache unavailable; bypassing it', exc_info=True)
+        return CachedPayload(slug, variant, None, None)
+
+    data = None
+    entry = found.get(entry_key)
+    if entry is not None and tuple(entry[0]) == tokens:
+        data = entry[1]
+    detail_stats.record(data is not None)
+    return CachedPayload(slug, variant, data, tokens)
+
+
+def get_version_tokens(slug=None):
+    """
+    Current (content, catalog) tokens of a project, or of the project lists
+    when `slug` is None, in one round trip; None when the cache cannot be
+    reached.
+    """
+    cache = get_cache()
+    content_key = project_version_key(slug) if slug is not None else list_version_key()
+    catalog_key = catalog_version_key()
+    try:
+        found = cache.get_many([content_key, catalog_key])
+        return (
+            found.get(content_key) or _initial_token(cache, content_key),
+            found.get(catalog_key) or _initial_token(cache, catalog_key),
+        )
+    except CACHE_ERRORS:
+        logger.warning('Project cache unavailable; sending no validators', exc_info=True)
+        return None
+
+
+def _bump(keys):
+    cache = get_cache()
+    try:
+        cache.set_many({key: _new_token() for key in keys}, TOKEN_TIMEOUT)
+    except CACHE_ERRORS:
+        # Runs after the write committed, so it must not fail the request
+        logger.error(
+            'Could not invalidate %s; cached payloads may be stale for up to PROJECT_DETAIL_CACHE_TIMEOUT',
+            ', '.join(keys), exc_info=True,
+        )
+
+
+def invalidate_projects(slugs):
+    """Give the projects (and the project lists) new content versions once the current transaction commits"""
+    keys = [project_version_key(slug) for slug in set(slugs) if slug]
+    if keys:
+        keys.append(list_version_key())
+        transaction.on_commit(lambda: _bump(keys))
+
+
+def invalidate_catalog():
+    """Invalidate every project payload (shared city/state/amenity data changed)"""
+    transaction.on_commit(lambda: _bump([catalog_version_key()]))
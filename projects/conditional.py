@@ -0,0 +1,61 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from .cache import get_cache, get_version_tokens, is_shared, token_time
+
+
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified support for GET and HEAD on project resources.
+
+    Validators come from the project's cached version tokens (or the project
+    list token for views without a project slug), so a matching
+    If-None-Match / If-Modified-Since is answered with 304 before any query
+    is run or anything is serialized. The tokens change whenever anything
+    the response renders changes (see projects.cache and projects.signals).
+
+    Tokens are only consistent between processes in a shared cache; with a
+    per-process cache every worker would issue its own validators and could
+    answer 304 for data another worker changed, so no validators are sent.
+    Neither are they when the cache cannot be reached.
+    """
+    # URL kwarg holding the project slug; lists without it use the list token
+    conditional_slug_kwarg = 'project_slug'
+
+    def get_conditional_slug(self):
+        return self.kwargs.get(self.conditional_slug_kwarg)
+
+    def get_validators(self, request):
+        """(etag, last_modified), or None when the tokens are unavailable"""
+        tokens = get_version_tokens(self.get_conditional_slug())
+        if tokens is None:
+            return None
+        # The same data renders differently per host (absolute file URLs), query and format
+        variant = '|'.join((
+            *tokens,
+            request.get_host(),
+            request.get_full_path(),
+            getattr(request, 'accepted_media_type', '') or '',
+        ))
+        etag = quote_etag(hashlib.md5(variant.encode('utf-8'), usedforsecurity=False).hexdigest())
+        issued = [moment for moment in map(token_time, tokens) if moment is not None]
+        last_modified = int(max(issued).timestamp()) if issued else None
+        return etag, last_modified
+
+    def get(self, request, *args, **kwargs):
+        validators = self.get_validators(request) if is_shared(get_cache()) else None
+        if validators is None:
+            return super().get(request, *args, **kwargs)
+        etag, last_modified = validators
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+            # Let clients keep the payload but always revalidate it
+            patch_cache_control(response, no_cache=True)
+        return response
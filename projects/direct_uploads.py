@@ -0,0 +1,148 @@
+"""
+Direct-to-storage uploads.
+
+Renderings, documents and floor plan files can be uploaded without their
+bytes passing through the API workers:
+
+1. ``POST /api/uploads/`` with the target, file name and size issues a
+   DirectUpload and a signed upload URL, valid for DIRECT_UPLOAD_EXPIRY
+   seconds.
+2. The client PUTs the raw file to that URL. The storage endpoint stores it
+   through the target field's storage and records the stored name and the
+   file's metadata on the DirectUpload. projects.views.direct_upload_target is
+   a local stand-in for the endpoint; DIRECT_UPLOAD_ENDPOINT points the URLs
+   at separate upload hosts instead.
+3. ``POST /api/uploads/<id>/finalize/`` attaches the stored file to a new or
+   existing row. Its metadata comes from the storage endpoint, so the API
+   never reads the file.
+
+A repeated PUT replaces the stored file (the earlier one is deleted); PUTs
+after the upload expired or was finalized are rejected. Expired uploads are
+purged, with their files, whenever a new upload is issued.
+"""
+import hashlib
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core import signing
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+
+from platformb.media import delete_on_commit, describe_file
+from .uploads import UploadTooLarge, _format_size, field_size_limit
+
+# target: (model, file field)
+UPLOAD_TARGETS = {
+    'rendering': ('projects.Rendering', 'image'),
+    'document': ('projects.Document', 'document'),
+    'floor_plan': ('projects.FloorPlan', 'plan_file'),
+    # Chunked uploads only (projects.resumable_uploads)
+    'site_plan': ('projects.SitePlan', 'file'),
+}
+TOKEN_SALT = 'projects.direct_uploads'
+CHUNK_SIZE = 64 * 1024
+
+
+class UploadClosed(Exception):
+    """The upload expired or was finalized while its file was being stored"""
+
+
+def get_expiry():
+    return getattr(settings, 'DIRECT_UPLOAD_EXPIRY', 60 * 60)
+
+
+def target_field(target):
+    model_label, attname = UPLOAD_TARGETS[target]
+    return apps.get_model(model_label)._meta.get_field(attname)
+
+
+def size_limit(target):
+    return field_size_limit(UPLOAD_TARGETS[target][1])
+
+
+def expiry_time():
+    return timezone.now() + timedelta(seconds=get_expiry())
+
+
+def upload_token(upload):
+    return signing.dumps(str(upload.pk), salt=TOKEN_SALT)
+
+
+def read_token(token):
+    """Id of the DirectUpload a token was issued for; raises signing.BadSignature when invalid or expired"""
+    return signing.loads(token, salt=TOKEN_SALT, max_age=get_expiry())
+
+
+def upload_url(request, upload):
+    token = upload_token(upload)
+    endpoint = getattr(settings, 'DIRECT_UPLOAD_ENDPOINT', None)
+    if endpoint:
+        return f'{endpoint.rstrip("/")}/{token}/'
+    return request.build_absolute_uri(reverse('direct-upload-target', args=[token]))
+
+
+def store_upload(upload, stream):
+    """
+    Storage endpoint side: store the body `stream` of the PUT for `upload`,
+    hashing it on the way, and record where it was stored.
+    """
+    field = target_field(upload.target)
+    received = TemporaryUploadedFile(upload.filename, None, 0, None)
+    try:
+        sha256 = hashlib.sha256()
+        while True:
+            chunk = stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            received.size += len(chunk)
+            if received.size > upload.size:
+                raise UploadTooLarge(f'Upload exceeds the declared {upload.size} bytes.')
+            sha256.update(chunk)
+            received.write(chunk)
+        received.sha256 = sha256.hexdigest()
+        received.seek(0)
+        metadata = describe_file(received, upload.filename, received.size, received.sha256)
+        received.seek(0)
+        # Temporary files are moved into place rather than copied
+        stored_name = field.storage.save(field.generate_filename(None, upload.filename), received)
+    finally:
+        received.close()
+    # Locked against finalizing, which attaches whatever file is recorded
+    with transaction.atomic():
+        current = type(upload).objects.select_for_update().filter(pk=upload.pk).first()
+        closed = current is None or current.is_expired
+        if not closed:
+            previous = current.stored_name
+            type(upload).objects.filter(pk=upload.pk).update(stored_name=stored_name, metadata=metadata)
+    if closed:
+        delete_on_commit([field.attr_class(None, field, stored_name)])
+        raise UploadClosed('This upload has expired or was already finalized.')
+    if previous and previous != stored_name:
+        # A repeated PUT replaces the earlier file
+        delete_on_commit([field.attr_class(None, field, previous)])
+    upload.stored_name, upload.metadata = stored_name, metadata
+    return stored_name
+
+
+def stored_file(upload):
+    """The uploaded file as a value for its target field, carrying its metadata"""
+    field = target_field(upload.target)
+    file = field.attr_class(None, field, upload.stored_name)
+    file.known_metadata = upload.metadata
+    return file
+
+
+def expire_uploads(model):
+    """Delete the uploads that can no longer be finalized, and their stored files"""
+    expired = model.objects.filter(expires_at__lte=timezone.now())
+    delete_on_commit([stored_file(upload) for upload in expired.exclude(stored_name='')])
+    expired.delete()
+
+
+def check_size(target, size):
+    limit = size_limit(target)
+    if limit and size > limit:
+        raise UploadTooLarge(f'{target} files may not exceed {_format_size(limit)}.')
@@ -0,0 +1,185 @@
+"""
+Live lot / floor plan availability events, streamed to clients as
+server-sent events (SSE).
+
+Writers publish events after their transaction commits (projects.signals and
+InventoryQuerySet). Streams subscribe to a topic on the broadcaster named by
+the PROJECT_EVENTS_BROADCASTER setting. The default InProcessBroadcaster fans
+events out to asyncio queues in the same process, so an ASGI worker holds
+thousands of idle subscribers without a thread each. Because it is
+in-process, only subscribers on the worker that handled the write receive an
+event; a multi-worker deployment plugs in a shared pub/sub broadcaster with
+the same publish/subscribe interface.
+
+The streams are async views and must be served through ``platformb.asgi``
+(e.g. ``uvicorn platformb.asgi:application``).
+"""
+import asyncio
+import json
+import threading
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+
+ALL_PROJECTS_TOPIC = 'projects'
+
+
+def project_topic(project_id):
+    return f'project:{project_id}'
+
+
+def format_event(event_type, data):
+    """Encode one SSE frame"""
+    payload = json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':'))
+    return f'event: {event_type}\ndata: {payload}\n\n'
+
+
+class Subscription:
+    """A subscriber's bounded event queue, owned by the event loop it was created on"""
+
+    def __init__(self, broadcaster, topics, maxsize):
+        self.broadcaster = broadcaster
+        self.topics = tuple(topics)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        # Set when the subscriber fell behind and events were dropped
+        self.overflowed = False
+
+    def put(self, frame):
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self, timeout):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    def close(self):
+        self.broadcaster.unsubscribe(self)
+
+
+class InProcessBroadcaster:
+    """
+    Thread-safe topic fan-out to asyncio subscribers of this process.
+
+    publish() may be called from any thread (sync views run outside the event
+    loop); frames are encoded once and handed to each event loop with a single
+    call_soon_threadsafe() per publish, whatever the number of subscribers.
+    """
+
+    def __init__(self, queue_size=None, max_subscribers=None):
+        self.queue_size = queue_size or getattr(settings, 'PROJECT_EVENTS_QUEUE_SIZE', 100)
+        self.max_subscribers = max_subscribers or getattr(settings, 'PROJECT_EVENTS_MAX_SUBSCRIBERS', 10000)
+        self._lock = threading.Lock()
+        self._topics = defaultdict(set)
+        self._count = 0
+
+    @property
+    def subscriber_count(self):
+        return self._count
+
+    def subscribe(self, topics):
+        """Register a subscriber for `topics`; None when the process is at capacity"""
+        with self._lock:
+            if self._count >= self.max_subscribers:
+                return None
+            subscription = Subscription(self, topics, self.queue_size)
+            for topic in subscription.topics:
+                self._topics[topic].add(subscription)
+            self._count += 1
+        return subscription
+
+    def has_capacity(self):
+        return self._count < self.max_subscribers
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            removed = False
+            for topic in subscription.topics:
+                subscribers = self._topics.get(topic)
+                if subscribers and subscription in subscribers:
+                    subscribers.discard(subscription)
+                    removed = True
+                    if not subscribers:
+                        del self._topics[topic]
+            if removed:
+                self._count -= 1
+
+    def publish(self, topics, frame):
+        by_loop = defaultdict(set)
+        with self._lock:
+            for topic in topics:
+                for subscription in self._topics.get(topic, ()):
+                    by_loop[subscription.loop].add(subscription)
+        for loop, subscriptions in by_loop.items():
+            try:
+                loop.call_soon_threadsafe(_deliver, subscriptions, frame)
+            except RuntimeError:
+                # The loop has been closed; its streams are gone
+                pass
+
+
+def _deliver(subscriptions, frame):
+    for subscription in subscriptions:
+        subscription.put(frame)
+
+
+@lru_cache(maxsize=None)
+def get_broadcaster():
+    path = getattr(settings, 'PROJECT_EVENTS_BROADCASTER', 'projects.events.InProcessBroadcaster')
+    return import_string(path)()
+
+
+def publish_availability(kind, action, rows):
+    """
+    Publish availability events for lots/floor plans once the current
+    transaction commits. `rows` are (id, project_id, availability_status).
+    """
+    rows = list(rows)
+    if not rows:
+        return
+
+    def send():
+        broadcaster = get_broadcaster()
+        timestamp = timezone.now()
+        for pk, project_id, availability_status in rows:
+            frame = format_event(f'{kind}.{action}', {
+                'id': pk,
+                'project_id': project_id,
+                'availability_status': availability_status,
+                'timestamp': timestamp,
+            })
+            broadcaster.publish((ALL_PROJECTS_TOPIC, project_topic(project_id)), frame)
+
+    transaction.on_commit(send)
+
+
+async def stream_events(broadcaster, topics, heartbeat=None):
+    """
+    Async iterator of SSE frames for `topics`, with keep-alive comments. The
+    subscription lives exactly as long as the iteration.
+    """
+    heartbeat = heartbeat or getattr(settings, 'PROJECT_EVENTS_HEARTBEAT_SECONDS', 15)
+    subscription = broadcaster.subscribe(topics)
+    if subscription is None:
+        yield 'retry: 30000\n' + format_event('error', {'detail': 'Too many live subscribers.'})
+        return
+    try:
+        yield 'retry: 5000\n: connected\n\n'
+        while True:
+            if subscription.overflowed:
+                # Events were dropped: tell the client to re-fetch, then carry on
+                subscription.overflowed = False
+                yield format_event('resync', {'reason': 'overflow'})
+            try:
+                yield await subscription.get(heartbeat)
+            except asyncio.TimeoutError:
+                yield ': keep-alive\n\n'
+    finally:
+        subscription.close()
@@ -0,0 +1,103 @@
+"""
+Streaming CSV / NDJSON exports of inquiries, lots and floor plans.
+
+Rows are read with ``values()`` and ``iterator(chunk_size=EXPORT_CHUNK_SIZE)``
+(a server-side cursor on PostgreSQL) and written out a chunk at a time, so
+an export holds one chunk in memory however many rows it has, and the first
+bytes are sent as soon as the first chunk is read.
+
+Under ASGI, Django would read a synchronous iterator to the end before
+sending anything; there the chunks are pulled one at a time through
+sync_to_async instead.
+"""
+import csv
+import datetime
+import io
+import json
+import re
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+# Spreadsheet apps evaluate cells starting with these as formulas
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+# Signed numbers and phone numbers ("-5", "+1 (416) 555-0100") start with + or -
+# but can't call anything, so they are exported as they are
+NUMBER_RE = re.compile(r'[+-][\d\s().-]*\d[\d\s().-]*')
+
+
+def get_chunk_size():
+    return getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES) and not NUMBER_RE.fullmatch(value):
+        return "'" + value
+    return value
+
+
+def csv_chunks(rows, columns, chunk_size):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for count, row in enumerate(rows, 1):
+        writer.writerow([_csv_value(row[column]) for column in columns])
+        if count % chunk_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def ndjson_chunks(rows, columns, chunk_size):
+    lines = []
+    for row in rows:
+        lines.append(json.dumps({column: row[column] for column in columns}, cls=DjangoJSONEncoder))
+        if len(lines) >= chunk_size:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+async def _pull(chunks):
+    # Each chunk is read in the thread the request's database connection belongs to
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    while True:
+        chunk = await next_chunk(chunks, None)
+        if chunk is None:
+            return
+        yield chunk
+
+
+def export_response(request, queryset, columns, export_format, name):
+    """
+    Stream `columns` of `queryset` (a ``values()`` projection) as `export_format`;
+    `name` is the download file name without extension.
+    """
+    chunk_size = get_chunk_size()
+    rows = queryset.values(*columns).iterator(chunk_size=chunk_size)
+    write = csv_chunks if export_format == 'csv' else ndjson_chunks
+    chunks = write(rows, columns, chunk_size)
+    # Unwrap DRF's Request
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        chunks = _pull(chunks)
+    response = StreamingHttpResponse(chunks, content_type=FORMATS[export_format])
+    stamp = timezone.now().strftime('%Y%m%d-%H%M%S')
+    response['Content-Disposition'] = f'attachment; filename="{name}-{stamp}.{export_format}"'
+    response['Cache-Control'] = 'no-store'
+    # Disable proxy buffering (nginx) so rows reach the client as they are written
+    response['X-Accel-Buffering'] = 'no'
+    return response
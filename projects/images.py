@@ -0,0 +1,233 @@
+"""
+Resized image variants (thumbnails) of uploaded renderings.
+
+When a Rendering, FeatureFinish or Lot is saved with a new image, a
+background job (projects.tasks.generate_image_variants) renders the variants,
+so neither the request nor the web process pays for decoding and resampling
+multi-MB uploads. Backfills (the generate_image_variants command) render in
+a process pool instead. Each model names its image fields and the JSON field
+recording their variants in IMAGE_VARIANT_FIELDS:
+
+    {"source": "<image name>", "formats": {"webp": {"320": "<name>", ...}, ...}}
+
+Serializers expose the variant URLs, keyed by format and width, so clients
+build a srcset and only load the original upload on demand. A record whose
+source is not the current image is stale and ignored.
+
+Pillow is in requirements.txt. Without it no variants are generated, clients
+fall back to the original image URL and system check projects.W002 warns.
+"""
+import io
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core import checks
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, connections
+
+from platformb.media import delete_on_commit
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - Pillow is an optional dependency
+    Image = ImageOps = None
+
+logger = logging.getLogger(__name__)
+
+VARIANTS_ROOT = 'derivatives'
+# Pillow format names and file extensions
+FORMATS = {'webp': ('WEBP', 'webp'), 'jpeg': ('JPEG', 'jpg')}
+
+
+def get_widths():
+    return tuple(getattr(settings, 'IMAGE_VARIANT_WIDTHS', (320, 640, 1280)))
+
+
+def get_formats():
+    return tuple(getattr(settings, 'IMAGE_VARIANT_FORMATS', ('webp', 'jpeg')))
+
+
+def get_quality():
+    return getattr(settings, 'IMAGE_VARIANT_QUALITY', 80)
+
+
+def variants_enabled():
+    return Image is not None
+
+
+def check_pillow(app_configs, **kwargs):
+    if variants_enabled():
+        return []
+    return [
+        checks.Warning(
+            'Pillow is not installed, so no image variants or image dimensions are generated.',
+            hint='Install the packages in requirements.txt.',
+            id='projects.W002',
+        )
+    ]
+
+
+def render_variants(source, widths, formats, quality):
+    """
+    Resize `source` (a file path or bytes) to each width narrower than the
+    image, in each format. Runs in a worker process, so it must not touch the
+    ORM. Returns {format: {width: bytes}}.
+    """
+    with Image.open(source if isinstance(source, str) else io.BytesIO(source)) as image:
+        image = ImageOps.exif_transpose(image)
+        has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+        rendered = {}
+        for width in sorted(set(widths)):
+            if width >= image.width:
+                continue
+            height = max(1, round(image.height * width / image.width))
+            resized = image.resize((width, height), Image.LANCZOS)
+            for fmt in formats:
+                pil_format = FORMATS[fmt][0]
+                frame = resized
+                if pil_format == 'JPEG' or not has_alpha:
+                    frame = resized.convert('RGB')
+                out = io.BytesIO()
+                frame.save(out, pil_format, quality=quality, optimize=True)
+                rendered.setdefault(fmt, {})[str(width)] = out.getvalue()
+        return rendered
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=getattr(settings, 'IMAGE_VARIANT_WORKERS', 2))
+        return _executor
+
+
+def shutdown_executor():
+    """Wait for queued variants (including storing them) and stop the pool"""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+def variant_name(source_name, width, fmt):
+    # Keyed by the full source name, so a.jpg and a.png never share variants
+    return f'{VARIANTS_ROOT}/{source_name}/{width}w.{FORMATS[fmt][1]}'
+
+
+def variant_names(record):
+    return [name for widths in (record or {}).get('formats', {}).values() for name in widths.values()]
+
+
+def variant_urls(file, record):
+    """{format: {width: url}} of the current variants of `file`, or {} when there are none"""
+    if not file or not record or record.get('source') != file.name:
+        return {}
+    storage = file.storage
+    return {
+        fmt: {width: storage.url(name) for width, name in widths.items()}
+        for fmt, widths in record.get('formats', {}).items()
+    }
+
+
+def _read_source(file):
+    try:
+        return file.path
+    except NotImplementedError:
+        # Remote storages: ship the bytes to the worker instead
+        with file.storage.open(file.name, 'rb') as fh:
+            return fh.read()
+
+
+def store_variants(model, pk, project_id, attname, variants_attname, source_name, storage, rendered):
+    """Save rendered variants and record them if the row still has the image they were made from"""
+    record = {'source': source_name, 'formats': {}}
+    for fmt, widths in rendered.items():
+        for width, content in widths.items():
+            name = variant_name(source_name, width, fmt)
+            # Variant names are derived from the source, so an existing file is
+            # this variant already (e.g. made for another row sharing the blob)
+            if not storage.exists(name):
+                name = storage.save(name, ContentFile(content))
+            record['formats'].setdefault(fmt, {})[width] = name
+    updated = model._default_manager.filter(pk=pk, **{attname: source_name}).update(**{variants_attname: record})
+    if updated:
+        from .models import Project
+        Project.invalidate_cached_payloads([project_id])
+    else:
+        for name in variant_names(record):
+            storage.delete(name)
+
+
+def _store_rendered(model, pk, project_id, attname, variants_attname, source_name, storage, future):
+    close_old_connections()
+    try:
+        store_variants(model, pk, project_id, attname, variants_attname, source_name, storage, future.result())
+    except Exception:
+        logger.exception('Could not generate image variants of %s %s', model._meta.label, pk)
+    finally:
+        # Runs on the pool's callback thread, which would otherwise keep its connection open
+        connections.close_all()
+
+
+def generate_variants(instance, attname, variants_attname):
+    """Render the variants of one image field in the process pool; returns the future"""
+    file = getattr(instance, attname)
+    future = get_executor().submit(
+        render_variants, _read_source(file), get_widths(), get_formats(), get_quality()
+    )
+    future.add_done_callback(lambda done: _store_rendered(
+        type(instance), instance.pk, instance.project_id, attname, variants_attname, file.name, file.storage, done
+    ))
+    return future
+
+
+def render_and_store_variants(instance, attname, variants_attname):
+    """Render the variants of one image field in the calling process (background jobs)"""
+    file = getattr(instance, attname)
+    rendered = render_variants(_read_source(file), get_widths(), get_formats(), get_quality())
+    store_variants(
+        type(instance), instance.pk, instance.project_id, attname, variants_attname, file.name, file.storage, rendered
+    )
+
+
+def needs_variants(instance, attname, variants_attname):
+    file = getattr(instance, attname)
+    return bool(file) and (getattr(instance, variants_attname) or {}).get('source') != file.name
+
+
+def expire_stale_variants(instance):
+    """
+    Before a save: forget (and delete once committed) the variants of images
+    that are being replaced or removed.
+    """
+    for attname, variants_attname in getattr(instance, 'IMAGE_VARIANT_FIELDS', {}).items():
+        record = getattr(instance, variants_attname)
+        if record and record.get('source') != getattr(instance, attname).name:
+            file = getattr(instance, attname)
+            delete_on_commit(file.field.attr_class(instance, file.field, name) for name in variant_names(record))
+            setattr(instance, variants_attname, {})
+
+
+def schedule_variants(instance):
+    """After a save: queue a job rendering the variants of images that have none"""
+    if not variants_enabled():
+        return
+    from .tasks import generate_image_variants
+    for attname, variants_attname in getattr(instance, 'IMAGE_VARIANT_FIELDS', {}).items():
+        if needs_variants(instance, attname, variants_attname):
+            # Inserted in the saving transaction: the job exists only if the image is committed
+            generate_image_variants.enqueue(model=instance._meta.label, pk=instance.pk, attname=attname)
+
+
+def delete_variants(instance):
+    for attname, variants_attname in getattr(instance, 'IMAGE_VARIANT_FIELDS', {}).items():
+        file = getattr(instance, attname)
+        record = getattr(instance, variants_attname)
+        delete_on_commit(file.field.attr_class(instance, file.field, name) for name in variant_names(record))
@@ -0,0 +1,288 @@
+"""
+Write-behind ingestion of public project inquiries.
+
+Submitting an inquiry does not touch the database: the validated inquiry is
+appended as one JSON line to a local append-only file (INQUIRY_BUFFER_DIR),
+and a background thread of each process moves buffered inquiries into
+ProjectInquires with bulk_create every INQUIRY_BUFFER_FLUSH_INTERVAL seconds,
+or sooner once INQUIRY_BUFFER_BATCH_SIZE are waiting. ``manage.py
+flush_inquiries`` does the same, e.g. after processes were killed.
+
+Flushing renames the buffer to a segment file first, so submissions keep
+appending to a fresh buffer meanwhile. Writers append under a shared lock and
+the flusher renames under an exclusive one, so no append is cut off by the
+rename; a writer that opened the buffer just before it was renamed notices and
+appends to the new one. Only one process flushes at a time. Every inquiry
+carries a submission id, stored on the row: a segment whose flush was
+interrupted is replayed without inserting any inquiry twice.
+
+Repeated submissions of the same inquiry (project, email, phone and message)
+within one INQUIRY_DEDUP_WINDOW-second window are stored once, whichever
+processes received them: rows carry a dedup key, a hash of the inquiry and its
+window under a unique constraint, and flushes skip rows that conflict.
+"""
+import atexit
+import glob
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from .cache import CACHE_ERRORS, KEY_PREFIX, get_cache
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - no file locks on Windows; run a single process there
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+BUFFER_NAME = 'inquiries.jsonl'
+SEGMENT_SUFFIX = '.flushing'
+LOCK_NAME = 'flush.lock'
+# Slugs (and ids) of existing projects, so submissions don't query the database
+PROJECT_ID_TIMEOUT = 60 * 60
+
+
+def get_buffer_dir():
+    return getattr(settings, 'INQUIRY_BUFFER_DIR', os.path.join(settings.BASE_DIR, '.inquiry_buffer'))
+
+
+def get_batch_size():
+    return getattr(settings, 'INQUIRY_BUFFER_BATCH_SIZE', 500)
+
+
+def get_flush_interval():
+    return getattr(settings, 'INQUIRY_BUFFER_FLUSH_INTERVAL', 2.0)
+
+
+def buffer_enabled():
+    return getattr(settings, 'INQUIRY_BUFFER_ENABLED', False)
+
+
+def get_dedup_window():
+    return getattr(settings, 'INQUIRY_DEDUP_WINDOW', 60 * 10)
+
+
+def _lock(fd, exclusive=False):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+
+
+def resolve_project_id(slug=None, pk=None):
+    """Id of an existing project by slug or id, or None; cached"""
+    from .models import Project
+    key = f'{KEY_PREFIX}:project-id:{slug}' if slug is not None else f'{KEY_PREFIX}:project-id:#{pk}'
+    cache = get_cache()
+    try:
+        project_id = cache.get(key)
+    except CACHE_ERRORS:
+        # Unreachable cache: answer from the database
+        project_id = cache = None
+    if project_id is None:
+        lookup = {'slug': slug} if slug is not None else {'pk': pk}
+        project_id = Project.objects.filter(**lookup).values_list('pk', flat=True).first()
+        if project_id is not None and cache is not None:
+            try:
+                cache.set(key, project_id, PROJECT_ID_TIMEOUT)
+            except CACHE_ERRORS:
+                pass
+    return project_id
+
+
+def submission_hash(project_id, email, phone, message, window):
+    normalized = json.dumps([project_id, email.strip().lower(), phone.strip(), ' '.join(message.split()), window])
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+def dedup_key(record):
+    """Shared by repeats of the inquiry submitted within the same dedup window; None if dedup is off"""
+    window = get_dedup_window()
+    if not window:
+        return None
+    # Records buffered before submitted_at existed count as submitted now
+    window_number = int(record.get('submitted_at', time.time()) // window)
+    return submission_hash(record['project_id'], record['email'], record['phone'], record['message'], window_number)
+
+
+def append(data):
+    """Durably buffer one validated inquiry; returns its submission id"""
+    record = {
+        'submission_id': uuid.uuid4().hex,
+        'submitted_at': time.time(),
+        'project_id': data.get('project'),
+        'name': data.get('name', ''),
+        'email': data.get('email', ''),
+        'phone': data.get('phone', ''),
+        'message': data.get('message', ''),
+    }
+    line = (json.dumps(record, separators=(',', ':')) + '\n').encode()
+    directory = get_buffer_dir()
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, BUFFER_NAME)
+    while True:
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        try:
+            _lock(fd)
+            try:
+                current = os.stat(path).st_ino == os.fstat(fd).st_ino
+            except FileNotFoundError:
+                current = False
+            if current:
+                # A single O_APPEND write: lines from concurrent writers never interleave
+                os.write(fd, line)
+                if getattr(settings, 'INQUIRY_BUFFER_FSYNC', True):
+                    os.fsync(fd)
+                break
+            # Renamed to a segment by a flush meanwhile
+        finally:
+            os.close(fd)
+    flusher.notify()
+    return record['submission_id']
+
+
+def _read_segment(path):
+    records = []
+    with open(path, 'rb') as fh:
+        for line in fh:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                logger.warning('Skipping a corrupt line in %s', path)
+    return records
+
+
+def _store(records):
+    """Insert the records not stored yet (nor repeated); returns how many were inserted"""
+    from .models import Project, ProjectInquires
+    from .tasks import notify_inquiry_contacts
+
+    ids = [record['submission_id'] for record in records]
+    stored = set(
+        ProjectInquires.objects.filter(submission_id__in=ids).values_list('submission_id', flat=True)
+    )
+    project_ids = {record['project_id'] for record in records if record['project_id'] is not None}
+    existing_projects = set(Project.objects.filter(pk__in=project_ids).values_list('pk', flat=True))
+    rows = [
+        ProjectInquires(
+            submission_id=uuid.UUID(record['submission_id']),
+            project_id=record['project_id'],
+            name=record['name'],
+            email=record['email'],
+            phone=record['phone'],
+            message=record['message'],
+            dedup_key=dedup_key(record),
+        )
+        for record in records
+        # Inquiries of projects deleted meanwhile would have been deleted with them
+        if uuid.UUID(record['submission_id']) not in stored
+        and (record['project_id'] is None or record['project_id'] in existing_projects)
+    ]
+    with transaction.atomic():
+        # Repeats of an inquiry already stored conflict on dedup_key and are skipped
+        ProjectInquires.objects.bulk_create(rows, batch_size=get_batch_size(), ignore_conflicts=True)
+        # ignore_conflicts leaves the primary keys unset: read back the rows inserted
+        created = list(
+            ProjectInquires.objects.filter(submission_id__in=[row.submission_id for row in rows])
+            .values_list('pk', 'project_id')
+        )
+        # bulk_create sends no post_save: do what the signals would
+        if getattr(settings, 'INQUIRY_NOTIFICATIONS', False):
+            notify_inquiry_contacts.enqueue_many([{'inquiry_id': pk} for pk, _ in created])
+        Project.invalidate_cached_payloads({project_id for _, project_id in created if project_id})
+    return len(created)
+
+
+def _rotate(buffer_path, directory):
+    """Rename a non-empty buffer to a new segment once no append is in progress"""
+    try:
+        fd = os.open(buffer_path, os.O_RDONLY)
+    except FileNotFoundError:
+        return
+    try:
+        _lock(fd, exclusive=True)
+        if os.fstat(fd).st_size:
+            os.replace(buffer_path, os.path.join(directory, f'{time.time_ns()}{SEGMENT_SUFFIX}'))
+    finally:
+        os.close(fd)
+
+
+def flush(wait=False):
+    """
+    Move buffered inquiries into the database; returns how many were inserted.
+    Returns 0 at once if another process is flushing, unless `wait`.
+    """
+    directory = get_buffer_dir()
+    if not os.path.isdir(directory):
+        return 0
+    lock_fd = os.open(os.path.join(directory, LOCK_NAME), os.O_WRONLY | os.O_CREAT, 0o600)
+    try:
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_fd, fcntl.LOCK_EX | (0 if wait else fcntl.LOCK_NB))
+            except BlockingIOError:
+                return 0
+        _rotate(os.path.join(directory, BUFFER_NAME), directory)
+        inserted = 0
+        # Segments left by an interrupted flush come first (names sort by time)
+        for path in sorted(glob.glob(os.path.join(directory, f'*{SEGMENT_SUFFIX}'))):
+            records = _read_segment(path)
+            for start in range(0, len(records), get_batch_size()):
+                inserted += _store(records[start:start + get_batch_size()])
+            os.remove(path)
+        return inserted
+    finally:
+        os.close(lock_fd)
+
+
+class InquiryFlusher:
+    """Daemon thread flushing the buffer periodically, or early once a batch is waiting"""
+
+    def __init__(self):
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pending = 0
+
+    def notify(self):
+        with self._lock:
+            self._pending += 1
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='inquiry-flush', daemon=True)
+                self._thread.start()
+            if self._pending >= get_batch_size():
+                self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait(get_flush_interval())
+            self._wake.clear()
+            with self._lock:
+                self._pending = 0
+            try:
+                flush()
+            except Exception:
+                # Buffered inquiries stay on disk and are retried on the next flush
+                logger.exception('Could not flush buffered inquiries')
+            finally:
+                close_old_connections()
+
+
+flusher = InquiryFlusher()
+
+
+def _flush_at_exit():
+    if flusher._thread is not None:
+        try:
+            flush()
+        except Exception:
+            logger.exception('Could not flush buffered inquiries at exit')
+
+
+atexit.register(_flush_at_exit)
@@ -0,0 +1,65 @@
+from django.core.management.base import BaseCommand
+
+from platformb.media import file_metadata
+from projects.models import Document, FeatureFinish, FloorPlan, Lot, Project, Rendering, SitePlan
+
+MEDIA_MODELS = (Rendering, FeatureFinish, FloorPlan, Lot, Document, SitePlan)
+
+
+class Command(BaseCommand):
+    help = 'Record size, type, dimensions and SHA-256 of uploaded files that have no metadata yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'slugs', nargs='*',
+            help='Only process the files of projects with these slugs (default: all projects)'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=200,
+            help='Number of rows written per bulk update'
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Recompute metadata that is already stored'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        recorded = missing = 0
+        for model in MEDIA_MODELS:
+            for attname, metadata_attname in model.MEDIA_METADATA_FIELDS.items():
+                queryset = (
+                    model._default_manager.order_by('pk')
+                    .exclude(**{f'{attname}__isnull': True}).exclude(**{attname: ''})
+                )
+                if options['slugs']:
+                    queryset = queryset.filter(project__slug__in=options['slugs'])
+                if not options['force']:
+                    queryset = queryset.filter(**{metadata_attname: {}})
+
+                batch = []
+                for obj in queryset.only('pk', 'project_id', attname, metadata_attname).iterator(chunk_size=batch_size):
+                    file = getattr(obj, attname)
+                    try:
+                        setattr(obj, metadata_attname, file_metadata(file))
+                    except OSError as exc:
+                        missing += 1
+                        self.stderr.write(f'{model._meta.label} {obj.pk}: cannot read {file.name} ({exc})')
+                        continue
+                    batch.append(obj)
+                    if len(batch) >= batch_size:
+                        recorded += self.write(model, batch, metadata_attname)
+                        batch = []
+                if batch:
+                    recorded += self.write(model, batch, metadata_attname)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Recorded metadata for {recorded} file(s); {missing} file(s) could not be read'
+        ))
+
+    @staticmethod
+    def write(model, objs, metadata_attname):
+        model._default_manager.bulk_update(objs, [metadata_attname])
+        # The metadata is part of the project payloads
+        Project.invalidate_cached_payloads({obj.project_id for obj in objs})
+        return len(objs)
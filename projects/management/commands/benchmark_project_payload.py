@@ -0,0 +1,142 @@
+import json
+import timeit
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+from rest_framework.parsers import FormParser, MultiPartParser
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from projects.payloads import decode_project_payload
+
+
+def legacy_decode(request):
+    """The per-prefix parsing ProjectListCreateView.create did before projects.payloads"""
+    data = {}
+    for key, value in request.data.items():
+        if key.startswith('uploaded_') or key.startswith('existing_'):
+            continue
+        data[key] = int(value) if key == 'city_id' else value
+
+    for name, file_attr in (('lots', 'lot_rendering'), ('floor_plans', 'plan_file')):
+        rows = []
+        if name in request.data:
+            try:
+                rows = json.loads(request.data[name])
+                for index, row in enumerate(rows):
+                    file_key = f'{name}[{index}].{file_attr}'
+                    if file_key in request.FILES:
+                        row[file_attr] = request.FILES[file_key]
+            except json.JSONDecodeError:
+                rows = []
+        if not rows:
+            for key, value in request.data.items():
+                if key.startswith(f'{name}[') and key.endswith(']'):
+                    try:
+                        row = json.loads(value)
+                        file_key = key.replace(']', f'.{file_attr}]')
+                        if file_key in request.FILES:
+                            row[file_attr] = request.FILES[file_key]
+                        rows.append(row)
+                    except json.JSONDecodeError:
+                        continue
+        data[name] = rows
+
+    for key in ('contacts', 'amenity_ids', 'features_finishes_write'):
+        if key in request.data:
+            try:
+                data[key] = json.loads(request.data[key])
+            except json.JSONDecodeError:
+                data[key] = []
+
+    data['uploaded_renderings'] = [
+        {'image': value} for key, value in request.FILES.items() if key == 'uploaded_images'
+    ]
+    data['uploaded_features_finishes'] = [
+        {'image': value} for key, value in request.FILES.items() if key == 'uploaded_features_finishes'
+    ]
+    for files_key, document_type in (('uploaded_legal_documents', 'Document'),
+                                     ('uploaded_marketing_documents', 'Marketing Material')):
+        titles = {}
+        for key, value in request.data.items():
+            if key.startswith(f'{files_key}_titles['):
+                titles[int(key.split('[')[1].split(']')[0])] = value
+        documents = []
+        for key, value in request.FILES.items():
+            if key == files_key:
+                documents.append({
+                    'document': value,
+                    'title': titles.get(len(documents), ''),
+                    'document_type': document_type,
+                })
+        data[files_key] = documents
+
+    for key in ('existing_legal_documents', 'existing_marketing_documents', 'existing_features_finishes'):
+        if key in request.data:
+            try:
+                data[key] = json.loads(request.data[key])
+            except json.JSONDecodeError:
+                data[key] = []
+    return data
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the project form decoder against the previous per-prefix parsing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lots', type=int, default=500, help='Lots in the synthetic payload')
+        parser.add_argument('--floor-plans', type=int, default=50, help='Floor plans in the synthetic payload')
+        parser.add_argument('--documents', type=int, default=20, help='Titled legal documents in the payload')
+        parser.add_argument('--repeat', type=int, default=200, help='Decodes per timing run')
+
+    def build_request(self, options):
+        lots = [
+            {'lot_number': str(i), 'availability_status': 'Available', 'price': '500000', 'description': 'x' * 100}
+            for i in range(options['lots'])
+        ]
+        floor_plans = [
+            {'name': f'Plan {i}', 'bedrooms': '3', 'bathrooms': '2.5', 'square_footage': '1800'}
+            for i in range(options['floor_plans'])
+        ]
+        form = {
+            'name': 'Benchmark Project',
+            'project_address': '1 Main St',
+            'city_id': '1',
+            'lots': json.dumps(lots),
+            'floor_plans': json.dumps(floor_plans),
+            'contacts': json.dumps([{'name': 'Sales', 'email': 'sales@example.com'}]),
+            'amenity_ids': json.dumps([1, 2, 3]),
+            'existing_features_finishes': '[]',
+            'uploaded_legal_documents': [
+                SimpleUploadedFile(f'doc{i}.pdf', b'%PDF-1.4') for i in range(options['documents'])
+            ],
+        }
+        for i in range(options['documents']):
+            form[f'uploaded_legal_documents_titles[{i}]'] = f'Document {i}'
+        for i in range(0, options['lots'], 10):
+            form[f'lots[{i}].lot_rendering'] = SimpleUploadedFile(f'lot{i}.jpg', b'\xff\xd8')
+
+        django_request = APIRequestFactory().post('/api/projects/', form, format='multipart')
+        request = Request(django_request, parsers=[MultiPartParser(), FormParser()])
+        request.data  # parse once so only decoding is timed
+        return request
+
+    def handle(self, *args, **options):
+        request = self.build_request(options)
+        repeat = options['repeat']
+
+        timings = {
+            'legacy': min(timeit.repeat(lambda: legacy_decode(request), number=repeat, repeat=3)),
+            'decoder': min(timeit.repeat(
+                lambda: decode_project_payload(request.data).to_serializer_data(), number=repeat, repeat=3
+            )),
+            'decoder+lots': min(timeit.repeat(
+                lambda: decode_project_payload(request.data).lots, number=repeat, repeat=3
+            )),
+        }
+        for name, seconds in timings.items():
+            self.stdout.write(f'{name:>14}: {seconds / repeat * 1000:.3f} ms per payload')
+        self.stdout.write(self.style.SUCCESS(
+            f"Decoder speedup: {timings['legacy'] / timings['decoder']:.1f}x "
+            f"({options['lots']} lots, {options['floor_plans']} floor plans)"
+        ))
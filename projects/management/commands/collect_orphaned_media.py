@@ -0,0 +1,232 @@
+import json
+import os
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.management.base import BaseCommand, CommandError
+
+from platformb.media import file_fields
+
+
+# Apps whose FileFields own files under MEDIA_ROOT
+MEDIA_APPS = ('projects', 'accounts')
+
+
+def get_checkpoint_path():
+    return getattr(settings, 'MEDIA_GC_CHECKPOINT_FILE', os.path.join(settings.BASE_DIR, '.media_gc_checkpoint.json'))
+
+
+class Checkpoint:
+    """
+    Progress of an interrupted scan: the directories already finished and the
+    last file handled in the directory being scanned. Written atomically.
+    """
+
+    def __init__(self, path, mode):
+        self.path = path
+        self.mode = mode
+        self.done_dirs = set()
+        self.current_dir = None
+        self.after = None
+        self.stats = {'scanned': 0, 'orphans': 0, 'bytes': 0, 'deleted': 0}
+
+    def load(self):
+        try:
+            with open(self.path) as fh:
+                data = json.load(fh)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as exc:
+            raise CommandError(f'Unreadable checkpoint {self.path}: {exc}; rerun with --restart')
+        if data.get('mode') != self.mode:
+            # A dry run's progress says nothing about what an apply run deleted
+            return False
+        self.done_dirs = set(data['done_dirs'])
+        self.current_dir, self.after = data['current_dir'], data['after']
+        self.stats.update(data['stats'])
+        return True
+
+    def save(self):
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w') as fh:
+            json.dump({
+                'mode': self.mode,
+                'done_dirs': sorted(self.done_dirs),
+                'current_dir': self.current_dir,
+                'after': self.after,
+                'stats': self.stats,
+            }, fh)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class Command(BaseCommand):
+    help = 'Find (and with --apply, delete) media files no FileField references'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--apply', action='store_true',
+            help='Delete the orphaned files (default: only report them)'
+        )
+        parser.add_argument(
+            '--min-age', type=float, default=24,
+            help='Only treat files older than this many hours as orphans, so uploads whose row '
+                 'is not committed yet are kept (default: 24)'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=2000,
+            help='Rows fetched per round trip when collecting referenced paths'
+        )
+        parser.add_argument(
+            '--checkpoint', default=None,
+            help='Progress file used to resume an interrupted scan (default: MEDIA_GC_CHECKPOINT_FILE)'
+        )
+        parser.add_argument(
+            '--checkpoint-every', type=int, default=1000,
+            help='Save progress after this many files'
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Ignore any saved progress and scan from the beginning'
+        )
+
+    def handle(self, *args, **options):
+        if not isinstance(default_storage, FileSystemStorage):
+            raise CommandError('Orphan collection needs a local FileSystemStorage')
+        self.media_root = os.path.abspath(settings.MEDIA_ROOT)
+        self.apply = options['apply']
+        self.verbosity = options['verbosity']
+        self.cutoff = time.time() - options['min_age'] * 3600
+        self.checkpoint_every = max(1, options['checkpoint_every'])
+
+        fields = [
+            field
+            for app_label in MEDIA_APPS
+            for model in apps.get_app_config(app_label).get_models()
+            for field in file_fields(model)
+        ]
+        self.referenced = self.referenced_paths(fields, max(1, options['batch_size']))
+        self.stdout.write(f'{len(self.referenced)} referenced file(s)')
+
+        self.checkpoint = Checkpoint(options['checkpoint'] or get_checkpoint_path(), 'apply' if self.apply else 'dry-run')
+        if options['restart']:
+            self.checkpoint.clear()
+        elif self.checkpoint.load():
+            self.stdout.write(f'Resuming from {self.checkpoint.path}')
+
+        # Only the upload directories (and shared blob directories of
+        # content-addressed storages) are scanned, never the rest of MEDIA_ROOT
+        roots = {self.upload_root(field) for field in fields}
+        # Shared blobs no row references yet may be reserved for one being written
+        self.blob_storages = {
+            field.storage.blob_root: field.storage for field in fields if hasattr(field.storage, 'blob_root')
+        }
+        roots.update(self.blob_storages)
+        roots = sorted(roots)
+        for root in roots:
+            self.scan(root)
+        self.checkpoint.clear()
+
+        stats = self.checkpoint.stats
+        verb = 'Deleted' if self.apply else 'Would delete'
+        count = stats['deleted'] if self.apply else stats['orphans']
+        self.stdout.write(self.style.SUCCESS(
+            f'Scanned {stats["scanned"]} file(s), found {stats["orphans"]} orphan(s) '
+            f'({stats["bytes"] / (1024 * 1024):.1f} MB). {verb} {count} file(s).'
+        ))
+
+    def referenced_paths(self, fields, batch_size):
+        referenced = set()
+        for field in fields:
+            names = (
+                field.model._default_manager.order_by()
+                .exclude(**{f'{field.attname}__isnull': True})
+                .exclude(**{field.attname: ''})
+                .values_list(field.attname, flat=True)
+                .iterator(chunk_size=batch_size)
+            )
+            referenced.update(os.path.normpath(name) for name in names)
+        return referenced
+
+    @staticmethod
+    def upload_root(field):
+        if callable(field.upload_to):
+            raise CommandError(f'{field.model._meta.label}.{field.name} has a callable upload_to; cannot tell its directory')
+        return os.path.normpath(str(field.upload_to)).split(os.sep)[0]
+
+    def scan(self, root):
+        stack = [root]
+        while stack:
+            rel_dir = stack.pop()
+            path = os.path.join(self.media_root, rel_dir)
+            try:
+                with os.scandir(path) as entries:
+                    files, subdirs = [], []
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.name)
+                        elif entry.is_file(follow_symlinks=False):
+                            files.append(entry.name)
+            except FileNotFoundError:
+                continue
+            # Descend in name order so a resumed run visits directories in the same order
+            stack.extend(os.path.join(rel_dir, name) for name in sorted(subdirs, reverse=True))
+            if rel_dir in self.checkpoint.done_dirs:
+                continue
+
+            after = self.checkpoint.after if self.checkpoint.current_dir == rel_dir else None
+            self.checkpoint.current_dir = rel_dir
+            for handled, name in enumerate(sorted(files), 1):
+                if after is not None and name <= after:
+                    continue
+                self.check_file(rel_dir, name)
+                self.checkpoint.after = name
+                if handled % self.checkpoint_every == 0:
+                    self.checkpoint.save()
+            self.checkpoint.done_dirs.add(rel_dir)
+            self.checkpoint.current_dir = self.checkpoint.after = None
+            self.checkpoint.save()
+
+    def check_file(self, rel_dir, name):
+        stats = self.checkpoint.stats
+        stats['scanned'] += 1
+        rel_path = os.path.join(rel_dir, name)
+        if rel_path in self.referenced:
+            return
+        path = os.path.join(self.media_root, rel_path)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return
+        if stat.st_mtime > self.cutoff:
+            return
+        blob_storage = self.blob_storages.get(rel_path.split(os.sep)[0])
+        if blob_storage is not None and blob_storage.is_referenced(rel_path):
+            return
+
+        stats['orphans'] += 1
+        stats['bytes'] += stat.st_size
+        if self.verbosity >= 2 or not self.apply:
+            self.stdout.write(rel_path)
+        if self.apply:
+            try:
+                if blob_storage is not None:
+                    # Decided again under the blob's lock, so a blob reserved since is kept
+                    blob_storage.delete(rel_path)
+                    if blob_storage.exists(rel_path):
+                        return
+                else:
+                    os.remove(path)
+            except FileNotFoundError:
+                return
+            except OSError as exc:
+                self.stderr.write(f'Could not delete {rel_path}: {exc}')
+                return
+            stats['deleted'] += 1
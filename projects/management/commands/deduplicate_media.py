@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from platformb.media import file_fields
+from projects.models import Document, FloorPlan, Lot, Rendering
+from projects.storage import blob_storage, source_blob
+
+
+class Command(BaseCommand):
+    help = 'Move files uploaded before content-addressed storage into shared blobs, dropping duplicates'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Number of rows moved per transaction'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        moved = failed = 0
+        for model in (Rendering, FloorPlan, Lot, Document):
+            for field in file_fields(model):
+                if field.storage is not blob_storage:
+                    continue
+                queryset = (
+                    model._default_manager.order_by('pk')
+                    .exclude(**{f'{field.attname}__isnull': True}).exclude(**{field.attname: ''})
+                    .exclude(**{f'{field.attname}__startswith': f'{blob_storage.blob_root}/'})
+                )
+                batch = []
+                for obj in queryset.iterator(chunk_size=batch_size):
+                    file = getattr(obj, field.attname)
+                    metadata = getattr(obj, obj.MEDIA_METADATA_FIELDS.get(field.attname, ''), None) or {}
+                    try:
+                        with file.open('rb'):
+                            # Reuse the recorded hash instead of reading the file twice
+                            file.sha256 = metadata.get('sha256')
+                            name = blob_storage.save(file.name, file)
+                    except OSError as exc:
+                        failed += 1
+                        self.stderr.write(f'{model._meta.label} {obj.pk}: cannot read {file.name} ({exc})')
+                        continue
+                    if source_blob(name) != name:
+                        failed += 1
+                        continue
+                    setattr(obj, field.attname, name)
+                    batch.append(obj)
+                    if len(batch) >= batch_size:
+                        moved += self.write(model, field, batch)
+                        batch = []
+                if batch:
+                    moved += self.write(model, field, batch)
+
+        self.stdout.write(self.style.SUCCESS(f'Moved {moved} file(s) into shared blobs; {failed} failed'))
+
+    @staticmethod
+    def write(model, field, objs):
+        # bulk_update() counts the blob references and deletes the old copies once committed
+        with transaction.atomic():
+            model._default_manager.bulk_update(objs, [field.name])
+        return len(objs)
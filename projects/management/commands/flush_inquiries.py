@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from projects.inquiry_buffer import flush, get_buffer_dir
+
+
+class Command(BaseCommand):
+    help = (
+        'Store the buffered public inquiries now, including those left behind by '
+        'processes that stopped before flushing'
+    )
+
+    def handle(self, *args, **options):
+        inserted = flush(wait=True)
+        self.stdout.write(self.style.SUCCESS(f'Stored {inserted} inquiry(ies) from {get_buffer_dir()}'))
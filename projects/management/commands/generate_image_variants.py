@@ -0,0 +1,52 @@
+from concurrent.futures import wait
+
+from django.core.management.base import BaseCommand, CommandError
+
+from projects.images import generate_variants, needs_variants, shutdown_executor, variants_enabled
+from projects.models import FeatureFinish, Lot, Rendering
+
+
+class Command(BaseCommand):
+    help = 'Generate the resized variants of rendering, feature and lot images that have none'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'slugs', nargs='*',
+            help='Only process the images of projects with these slugs (default: all projects)'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Number of images rendered before waiting for the pool to catch up'
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Regenerate variants that already exist (e.g. after changing IMAGE_VARIANT_WIDTHS)'
+        )
+
+    def handle(self, *args, **options):
+        if not variants_enabled():
+            raise CommandError('Pillow is not installed')
+
+        batch_size = max(1, options['batch_size'])
+        submitted = 0
+        pending = []
+        try:
+            for model in (Rendering, FeatureFinish, Lot):
+                queryset = model._default_manager.order_by('pk')
+                if options['slugs']:
+                    queryset = queryset.filter(project__slug__in=options['slugs'])
+                for attname, variants_attname in model.IMAGE_VARIANT_FIELDS.items():
+                    rows = queryset.exclude(**{attname: ''}).exclude(**{f'{attname}__isnull': True})
+                    for instance in rows.only('pk', 'project_id', attname, variants_attname).iterator(chunk_size=batch_size):
+                        if not options['force'] and not needs_variants(instance, attname, variants_attname):
+                            continue
+                        pending.append(generate_variants(instance, attname, variants_attname))
+                        submitted += 1
+                        if len(pending) >= batch_size:
+                            wait(pending)
+                            pending = []
+        finally:
+            # Also waits for the last variants to be stored
+            shutdown_executor()
+
+        self.stdout.write(self.style.SUCCESS(f'Processed {submitted} image(s); failures are logged'))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from projects.models import Project
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the denormalized lot and floor plan counters stored on each project'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'slugs', nargs='*',
+            help='Only rebuild the projects with these slugs (default: all projects)'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Number of projects recounted per UPDATE statement'
+        )
+
+    def handle(self, *args, **options):
+        queryset = Project.objects.order_by('pk')
+        if options['slugs']:
+            queryset = queryset.filter(slug__in=options['slugs'])
+
+        batch_size = max(1, options['batch_size'])
+        batch = []
+        updated = 0
+        for project_id in queryset.values_list('pk', flat=True).iterator(chunk_size=batch_size):
+            batch.append(project_id)
+            if len(batch) >= batch_size:
+                updated += Project.refresh_inventory_counts(batch)
+                batch = []
+        if batch:
+            updated += Project.refresh_inventory_counts(batch)
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt inventory counters for {updated} project(s)'))
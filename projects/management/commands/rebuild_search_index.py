@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from projects.models import Project
+from projects.search import index_projects
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search documents of projects'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'slugs', nargs='*',
+            help='Only rebuild the projects with these slugs (default: all projects)'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Number of documents written per upsert statement'
+        )
+
+    def handle(self, *args, **options):
+        queryset = Project.objects.all()
+        if options['slugs']:
+            queryset = queryset.filter(slug__in=options['slugs'])
+
+        written = index_projects(queryset, batch_size=max(1, options['batch_size']))
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt search documents for {written} project(s)'))
@@ -0,0 +1,80 @@
+# Generated by Django 5.1.3 on 2026-10-16 22:34
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+LOT_STATUS_COUNTER_FIELDS = {
+    'Available': 'available_lots_count',
+    'Reserved': 'reserved_lots_count',
+    'Sold': 'sold_lots_count',
+    'Coming Soon': 'coming_soon_lots_count',
+    'Move In Ready': 'move_in_ready_lots_count',
+}
+
+
+def populate_inventory_counters(apps, schema_editor):
+    Project = apps.get_model('projects', 'Project')
+    Lot = apps.get_model('projects', 'Lot')
+    FloorPlan = apps.get_model('projects', 'FloorPlan')
+
+    def count_of(queryset):
+        counts = queryset.filter(project=OuterRef('pk')).order_by().values('project').annotate(
+            total=Count('pk')
+        ).values('total')
+        return Coalesce(Subquery(counts), 0, output_field=models.PositiveIntegerField())
+
+    counters = {
+        'lots_count': count_of(Lot.objects.all()),
+        'floor_plans_count': count_of(FloorPlan.objects.all()),
+    }
+    for status, field_name in LOT_STATUS_COUNTER_FIELDS.items():
+        counters[field_name] = count_of(Lot.objects.filter(availability_status=status))
+    Project.objects.update(**counters)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0025_projectinquires'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='available_lots_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='coming_soon_lots_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='floor_plans_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='lots_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='move_in_ready_lots_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='reserved_lots_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='sold_lots_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_inventory_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.3 on 2026-10-16 22:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0026_project_inventory_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['project', 'document_type', 'title'], name='document_project_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lot',
+            index=models.Index(fields=['project', 'order', 'lot_number'], name='lot_project_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lot',
+            index=models.Index(fields=['project', 'availability_status', 'order', 'lot_number'], name='lot_project_status_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_featured', True)), fields=['-updated_at', 'id'], name='project_active_featured_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['-updated_at', 'id'], name='project_active_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['city', '-updated_at'], name='project_city_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='projectinquires',
+            index=models.Index(fields=['project', '-created_at'], name='inquiry_project_created_idx'),
+        ),
+    ]
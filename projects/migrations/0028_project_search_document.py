@@ -0,0 +1,117 @@
+# Generated by Django 5.1.3 on 2026-10-16 22:44
+
+import html
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils.html import strip_tags
+
+
+DOCUMENT_TABLE = 'projects_projectsearchdocument'
+FTS_TABLE = 'projects_projectsearchdocument_fts'
+
+POSTGRESQL_INDEX_SQL = [
+    f"""
+    ALTER TABLE {DOCUMENT_TABLE} ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(location, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(body, '')), 'C')
+    ) STORED
+    """,
+    f"CREATE INDEX projects_search_vector_gin ON {DOCUMENT_TABLE} USING gin (search_vector)",
+]
+POSTGRESQL_DROP_SQL = [
+    "DROP INDEX IF EXISTS projects_search_vector_gin",
+    f"ALTER TABLE {DOCUMENT_TABLE} DROP COLUMN IF EXISTS search_vector",
+]
+
+SQLITE_INDEX_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        title, location, body,
+        content='{DOCUMENT_TABLE}', content_rowid='project_id',
+        tokenize='porter unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_insert AFTER INSERT ON {DOCUMENT_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, location, body)
+        VALUES (new.project_id, new.title, new.location, new.body);
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_delete AFTER DELETE ON {DOCUMENT_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, location, body)
+        VALUES ('delete', old.project_id, old.title, old.location, old.body);
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_update AFTER UPDATE ON {DOCUMENT_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, location, body)
+        VALUES ('delete', old.project_id, old.title, old.location, old.body);
+        INSERT INTO {FTS_TABLE}(rowid, title, location, body)
+        VALUES (new.project_id, new.title, new.location, new.body);
+    END
+    """,
+]
+SQLITE_DROP_SQL = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_insert",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_delete",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_update",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = {'postgresql': POSTGRESQL_INDEX_SQL, 'sqlite': SQLITE_INDEX_SQL}.get(vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = {'postgresql': POSTGRESQL_DROP_SQL, 'sqlite': SQLITE_DROP_SQL}.get(vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def populate_search_documents(apps, schema_editor):
+    Project = apps.get_model('projects', 'Project')
+    ProjectSearchDocument = apps.get_model('projects', 'ProjectSearchDocument')
+
+    documents = []
+    for project in Project.objects.select_related('city__state').iterator(chunk_size=500):
+        city, state = project.city, project.city.state
+        location = [project.project_type, project.project_address, city.name, state.name, state.abbreviation]
+        documents.append(ProjectSearchDocument(
+            project_id=project.pk,
+            title=project.name,
+            location=' '.join(part for part in location if part),
+            body=' '.join(html.unescape(strip_tags(project.project_description or '')).split()),
+        ))
+    ProjectSearchDocument.objects.bulk_create(documents, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0027_composite_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectSearchDocument',
+            fields=[
+                ('project', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='projects.project')),
+                ('title', models.TextField(blank=True)),
+                ('location', models.TextField(blank=True)),
+                ('body', models.TextField(blank=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Project Search Documents',
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(populate_search_documents, migrations.RunPython.noop),
+    ]
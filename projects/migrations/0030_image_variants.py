@@ -0,0 +1,28 @@
+# Generated by Django 5.1.3 on 2026-10-16 22:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0029_change_tracking_and_tombstones'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='featurefinish',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Resized copies of the image (projects.images)'),
+        ),
+        migrations.AddField(
+            model_name='lot',
+            name='lot_rendering_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Resized copies of the lot rendering (projects.images)'),
+        ),
+        migrations.AddField(
+            model_name='rendering',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Resized copies of the image (projects.images)'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.3 on 2026-10-16 22:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0030_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='document_metadata',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Size, type, dimensions and SHA-256 of the document'),
+        ),
+        migrations.AddField(
+            model_name='featurefinish',
+            name='image_metadata',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Size, type, dimensions and SHA-256 of the image'),
+        ),
+        migrations.AddField(
+            model_name='floorplan',
+            name='plan_file_metadata',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Size, type, dimensions and SHA-256 of the plan file'),
+        ),
+        migrations.AddField(
+            model_name='lot',
+            name='lot_rendering_metadata',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Size, type, dimensions and SHA-256 of the lot rendering'),
+        ),
+        migrations.AddField(
+            model_name='rendering',
+            name='image_metadata',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Size, type, dimensions and SHA-256 of the image'),
+        ),
+        migrations.AddField(
+            model_name='siteplan',
+            name='file_metadata',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Size, type, dimensions and SHA-256 of the file'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.3 on 2026-10-16 23:02
+
+import projects.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0031_media_metadata'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('name', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Media Blobs',
+            },
+        ),
+        migrations.AlterField(
+            model_name='document',
+            name='document',
+            field=models.FileField(blank=True, null=True, storage=projects.storage.ContentAddressedStorage(), upload_to='documents/'),
+        ),
+        migrations.AlterField(
+            model_name='floorplan',
+            name='plan_file',
+            field=models.FileField(blank=True, help_text='Floor plan file (PDF or image)', null=True, storage=projects.storage.ContentAddressedStorage(), upload_to='floor_plans/'),
+        ),
+        migrations.AlterField(
+            model_name='lot',
+            name='lot_rendering',
+            field=models.FileField(blank=True, help_text='Rendering image for this specific lot', storage=projects.storage.ContentAddressedStorage(), upload_to='lot_renderings/'),
+        ),
+        migrations.AlterField(
+            model_name='rendering',
+            name='image',
+            field=models.FileField(storage=projects.storage.ContentAddressedStorage(), upload_to='renderings/'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-16 23:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0034_upload_sessions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='projectinquires',
+            name='submission_id',
+            field=models.UUIDField(blank=True, editable=False, null=True, unique=True),
+        ),
+    ]
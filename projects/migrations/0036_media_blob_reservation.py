@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-16 23:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0035_inquiry_submission_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediablob',
+            name='reserved_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-16 23:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0036_media_blob_reservation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='projectinquires',
+            name='dedup_key',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.3 on 2026-10-16 23:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0037_inquiry_dedup_key'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='lot',
+            name='lot_project_order_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='lot',
+            name='lot_project_status_order_idx',
+        ),
+        migrations.AddIndex(
+            model_name='lot',
+            index=models.Index(fields=['project', 'order', 'lot_number', 'id'], name='lot_project_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lot',
+            index=models.Index(fields=['project', 'availability_status', 'order', 'lot_number', 'id'], name='lot_project_status_order_idx'),
+        ),
+    ]
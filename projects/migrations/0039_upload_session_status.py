@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-16 23:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0038_lot_index_id_tiebreaker'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadsession',
+            name='status',
+            field=models.CharField(choices=[('receiving', 'Receiving'), ('completing', 'Completing')], default='receiving', max_length=20),
+        ),
+    ]
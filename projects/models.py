@@ -1,25 +1,42 @@
+import uuid
+
+from django.conf import settings
 from django.db import models
+from django.db.models import Count, OuterRef, Prefetch, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from django.utils.text import slugify
 from django.core.validators import MinValueValidator, MaxValueValidator
+from platformb.media import FileCleanupMixin, file_fields, record_file_metadata
+from platformb.utils import next_unique_value, save_with_unique_value
+from .cache import invalidate_projects
+from .events import publish_availability
+from .images import expire_stale_variants, schedule_variants
+from .storage import blob_storage
 
 class SlugMixin:
+    def _slug_queryset(self):
+        queryset = self.__class__._default_manager.all()
+        if self.pk:
+            queryset = queryset.exclude(pk=self.pk)
+        return queryset
+
     def generate_unique_slug(self):
         if not self.name:  # Skip if name is not set
             return
-            
-        base_slug = slugify(self.name)
-        slug = base_slug
-        counter = 1
-        model = self.__class__
-        while model.objects.filter(slug=slug).exclude(id=self.id).exists():
-            slug = f"{base_slug}-{counter}"
-            counter += 1
-        self.slug = slug
+        self.slug = next_unique_value(self._slug_queryset(), 'slug', slugify(self.name))
 
     def save(self, *args, **kwargs):
-        if not self.slug:  # Only generate slug if it's not set
-            self.generate_unique_slug()
-        super().save(*args, **kwargs)
+        if self.slug or not self.name:  # Only generate slug if it's not set
+            return super().save(*args, **kwargs)
+
+        parent_save = super().save
+
+        def save_with_slug(slug):
+            self.slug = slug
+            parent_save(*args, **kwargs)
+
+        save_with_unique_value(self._slug_queryset(), 'slug', slugify(self.name), save_with_slug)
 
 class State(SlugMixin, models.Model):
     name = models.CharField(max_length=100)
@@ -49,11 +66,63 @@ class City(SlugMixin, models.Model):
     def __str__(self):
         return f"{self.name}, {self.state.abbreviation}"
 
-class Rendering(models.Model):
+class MediaQuerySet(models.QuerySet):
+    """
+    QuerySet for models with uploaded files that does the per-row media
+    bookkeeping of save() (file metadata, replaced files, image variants) for
+    bulk_create() and bulk_update(), which bypass signals.
+    """
+
+    def _media_fields(self, attnames):
+        """Bookkeeping fields written along with the file fields `attnames`"""
+        fields = []
+        for attname in attnames:
+            for mapping in (self.model.MEDIA_METADATA_FIELDS, getattr(self.model, 'IMAGE_VARIANT_FIELDS', {})):
+                if attname in mapping:
+                    fields.append(mapping[attname])
+        return fields
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            record_file_metadata(obj)
+        objs = super().bulk_create(objs, *args, **kwargs)
+        for obj in objs:
+            obj.track_file_changes()
+            if obj.pk is not None:
+                schedule_variants(obj)
+        return objs
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        attnames = [field.attname for field in file_fields(self.model) if field.name in fields]
+        if attnames:
+            for obj in objs:
+                record_file_metadata(obj, attnames)
+                expire_stale_variants(obj)
+                # bulk_update() does not run FileField.pre_save(), which stores new uploads
+                for attname in attnames:
+                    obj._meta.get_field(attname).pre_save(obj, add=False)
+            fields = [*fields, *self._media_fields(attnames)]
+        rows = super().bulk_update(objs, fields, *args, **kwargs)
+        if attnames:
+            for obj in objs:
+                obj.track_file_changes(attnames)
+                schedule_variants(obj)
+        return rows
+
+class Rendering(FileCleanupMixin, models.Model):
     title = models.CharField(max_length=200, blank=True, help_text="e.g., Kitchen, Living Room, Exterior")
-    image = models.FileField(upload_to='renderings/')
+    image = models.FileField(upload_to='renderings/', storage=blob_storage)
+    image_metadata = models.JSONField(default=dict, blank=True, editable=False, help_text="Size, type, dimensions and SHA-256 of the image")
+    image_variants = models.JSONField(default=dict, blank=True, editable=False, help_text="Resized copies of the image (projects.images)")
     project = models.ForeignKey('Project', on_delete=models.CASCADE, related_name='renderings')
 
+    MEDIA_METADATA_FIELDS = {'image': 'image_metadata'}
+    IMAGE_VARIANT_FIELDS = {'image': 'image_variants'}
+
+    objects = MediaQuerySet.as_manager()
+
     class Meta:
         ordering = ['title']
         verbose_name_plural = "Renderings"
@@ -61,11 +130,18 @@ class Rendering(models.Model):
     def __str__(self):
         return f"{self.title} - {self.project.name}"
 
-class FeatureFinish(models.Model):
+class FeatureFinish(FileCleanupMixin, models.Model):
     title = models.CharField(max_length=200, blank=True, help_text="e.g., Kitchen Feature")
     image = models.FileField(upload_to='features_finishes/', blank=True, null=True)
+    image_metadata = models.JSONField(default=dict, blank=True, editable=False, help_text="Size, type, dimensions and SHA-256 of the image")
+    image_variants = models.JSONField(default=dict, blank=True, editable=False, help_text="Resized copies of the image (projects.images)")
     project = models.ForeignKey('Project', on_delete=models.CASCADE, related_name='features_finishes')
 
+    MEDIA_METADATA_FIELDS = {'image': 'image_metadata'}
+    IMAGE_VARIANT_FIELDS = {'image': 'image_variants'}
+
+    objects = MediaQuerySet.as_manager()
+
     class Meta:
         ordering = ['title']
         verbose_name_plural = "Features & Finishes"
@@ -73,9 +149,14 @@ class FeatureFinish(models.Model):
     def __str__(self):
         return f"{self.title} - {self.project.name}"
 
-class SitePlan(models.Model):
+class SitePlan(FileCleanupMixin, models.Model):
     project = models.OneToOneField('Project', on_delete=models.CASCADE, related_name='site_plan')
     file = models.FileField(upload_to='site_plans/', blank=True, null=True, help_text="Site plan file (PDF or image)")
+    file_metadata = models.JSONField(default=dict, blank=True, editable=False, help_text="Size, type, dimensions and SHA-256 of the file")
+
+    MEDIA_METADATA_FIELDS = {'file': 'file_metadata'}
+
+    objects = MediaQuerySet.as_manager()
 
     class Meta:
         verbose_name_plural = "Site Plans"
@@ -83,7 +164,116 @@ class SitePlan(models.Model):
     def __str__(self):
         return f"Site Plan - {self.project.name}"
 
-class FloorPlan(models.Model):
+class ChangeTrackingQuerySet(models.QuerySet):
+    """
+    QuerySet that stamps `updated_at` on bulk writes, which skip auto_now, so
+    the delta sync endpoint sees rows changed through update() and
+    bulk_update() too.
+    """
+
+    def update(self, **kwargs):
+        kwargs.setdefault('updated_at', timezone.now())
+        return super().update(**kwargs)
+    update.alters_data = True
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        now = timezone.now()
+        for obj in objs:
+            obj.updated_at = now
+        if 'updated_at' not in fields:
+            fields = [*fields, 'updated_at']
+        return super().bulk_update(objs, fields, *args, **kwargs)
+
+class MediaChangeTrackingQuerySet(MediaQuerySet, ChangeTrackingQuerySet):
+    pass
+
+class AvailabilityTrackingMixin:
+    """
+    Remembers the availability_status a lot / floor plan was loaded with, so
+    save hooks only publish live events for real status changes.
+    """
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_availability_status = instance.__dict__.get('availability_status')
+        return instance
+
+    def availability_changed(self):
+        return getattr(self, '_loaded_availability_status', None) != self.availability_status
+
+    def mark_availability_published(self):
+        self._loaded_availability_status = self.availability_status
+
+class InventoryQuerySet(MediaChangeTrackingQuerySet):
+    """
+    QuerySet for lots and floor plans that keeps the denormalized Project
+    inventory counters, cached project payloads and live availability events
+    in sync for bulk operations, which bypass signals.
+    """
+
+    def _project_ids(self):
+        return set(self.order_by().values_list('project_id', flat=True).distinct())
+
+    def _without_inventory_sync(self):
+        return MediaChangeTrackingQuerySet(model=self.model, query=self.query.chain(), using=self._db)
+
+    @staticmethod
+    def _sync_projects(project_ids):
+        Project.refresh_inventory_counts(project_ids)
+        Project.invalidate_cached_payloads(project_ids)
+
+    def _publish(self, action, objs):
+        publish_availability(
+            self.model.EVENT_KIND, action,
+            [(obj.pk, obj.project_id, obj.availability_status) for obj in objs]
+        )
+        for obj in objs:
+            obj.mark_availability_published()
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        self._sync_projects({obj.project_id for obj in objs})
+        self._publish('created', [obj for obj in objs if obj.pk is not None])
+        return objs
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        # bulk_update() issues one update() per batch; recount once at the end instead
+        rows = self._without_inventory_sync().bulk_update(objs, fields, *args, **kwargs)
+        self._sync_projects({obj.project_id for obj in objs})
+        if 'availability_status' in fields:
+            self._publish('status_changed', [obj for obj in objs if obj.availability_changed()])
+        return rows
+
+    def update(self, **kwargs):
+        status = kwargs.get('availability_status')
+        # Rows whose status is about to change (plain values only, not expressions)
+        changed = []
+        if isinstance(status, str):
+            changed = list(self.exclude(availability_status=status).values_list('pk', 'project_id'))
+        project_ids = self._project_ids()
+        rows = super().update(**kwargs)
+        new_project = kwargs.get('project_id', kwargs.get('project'))
+        if new_project is not None:
+            project_ids.add(getattr(new_project, 'pk', new_project))
+        self._sync_projects(project_ids)
+        publish_availability(
+            self.model.EVENT_KIND, 'status_changed',
+            [(pk, project_id, status) for pk, project_id in changed]
+        )
+        return rows
+    update.alters_data = True
+
+    def delete(self):
+        project_ids = self._project_ids()
+        result = super().delete()
+        self._sync_projects(project_ids)
+        return result
+    delete.alters_data = True
+    delete.queryset_only = True
+
+class FloorPlan(AvailabilityTrackingMixin, FileCleanupMixin, models.Model):
     HOUSE_TYPE_CHOICES = [
         ('Single Family', 'Single Family'),
         ('Townhouse', 'Townhouse'),
@@ -108,16 +298,29 @@ class FloorPlan(models.Model):
     bathrooms = models.DecimalField(max_digits=3, decimal_places=1, validators=[MinValueValidator(0), MaxValueValidator(20)], blank=True, null=True)
     garage_spaces = models.PositiveIntegerField(default=0, help_text="Number of garage spaces", blank=True, null=True)
     availability_status = models.CharField(max_length=20, choices=AVAILABILITY_STATUS_CHOICES, default='Available')
-    plan_file = models.FileField(upload_to='floor_plans/', blank=True, null=True, help_text="Floor plan file (PDF or image)")
+    plan_file = models.FileField(upload_to='floor_plans/', storage=blob_storage, blank=True, null=True, help_text="Floor plan file (PDF or image)")
+    plan_file_metadata = models.JSONField(default=dict, blank=True, editable=False, help_text="Size, type, dimensions and SHA-256 of the plan file")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Prefix of the live availability events (projects.events)
+    EVENT_KIND = 'floor_plan'
+    MEDIA_METADATA_FIELDS = {'plan_file': 'plan_file_metadata'}
+
+    objects = InventoryQuerySet.as_manager()
 
     class Meta:
         ordering = ['name']
         verbose_name_plural = "Floor Plans"
+        indexes = [
+            # Delta sync keyset
+            models.Index(fields=['updated_at', 'id'], name='floorplan_sync_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} - {self.project.name}"
 
-class Lot(models.Model):
+class Lot(AvailabilityTrackingMixin, FileCleanupMixin, models.Model):
     AVAILABILITY_STATUS_CHOICES = [
         ('Available', 'Available'),
         ('Reserved', 'Reserved'),
@@ -134,13 +337,31 @@ class Lot(models.Model):
     price = models.DecimalField(max_digits=12, decimal_places=2, blank=True, null=True)
     est_completion = models.CharField(max_length=100, blank=True, help_text="Estimated completion (e.g., 'Spring 2024', 'Q2 2024')")
     description = models.TextField(blank=True)
-    lot_rendering = models.FileField(upload_to='lot_renderings/', blank=True, help_text="Rendering image for this specific lot")
+    lot_rendering = models.FileField(upload_to='lot_renderings/', storage=blob_storage, blank=True, help_text="Rendering image for this specific lot")
+    lot_rendering_metadata = models.JSONField(default=dict, blank=True, editable=False, help_text="Size, type, dimensions and SHA-256 of the lot rendering")
+    lot_rendering_variants = models.JSONField(default=dict, blank=True, editable=False, help_text="Resized copies of the lot rendering (projects.images)")
     floor_plans = models.ManyToManyField(FloorPlan, blank=True, help_text="Available floor plans for this lot")
     order = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Prefix of the live availability events (projects.events)
+    EVENT_KIND = 'lot'
+    MEDIA_METADATA_FIELDS = {'lot_rendering': 'lot_rendering_metadata'}
+    IMAGE_VARIANT_FIELDS = {'lot_rendering': 'lot_rendering_variants'}
+
+    objects = InventoryQuerySet.as_manager()
 
     class Meta:
         ordering = ['order', 'lot_number']
         verbose_name_plural = "Lots"
+        indexes = [
+            # Project lots in the order of the lot lists (id included for keyset pages), optionally by status
+            models.Index(fields=['project', 'order', 'lot_number', 'id'], name='lot_project_order_idx'),
+            models.Index(fields=['project', 'availability_status', 'order', 'lot_number', 'id'], name='lot_project_status_order_idx'),
+            # Delta sync keyset
+            models.Index(fields=['updated_at', 'id'], name='lot_sync_idx'),
+        ]
 
     def __str__(self):
         return f"Lot {self.lot_number} - {self.project.name}"
@@ -158,7 +379,7 @@ class Lot(models.Model):
         else:
             self.lot_numbers = ''
 
-class Document(models.Model):
+class Document(FileCleanupMixin, models.Model):
     DOCUMENT_TYPE_CHOICES = [
         ('Document', 'Document & Legal'),
         ('Marketing Material', 'Marketing Material'),
@@ -166,12 +387,25 @@ class Document(models.Model):
     
     title = models.CharField(max_length=200, blank=True)
     document_type = models.CharField(max_length=50, choices=DOCUMENT_TYPE_CHOICES, default='Document')
-    document = models.FileField(upload_to='documents/', blank=True, null=True)
+    document = models.FileField(upload_to='documents/', storage=blob_storage, blank=True, null=True)
+    document_metadata = models.JSONField(default=dict, blank=True, editable=False, help_text="Size, type, dimensions and SHA-256 of the document")
     project = models.ForeignKey('Project', on_delete=models.CASCADE, related_name='documents', blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    MEDIA_METADATA_FIELDS = {'document': 'document_metadata'}
+
+    objects = MediaChangeTrackingQuerySet.as_manager()
 
     class Meta:
         verbose_name_plural = "Documents"
         ordering = ['document_type', 'title']
+        indexes = [
+            # Legal / marketing document tabs: filter by project and type, order by title
+            models.Index(fields=['project', 'document_type', 'title'], name='document_project_type_idx'),
+            # Delta sync keyset
+            models.Index(fields=['updated_at', 'id'], name='document_sync_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} ({self.document_type})"
@@ -203,6 +437,51 @@ class Amenity(models.Model):
     def __str__(self):
         return self.name
 
+class ProjectQuerySet(models.QuerySet):
+    # Rich text columns that list responses never render
+    LIST_DEFERRED_FIELDS = (
+        'project_description', 'pricing_details', 'deposit_structure',
+        'commission', 'occupancy', 'aps', 'city__description',
+    )
+
+    def for_list(self):
+        """
+        Lean queryset for ProjectListSerializer: joins the city and skips the
+        large rich text columns. Inventory totals come from the stored counters,
+        so no related rows are loaded.
+        """
+        return self.select_related('city').defer(*self.LIST_DEFERRED_FIELDS)
+
+    def for_detail(self):
+        """
+        Load everything ProjectSerializer renders in a fixed number of queries,
+        independent of how many lots, documents or inquiries a project has.
+        Documents and inquiries are pre-filtered/ordered into to_attr lists.
+        """
+        return self.select_related('city__state', 'site_plan').prefetch_related(
+            'renderings',
+            'features_finishes',
+            'floor_plans',
+            'contacts',
+            'amenities',
+            Prefetch('lots', queryset=Lot.objects.prefetch_related('floor_plans')),
+            Prefetch(
+                'documents',
+                queryset=Document.objects.filter(document_type='Document').order_by('title'),
+                to_attr='legal_documents_list'
+            ),
+            Prefetch(
+                'documents',
+                queryset=Document.objects.filter(document_type='Marketing Material').order_by('title'),
+                to_attr='marketing_documents_list'
+            ),
+            Prefetch(
+                'inquiries',
+                queryset=ProjectInquires.objects.order_by('-created_at'),
+                to_attr='ordered_inquiries'
+            ),
+        )
+
 class Project(SlugMixin, models.Model):
     PROJECT_TYPE_CHOICES = [
         ('Single Family', 'Single Family'),
@@ -214,6 +493,15 @@ class Project(SlugMixin, models.Model):
         ('Other', 'Other'),
     ]
     
+    # Stored counter column for each lot availability status
+    LOT_STATUS_COUNTER_FIELDS = {
+        'Available': 'available_lots_count',
+        'Reserved': 'reserved_lots_count',
+        'Sold': 'sold_lots_count',
+        'Coming Soon': 'coming_soon_lots_count',
+        'Move In Ready': 'move_in_ready_lots_count',
+    }
+
     STATUS_CHOICES = [
         ('Planning', 'Planning Phase'),
         ('Approval', 'Approval Process'),
@@ -253,6 +541,15 @@ class Project(SlugMixin, models.Model):
     
     # Amenities
     amenities = models.ManyToManyField(Amenity, blank=True, help_text="Available amenities for this project")
+
+    # Inventory counters (denormalized, maintained by Lot/FloorPlan hooks)
+    lots_count = models.PositiveIntegerField(default=0, editable=False)
+    available_lots_count = models.PositiveIntegerField(default=0, editable=False)
+    reserved_lots_count = models.PositiveIntegerField(default=0, editable=False)
+    sold_lots_count = models.PositiveIntegerField(default=0, editable=False)
+    coming_soon_lots_count = models.PositiveIntegerField(default=0, editable=False)
+    move_in_ready_lots_count = models.PositiveIntegerField(default=0, editable=False)
+    floor_plans_count = models.PositiveIntegerField(default=0, editable=False)
     
     # Meta Information
     is_featured = models.BooleanField(default=False)
@@ -260,24 +557,87 @@ class Project(SlugMixin, models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ProjectQuerySet.as_manager()
+
     class Meta:
         ordering = ['-updated_at']  # Last updated on top (newest first)
         verbose_name_plural = "Projects"
+        indexes = [
+            # Featured projects, newest first
+            models.Index(
+                fields=['-updated_at', 'id'], name='project_active_featured_idx',
+                condition=Q(is_active=True, is_featured=True)
+            ),
+            # Active project lists (page-number and keyset order)
+            models.Index(fields=['-updated_at', 'id'], name='project_active_updated_idx', condition=Q(is_active=True)),
+            # City project lists
+            models.Index(fields=['city', '-updated_at'], name='project_city_active_idx', condition=Q(is_active=True)),
+            # Delta sync keyset (includes inactive projects)
+            models.Index(fields=['updated_at', 'id'], name='project_sync_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
     @property
     def total_lots(self):
-        return self.lots.count()
+        return self.lots_count
 
     @property
     def available_lots(self):
-        return self.lots.filter(availability_status='Available').count()
+        return self.available_lots_count
 
     @property
     def total_floor_plans(self):
-        return self.floor_plans.count()
+        return self.floor_plans_count
+
+    @classmethod
+    def refresh_inventory_counts(cls, project_ids):
+        """Recompute the stored inventory counters of the given projects in a single UPDATE"""
+        project_ids = {pk for pk in project_ids if pk is not None}
+        if not project_ids:
+            return 0
+
+        def count_of(queryset):
+            counts = queryset.filter(project=OuterRef('pk')).order_by().values('project').annotate(
+                total=Count('pk')
+            ).values('total')
+            return Coalesce(Subquery(counts), 0, output_field=models.PositiveIntegerField())
+
+        counters = {
+            'lots_count': count_of(Lot.objects.all()),
+            'floor_plans_count': count_of(FloorPlan.objects.all()),
+        }
+        for status, field_name in cls.LOT_STATUS_COUNTER_FIELDS.items():
+            counters[field_name] = count_of(Lot.objects.filter(availability_status=status))
+        return cls.objects.filter(pk__in=project_ids).update(**counters)
+
+    @classmethod
+    def invalidate_cached_payloads(cls, project_ids):
+        """Expire the cached detail payloads of the given projects once the transaction commits"""
+        project_ids = {pk for pk in project_ids if pk is not None}
+        if project_ids:
+            invalidate_projects(cls.objects.filter(pk__in=project_ids).values_list('slug', flat=True))
+
+
+class ProjectSearchDocument(models.Model):
+    """
+    Denormalized plain-text search document for a project, maintained by
+    projects.search. The full-text index over it is database specific
+    (tsvector/GIN on PostgreSQL, an FTS5 table on SQLite) and created in
+    migration 0028.
+    """
+    project = models.OneToOneField(Project, on_delete=models.CASCADE, primary_key=True, related_name='search_document')
+    # Weighted from most to least relevant
+    title = models.TextField(blank=True)
+    location = models.TextField(blank=True)
+    body = models.TextField(blank=True)
+
+    class Meta:
+        verbose_name_plural = "Project Search Documents"
+
+    def __str__(self):
+        return f"Search document - {self.title}"
 
 
 class Contact(models.Model):
@@ -286,10 +646,18 @@ class Contact(models.Model):
     email = models.EmailField(blank=True)
     phone = models.CharField(max_length=20, blank=True)
     order = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ChangeTrackingQuerySet.as_manager()
     
     class Meta:
         ordering = ['order', 'name']
         verbose_name_plural = "Contacts"
+        indexes = [
+            # Delta sync keyset
+            models.Index(fields=['updated_at', 'id'], name='contact_sync_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} - {self.project.name}"
@@ -301,12 +669,139 @@ class ProjectInquires(models.Model):
     email = models.EmailField(blank=True)
     phone = models.CharField(max_length=20, blank=True)
     message = models.TextField(blank=True)
+    # Set by projects.inquiry_buffer so replaying a buffer never stores an inquiry twice
+    submission_id = models.UUIDField(unique=True, null=True, blank=True, editable=False)
+    # Same for repeats of a buffered inquiry within INQUIRY_DEDUP_WINDOW, which are stored once
+    dedup_key = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['-created_at']
         verbose_name_plural = "Project Inquiries"
+        indexes = [
+            models.Index(fields=['project', '-created_at'], name='inquiry_project_created_idx'),
+        ]
     
     def __str__(self):
-        return f"{self.name} - {self.project.name}"
\ No newline at end of file
+        return f"{self.name} - {self.project.name}"
+
+
+class DeletedRecord(models.Model):
+    """
+    Tombstone of a deleted project, lot, floor plan, document or contact,
+    served by the delta sync endpoint so replicas can drop the row. Children
+    removed by deleting their project get no tombstone of their own.
+    """
+    RECORD_TYPE_CHOICES = [
+        ('projects', 'Project'),
+        ('lots', 'Lot'),
+        ('floor_plans', 'Floor Plan'),
+        ('documents', 'Document'),
+        ('contacts', 'Contact'),
+    ]
+
+    record_type = models.CharField(max_length=20, choices=RECORD_TYPE_CHOICES)
+    record_id = models.BigIntegerField()
+    # Plain id: the project itself may be gone
+    project_id = models.BigIntegerField(blank=True, null=True)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['deleted_at', 'id']
+        verbose_name_plural = "Deleted Records"
+        indexes = [
+            models.Index(fields=['deleted_at', 'id'], name='deleted_record_sync_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_record_type_display()} {self.record_id} (deleted {self.deleted_at:%Y-%m-%d %H:%M})"
+
+
+class MediaBlob(models.Model):
+    """
+    A stored file shared by every row that uploaded the same content
+    (projects.storage), with the number of rows referencing it. A blob that
+    was just stored for a row not committed yet is reserved until
+    `reserved_until`, and not deleted meanwhile.
+    """
+    name = models.CharField(max_length=255, primary_key=True)
+    ref_count = models.PositiveIntegerField(default=0)
+    reserved_until = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name_plural = "Media Blobs"
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} reference(s))"
+
+
+class DirectUpload(models.Model):
+    """
+    A file a client uploads straight to storage (projects.direct_uploads):
+    issued with a signed upload URL, completed by the storage endpoint and
+    consumed when the file is attached to its row.
+    """
+    TARGET_CHOICES = [
+        ('rendering', 'Rendering'),
+        ('document', 'Document'),
+        ('floor_plan', 'Floor Plan'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    target = models.CharField(max_length=20, choices=TARGET_CHOICES)
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField(help_text="Declared size in bytes; larger bodies are rejected")
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='direct_uploads')
+    # Set by the storage endpoint once the bytes are stored
+    stored_name = models.CharField(max_length=255, blank=True)
+    metadata = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        verbose_name_plural = "Direct Uploads"
+
+    def __str__(self):
+        return f"{self.filename} ({self.get_target_display()})"
+
+    @property
+    def is_expired(self):
+        return self.expires_at <= timezone.now()
+
+
+class UploadSession(models.Model):
+    """
+    A resumable chunked upload (projects.resumable_uploads). The bytes
+    received so far are kept in a part file on disk; its size is the offset.
+    """
+    TARGET_CHOICES = [
+        ('site_plan', 'Site Plan'),
+        ('document', 'Document'),
+        ('floor_plan', 'Floor Plan'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    target = models.CharField(max_length=20, choices=TARGET_CHOICES)
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField(help_text="Size of the complete file in bytes")
+    sha256 = models.CharField(max_length=64, help_text="Checksum the assembled file must match")
+    RECEIVING = 'receiving'
+    COMPLETING = 'completing'
+    STATUS_CHOICES = [
+        (RECEIVING, 'Receiving'),
+        (COMPLETING, 'Completing'),
+    ]
+    # Claimed by the request completing the session while it stores the file
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=RECEIVING)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='upload_sessions')
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Last chunk received; idle sessions expire
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        verbose_name_plural = "Upload Sessions"
+
+    def __str__(self):
+        return f"{self.filename} ({self.get_target_display()})"
@@ -0,0 +1,181 @@
+import base64
+import datetime
+import decimal
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class StandardPageNumberPagination(PageNumberPagination):
+    """The default page-number pagination, with an opt-in `page_size` up to a cap"""
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class KeysetOrPageNumberPagination(BasePagination):
+    """
+    Keyset (cursor) pagination for high-volume lists, with page-number mode kept
+    for backward compatibility.
+
+    Keyset mode is used when the request carries `?cursor=` or
+    `?pagination=cursor`. Pages are selected with a WHERE clause on the view's
+    `keyset_ordering` (e.g. ``('-updated_at', 'id')``), so there is no COUNT(*)
+    and no OFFSET, and the cost stays the same however deep the client pages.
+    The ordering must end in a unique, non-null column; `?ordering=` is ignored
+    in keyset mode.
+    """
+    cursor_query_param = 'cursor'
+    mode_query_param = 'pagination'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    page_number_class = StandardPageNumberPagination
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self):
+        self.page_number_paginator = None
+
+    def use_keyset(self, request):
+        return (
+            self.cursor_query_param in request.query_params
+            or request.query_params.get(self.mode_query_param) == 'cursor'
+        )
+
+    def get_page_size(self, request):
+        page_size = api_settings.PAGE_SIZE
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            pass
+        return max(1, min(page_size, self.max_page_size))
+
+    def get_ordering(self, view):
+        ordering = getattr(view, 'keyset_ordering', None) or ('-pk',)
+        return [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+
+    # Cursor encoding
+
+    @staticmethod
+    def _encode_value(value):
+        if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+            return value.isoformat()
+        if isinstance(value, decimal.Decimal):
+            return str(value)
+        return value
+
+    def encode_cursor(self, position, reverse):
+        payload = json.dumps({'p': [self._encode_value(value) for value in position], 'r': int(reverse)})
+        encoded = base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+        url = replace_query_param(self.base_url, self.cursor_query_param, encoded)
+        return remove_query_param(url, self.page_number_class.page_query_param)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            position, reverse = payload['p'], bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    # Paging
+
+    def _keyset_filter(self, position, reverse):
+        """Rows strictly after `position` in (possibly reversed) keyset order"""
+        condition = Q()
+        equal = Q()
+        for (name, descending), value in zip(self.ordering, position):
+            lookup = 'lt' if descending != reverse else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def _position(self, obj):
+        return [getattr(obj, attname) for attname in self.attnames]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.use_keyset(request):
+            self.page_number_paginator = self.page_number_class()
+            return self.page_number_paginator.paginate_queryset(queryset, request, view)
+
+        self.page_number_paginator = None
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(view)
+        self.attnames = [queryset.model._meta.get_field(name).attname for name, _ in self.ordering]
+        position, reverse = self.decode_cursor(request)
+
+        order_by = [('-' if descending != reverse else '') + name for name, descending in self.ordering]
+        queryset = queryset.order_by(*order_by)
+        if position is not None:
+            try:
+                queryset = queryset.filter(self._keyset_filter(position, reverse))
+            except (TypeError, ValueError, ValidationError):
+                # Values that don't fit their column: a tampered cursor
+                raise NotFound(self.invalid_cursor_message)
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+            has_next, has_previous = position is not None, has_more
+        else:
+            has_next, has_previous = has_more, position is not None
+
+        self.next_position = self._position(rows[-1]) if rows and has_next else None
+        self.previous_position = self._position(rows[0]) if rows and has_previous else None
+        return rows
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position, reverse=False)
+
+    def get_previous_link(self):
+        if self.previous_position is None:
+            return None
+        return self.encode_cursor(self.previous_position, reverse=True)
+
+    def get_paginated_response(self, data):
+        if self.page_number_paginator is not None:
+            return self.page_number_paginator.get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return self.page_number_class().get_paginated_response_schema(schema)
+
+    def get_schema_operation_parameters(self, view):
+        parameters = self.page_number_class().get_schema_operation_parameters(view)
+        parameters.append({
+            'name': self.cursor_query_param,
+            'required': False,
+            'in': 'query',
+            'description': 'Keyset pagination cursor (switches the response to next/previous links).',
+            'schema': {'type': 'string'},
+        })
+        return parameters
+
+    @property
+    def display_page_controls(self):
+        return self.page_number_paginator is not None and self.page_number_paginator.display_page_controls
+
+    def to_html(self):
+        if self.page_number_paginator is not None:
+            return self.page_number_paginator.to_html()
+        return ''
@@ -0,0 +1,211 @@
+"""
+Single-pass decoder for the multipart/JSON payload sent to the project create
+and update endpoints.
+
+The form mixes plain fields, JSON-encoded sub-documents (``floor_plans``,
+``contacts``, ``existing_images``...), indexed fields (``lots[0]``,
+``uploaded_legal_documents_titles[2]``) and repeated file fields
+(``uploaded_images``). ``decode_project_payload`` walks ``request.data`` once,
+groups everything by prefix and index, and only runs ``json.loads`` on a
+sub-document when it is actually read.
+"""
+import json
+import re
+from dataclasses import dataclass, field
+from functools import cached_property
+
+
+# Repeated file fields and the serializer payload key they feed
+RENDERING_FILES_KEY = 'uploaded_images'
+FEATURE_FINISH_FILES_KEY = 'uploaded_features_finishes'
+LEGAL_DOCUMENT_FILES_KEY = 'uploaded_legal_documents'
+MARKETING_DOCUMENT_FILES_KEY = 'uploaded_marketing_documents'
+FILE_LIST_KEYS = {
+    RENDERING_FILES_KEY, FEATURE_FINISH_FILES_KEY,
+    LEGAL_DOCUMENT_FILES_KEY, MARKETING_DOCUMENT_FILES_KEY,
+}
+
+# Fields whose value is a JSON document
+JSON_KEYS = {
+    'lots', 'floor_plans', 'contacts', 'amenity_ids', 'features_finishes_write',
+    'deleted_floor_plan_ids', 'deleted_lot_ids',
+    'existing_images', 'existing_legal_documents', 'existing_marketing_documents',
+    'existing_features_finishes',
+}
+EXISTING_KEYS = (
+    'existing_images', 'existing_legal_documents', 'existing_marketing_documents',
+    'existing_features_finishes',
+)
+
+# lots[0], lots[0].lot_rendering, legacy lots[0.lot_rendering], uploaded_legal_documents_titles[1]
+INDEXED_KEY_RE = re.compile(r'^(?P<prefix>\w+)\[(?P<index>\d+)(?:\.(?P<inner>\w+))?\](?:\.(?P<attr>\w+))?$')
+
+_MISSING = object()
+
+
+def _iter_lists(data):
+    if hasattr(data, 'lists'):
+        return data.lists()
+    return ((key, [value]) for key, value in data.items())
+
+
+@dataclass
+class ProjectPayload:
+    """Grouped view of a project form submission"""
+
+    for_update: bool = False
+    # Plain project fields, passed through to ProjectSerializer
+    fields: dict = field(default_factory=dict)
+    # Raw (still encoded) JSON sub-documents
+    raw_json: dict = field(default_factory=dict)
+    # prefix -> index -> attribute ('' for the indexed value itself) -> value
+    indexed: dict = field(default_factory=dict)
+    # Repeated file fields -> list of uploaded files
+    files: dict = field(default_factory=dict)
+
+    def __post_init__(self):
+        self._decoded = {}
+
+    def json(self, key, default=None):
+        """Decode a JSON sub-document on first access; undecodable values yield `default`"""
+        if key not in self._decoded:
+            raw = self.raw_json.get(key, _MISSING)
+            if raw is _MISSING:
+                value = _MISSING
+            elif isinstance(raw, (str, bytes, bytearray)):
+                try:
+                    value = json.loads(raw)
+                except json.JSONDecodeError:
+                    value = None
+            else:
+                # JSON request bodies already carry decoded lists/objects
+                value = raw
+            self._decoded[key] = value
+        value = self._decoded[key]
+        if value is _MISSING or value is None:
+            return default
+        return value
+
+    def has(self, key):
+        return key in self.raw_json
+
+    def _indexed_items(self, prefix, file_attr):
+        """Rows sent as legacy `prefix[i]` JSON fields, with their `prefix[i].<file_attr>` files"""
+        rows = []
+        for index, parts in sorted(self.indexed.get(prefix, {}).items()):
+            if '' not in parts:
+                continue
+            try:
+                row = json.loads(parts[''])
+            except (TypeError, json.JSONDecodeError):
+                continue
+            if file_attr in parts:
+                row[file_attr] = parts[file_attr]
+            rows.append(row)
+        return rows
+
+    def _items_with_files(self, key, file_attr):
+        rows = self.json(key, [])
+        if rows and isinstance(rows, list):
+            for index, row in enumerate(rows):
+                upload = self.indexed.get(key, {}).get(index, {}).get(file_attr)
+                if upload is not None and isinstance(row, dict):
+                    row[file_attr] = upload
+            return rows
+        # Fall back to individual prefix[index] fields (legacy format)
+        return self._indexed_items(key, file_attr)
+
+    @cached_property
+    def lots(self):
+        return self._items_with_files('lots', 'lot_rendering')
+
+    @cached_property
+    def floor_plans(self):
+        return self._items_with_files('floor_plans', 'plan_file')
+
+    def _titled_documents(self, files_key, document_type):
+        titles = self.indexed.get(f'{files_key}_titles', {})
+        return [
+            {
+                'document': upload,
+                'title': titles.get(index, {}).get('', ''),
+                'document_type': document_type,
+            }
+            for index, upload in enumerate(self.files.get(files_key, []))
+        ]
+
+    @property
+    def uploaded_renderings(self):
+        return [{'image': upload} for upload in self.files.get(RENDERING_FILES_KEY, [])]
+
+    @property
+    def uploaded_features_finishes(self):
+        return [{'image': upload} for upload in self.files.get(FEATURE_FINISH_FILES_KEY, [])]
+
+    @property
+    def uploaded_legal_documents(self):
+        return self._titled_documents(LEGAL_DOCUMENT_FILES_KEY, 'Document')
+
+    @property
+    def uploaded_marketing_documents(self):
+        return self._titled_documents(MARKETING_DOCUMENT_FILES_KEY, 'Marketing Material')
+
+    def existing(self):
+        """Ids of the existing child rows to keep"""
+        if not self.for_update:
+            # Only features & finishes are accepted (and ignored) on create
+            if self.has('existing_features_finishes'):
+                return {'existing_features_finishes': self.json('existing_features_finishes', [])}
+            return {}
+
+        # On update every list defaults to empty; one bad list resets them all
+        values = {}
+        for key in EXISTING_KEYS:
+            value = self.json(key, _MISSING) if self.has(key) else []
+            if value is _MISSING:
+                return {key: [] for key in EXISTING_KEYS}
+            values[key] = value
+        return values
+
+    def to_serializer_data(self):
+        """Build the dict ProjectSerializer expects"""
+        data = dict(self.fields)
+        # ProjectSerializer has no writable lots field (lots are managed through
+        # the lot endpoints), so `lots` is left undecoded here.
+        data['floor_plans'] = self.floor_plans
+        data['contacts'] = self.json('contacts', [])
+        for key in ('amenity_ids', 'features_finishes_write', 'deleted_floor_plan_ids', 'deleted_lot_ids'):
+            if self.has(key):
+                data[key] = self.json(key, [])
+        data['uploaded_renderings'] = self.uploaded_renderings
+        data['uploaded_features_finishes'] = self.uploaded_features_finishes
+        data['uploaded_legal_documents'] = self.uploaded_legal_documents
+        data['uploaded_marketing_documents'] = self.uploaded_marketing_documents
+        data.update(self.existing())
+        return data
+
+
+def decode_project_payload(data, for_update=False):
+    """Group a project form (``request.data``) in a single pass"""
+    payload = ProjectPayload(for_update=for_update)
+    for key, values in _iter_lists(data):
+        if key in FILE_LIST_KEYS:
+            payload.files[key] = list(values)
+            continue
+        value = values[-1] if values else None
+        if key in JSON_KEYS:
+            payload.raw_json[key] = value
+            continue
+        match = INDEXED_KEY_RE.match(key)
+        if match:
+            attr = match.group('inner') or match.group('attr') or ''
+            index = int(match.group('index'))
+            payload.indexed.setdefault(match.group('prefix'), {}).setdefault(index, {})[attr] = value
+            continue
+        if key.startswith('uploaded_'):
+            continue
+        if key == 'city_id':
+            payload.fields['city_id'] = int(value)
+        else:
+            payload.fields[key] = value
+    return payload
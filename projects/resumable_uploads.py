@@ -0,0 +1,215 @@
+"""
+Resumable chunked uploads of large site plans, documents and floor plans.
+
+An UploadSession is opened with the file's name, size and SHA-256. The client
+then PUTs the file in order as byte ranges (``Content-Range: bytes
+<start>-<end>/<size>``); after a dropped connection it reads the session's
+offset and continues from there. The bytes received so far live in a part
+file under CHUNKED_UPLOAD_DIR, whose size is the offset, so sessions survive
+restarts and are shared by every worker.
+
+A chunk's start is checked against the offset before its body is read, and
+the body is received into a temporary file first, so a chunk cut off half-way
+leaves the part file untouched. It is then appended to the part file by the
+kernel (copy_file_range, else sendfile) without passing through Python again,
+under an exclusive lock on the part file that also re-checks the offset, so
+concurrent chunks of one session are appended one at a time. No database
+transaction is open while a chunk is transferred.
+
+Completing the session claims it (status ``completing``) in a short
+transaction, then verifies the checksum and moves the part file into storage
+outside of any transaction, and attaches it to its row in a second short one.
+"""
+import errno
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.utils import timezone
+
+from platformb.media import describe_file
+from .direct_uploads import target_field
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - no file locks on Windows; run a single process there
+    fcntl = None
+
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+CHUNK_SIZE = 64 * 1024
+# Errors meaning the kernel can't copy between these two files; fall back to read/write
+UNSUPPORTED_COPY_ERRORS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP}
+
+
+class ChunkRejected(Exception):
+    """A chunk that does not continue the upload; `offset` is where it should start"""
+
+    def __init__(self, message, offset):
+        super().__init__(message)
+        self.offset = offset
+
+
+def get_upload_dir():
+    return getattr(settings, 'CHUNKED_UPLOAD_DIR', os.path.join(settings.BASE_DIR, '.chunked_uploads'))
+
+
+def get_expiry():
+    return getattr(settings, 'CHUNKED_UPLOAD_EXPIRY', 60 * 60 * 24)
+
+
+def get_max_chunk_size():
+    return getattr(settings, 'CHUNKED_UPLOAD_MAX_CHUNK_SIZE', 16 * 1024 * 1024)
+
+
+def part_path(session):
+    return os.path.join(get_upload_dir(), f'{session.pk}.part')
+
+
+def received_bytes(session):
+    try:
+        return os.path.getsize(part_path(session))
+    except FileNotFoundError:
+        return 0
+
+
+def discard(session):
+    """Remove the part file of a finished or abandoned session"""
+    try:
+        os.remove(part_path(session))
+    except FileNotFoundError:
+        pass
+
+
+def expire_sessions(model):
+    """Delete the sessions (and part files) that received nothing for CHUNKED_UPLOAD_EXPIRY seconds"""
+    expired = model.objects.filter(updated_at__lte=timezone.now() - timedelta(seconds=get_expiry()))
+    for session in expired:
+        discard(session)
+    expired.delete()
+
+
+def parse_content_range(header, size):
+    """(start, length) of a `bytes start-end/size` header for a file of `size` bytes, or None"""
+    match = CONTENT_RANGE_RE.match((header or '').strip())
+    if match is None:
+        return None
+    start, end, total = (int(value) for value in match.groups())
+    if total != size or end < start or end >= size:
+        return None
+    return start, end - start + 1
+
+
+def receive_chunk(stream, length):
+    """Spool `length` bytes of the request body to a temporary file; None when the body is cut short"""
+    os.makedirs(get_upload_dir(), exist_ok=True)
+    spooled = tempfile.TemporaryFile(dir=get_upload_dir())
+    remaining = length
+    while remaining > 0:
+        data = stream.read(min(CHUNK_SIZE, remaining))
+        if not data:
+            spooled.close()
+            return None
+        spooled.write(data)
+        remaining -= len(data)
+    if stream.read(1):
+        # More bytes than the range declared
+        spooled.close()
+        return None
+    spooled.flush()
+    return spooled
+
+
+def _copy_range(src_fd, dst_fd, offset, length):
+    """Copy `length` bytes from the start of src_fd to `offset` in dst_fd inside the kernel"""
+    copied = 0
+    while copied < length:
+        if hasattr(os, 'copy_file_range'):
+            sent = os.copy_file_range(src_fd, dst_fd, length - copied, copied, offset + copied)
+        else:
+            os.lseek(dst_fd, offset + copied, os.SEEK_SET)
+            sent = os.sendfile(dst_fd, src_fd, copied, length - copied)
+        if sent == 0:
+            raise OSError(errno.EIO, 'Chunk ended early')
+        copied += sent
+
+
+def append_chunk(session, chunk, start, length):
+    """
+    Append a spooled chunk at `start` of the part file, under an exclusive lock
+    on it so concurrent chunks of one session are appended one at a time.
+    Raises ChunkRejected when another chunk got there first.
+    """
+    path = part_path(session)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT, 0o600)
+    try:
+        if fcntl is not None:
+            # Released when the file is closed
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        offset = os.fstat(fd).st_size
+        if start != offset:
+            raise ChunkRejected(f'Expected a chunk starting at byte {offset}.', offset)
+        try:
+            try:
+                _copy_range(chunk.fileno(), fd, start, length)
+            except OSError as exc:
+                if exc.errno not in UNSUPPORTED_COPY_ERRORS:
+                    raise
+                os.ftruncate(fd, start)
+                chunk.seek(0)
+                os.lseek(fd, start, os.SEEK_SET)
+                with open(fd, 'wb', closefd=False) as part:
+                    shutil.copyfileobj(chunk, part, CHUNK_SIZE)
+            os.fsync(fd)
+        except BaseException:
+            # Never leave half a chunk behind; the client resends it
+            os.ftruncate(fd, start)
+            raise
+        return start + length
+    finally:
+        os.close(fd)
+
+
+class AssembledFile(File):
+    """A completed part file; file system storages move it into place instead of copying it"""
+
+    def __init__(self, path, name, sha256):
+        super().__init__(open(path, 'rb'), name)
+        self.path = path
+        self.sha256 = sha256
+
+    def temporary_file_path(self):
+        return self.path
+
+
+def file_digest(path):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for data in iter(lambda: fh.read(CHUNK_SIZE), b''):
+            sha256.update(data)
+    return sha256.hexdigest()
+
+
+def store_session(session):
+    """
+    Store the completed part file through the target field's storage; returns
+    the value for the field, carrying the file's metadata.
+    """
+    field = target_field(session.target)
+    path = part_path(session)
+    assembled = AssembledFile(path, session.filename, session.sha256)
+    try:
+        metadata = describe_file(assembled, session.filename, session.size, session.sha256)
+        assembled.seek(0)
+        name = field.storage.save(field.generate_filename(None, session.filename), assembled)
+    finally:
+        assembled.close()
+    # Left in place when the storage already had this content
+    discard(session)
+    file = field.attr_class(None, field, name)
+    file.known_metadata = metadata
+    return file
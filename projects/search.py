@@ -0,0 +1,161 @@
+"""
+Full-text project search.
+
+Every project has a ProjectSearchDocument holding plain text built from its
+name (title), type/address/city/state (location) and its description with the
+HTML stripped (body). The database indexes that document natively:
+
+* PostgreSQL: a generated, weighted ``tsvector`` column with a GIN index,
+  ranked with ``ts_rank_cd``
+* SQLite: an external-content FTS5 table kept in sync by triggers, ranked
+  with ``bm25``
+
+Other backends fall back to ``icontains`` matching on the document, unranked.
+Documents are rebuilt by the Project/City/State save hooks in projects.signals
+and by the ``rebuild_search_index`` management command.
+"""
+import html
+import re
+
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.db.models.expressions import RawSQL
+from django.utils.html import strip_tags
+from rest_framework import filters
+
+from .models import Project, ProjectSearchDocument
+
+
+SEARCH_DOCUMENT_FIELDS = ('title', 'location', 'body')
+# Columns of Project (and its city/state) the document is built from
+SOURCE_FIELDS = (
+    'name', 'project_type', 'project_address', 'project_description',
+    'city__name', 'city__state__name', 'city__state__abbreviation',
+)
+# Relative weights of title/location/body hits for FTS5's bm25()
+FTS5_WEIGHTS = (10.0, 4.0, 1.0)
+MAX_SEARCH_TOKENS = 10
+
+TOKEN_RE = re.compile(r'[^\W_]+')
+
+
+def plain_text(value):
+    """Rich text (TinyMCE HTML) as whitespace-normalized plain text"""
+    if not value:
+        return ''
+    return ' '.join(html.unescape(strip_tags(value)).split())
+
+
+def build_search_document(project):
+    """Unsaved ProjectSearchDocument for a project loaded with its city and state"""
+    city = project.city
+    state = city.state
+    location = [project.project_type, project.project_address, city.name, state.name, state.abbreviation]
+    return ProjectSearchDocument(
+        project_id=project.pk,
+        title=project.name,
+        location=' '.join(part for part in location if part),
+        body=plain_text(project.project_description),
+    )
+
+
+def index_projects(projects, batch_size=500):
+    """
+    Create or refresh the search documents of the given projects (a queryset
+    or an iterable of ids) with one SELECT and one upsert per batch. Returns
+    the number of documents written.
+    """
+    if not isinstance(projects, QuerySet):
+        projects = Project.objects.filter(pk__in=[pk for pk in projects if pk is not None])
+    projects = projects.select_related('city__state').only(*SOURCE_FIELDS).order_by('pk')
+
+    written = 0
+    batch = []
+    for project in projects.iterator(chunk_size=batch_size):
+        batch.append(build_search_document(project))
+        if len(batch) >= batch_size:
+            written += _upsert(batch)
+            batch = []
+    if batch:
+        written += _upsert(batch)
+    return written
+
+
+def _upsert(documents):
+    ProjectSearchDocument.objects.bulk_create(
+        documents,
+        update_conflicts=True,
+        unique_fields=['project'],
+        update_fields=list(SEARCH_DOCUMENT_FIELDS),
+    )
+    return len(documents)
+
+
+def search_tokens(terms):
+    """Lower-cased word tokens of a search string; punctuation and operators are dropped"""
+    return TOKEN_RE.findall(terms.lower())[:MAX_SEARCH_TOKENS]
+
+
+def search_projects(queryset, terms):
+    """
+    Restrict a Project queryset to the projects matching every word of
+    `terms` (each as a prefix, so partial words match while typing) and order
+    them by relevance, best first. Ranked backends annotate `search_rank`.
+    """
+    tokens = search_tokens(terms)
+    if not tokens:
+        return queryset
+
+    vendor = connections[queryset.db].vendor
+    document_table = ProjectSearchDocument._meta.db_table
+    project_table = Project._meta.db_table
+
+    if vendor == 'postgresql':
+        tsquery = ' & '.join(f'{token}:*' for token in tokens)
+        matches = RawSQL(
+            f"SELECT project_id FROM {document_table} "
+            f"WHERE search_vector @@ to_tsquery('english', %s)",
+            (tsquery,)
+        )
+        rank = RawSQL(
+            f"SELECT ts_rank_cd(search_vector, to_tsquery('english', %s)) FROM {document_table} "
+            f"WHERE {document_table}.project_id = {project_table}.id",
+            (tsquery,)
+        )
+    elif vendor == 'sqlite':
+        fts_table = f'{document_table}_fts'
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        weights = ', '.join(str(weight) for weight in FTS5_WEIGHTS)
+        matches = RawSQL(f"SELECT rowid FROM {fts_table} WHERE {fts_table} MATCH %s", (match,))
+        # bm25() is lower-is-better; negate it so higher ranks are better on every backend
+        rank = RawSQL(
+            f"SELECT -bm25({fts_table}, {weights}) FROM {fts_table} "
+            f"WHERE {fts_table} MATCH %s AND rowid = {project_table}.id",
+            (match,)
+        )
+    else:
+        condition = Q()
+        for token in tokens:
+            token_condition = Q()
+            for field_name in SEARCH_DOCUMENT_FIELDS:
+                token_condition |= Q(**{f'search_document__{field_name}__icontains': token})
+            condition &= token_condition
+        return queryset.filter(condition)
+
+    # Ties keep the queryset's own order
+    ordering = queryset.query.order_by or Project._meta.ordering
+    return queryset.filter(pk__in=matches).annotate(search_rank=rank).order_by('-search_rank', *ordering)
+
+
+class ProjectSearchFilter(filters.SearchFilter):
+    """
+    `?search=` backed by the project full-text index instead of chained
+    ``ILIKE '%term%'`` lookups. Results are ordered by relevance unless an
+    explicit `?ordering=` is applied after it.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terms = ' '.join(self.get_search_terms(request))
+        if not terms:
+            return queryset
+        return search_projects(queryset, terms)
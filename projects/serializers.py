@@ -1,11 +1,32 @@
 from rest_framework import serializers
-# from django.db import transaction
+from django.db import transaction
 import json
+import logging
+import os
+from .direct_uploads import check_size, upload_url
+from .resumable_uploads import received_bytes
+from .uploads import store_uploaded_files
+from .images import variant_urls
+from .storage import download_url
 from .models import (
     State, City, Rendering, SitePlan, Lot, FloorPlan,
-    Document, Project, Contact, Amenity, FeatureFinish, ProjectInquires
+    Document, Project, Contact, Amenity, FeatureFinish, ProjectInquires, DirectUpload, UploadSession
 )
 
+logger = logging.getLogger(__name__)
+
+
+def _absolute_variant_urls(serializer, file, record):
+    variants = variant_urls(file, record)
+    request = serializer.context.get('request')
+    if request:
+        variants = {
+            fmt: {width: request.build_absolute_uri(url) for width, url in widths.items()}
+            for fmt, widths in variants.items()
+        }
+    return variants
+
+
 class StateSerializer(serializers.ModelSerializer):
     class Meta:
         model = State
@@ -21,6 +42,8 @@ class CitySerializer(serializers.ModelSerializer):
 
 class RenderingSerializer(serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
+    # Resized copies keyed by format and width, for srcset; image_url is the full-size original
+    image_variants = serializers.SerializerMethodField()
     
     class Meta:
         model = Rendering
@@ -34,12 +57,17 @@ class RenderingSerializer(serializers.ModelSerializer):
         if obj.image:
             request = self.context.get('request')
             if request:
-                return request.build_absolute_uri(obj.image.url)
-            return obj.image.url
+                return request.build_absolute_uri(download_url(obj.image, obj.image_metadata))
+            return download_url(obj.image, obj.image_metadata)
         return None
 
+    def get_image_variants(self, obj):
+        return _absolute_variant_urls(self, obj.image, obj.image_variants)
+
 class FeatureFinishSerializer(serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
+    # Resized copies keyed by format and width, for srcset; image_url is the full-size original
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = FeatureFinish
@@ -53,10 +81,13 @@ class FeatureFinishSerializer(serializers.ModelSerializer):
         if obj.image:
             request = self.context.get('request')
             if request:
-                return request.build_absolute_uri(obj.image.url)
-            return obj.image.url
+                return request.build_absolute_uri(download_url(obj.image, obj.image_metadata))
+            return download_url(obj.image, obj.image_metadata)
         return None
 
+    def get_image_variants(self, obj):
+        return _absolute_variant_urls(self, obj.image, obj.image_variants)
+
 class SitePlanSerializer(serializers.ModelSerializer):
     class Meta:
         model = SitePlan
@@ -76,8 +107,8 @@ class FloorPlanSerializer(serializers.ModelSerializer):
         if obj.plan_file:
             request = self.context.get('request')
             if request:
-                return request.build_absolute_uri(obj.plan_file.url)
-            return obj.plan_file.url
+                return request.build_absolute_uri(download_url(obj.plan_file, obj.plan_file_metadata))
+            return download_url(obj.plan_file, obj.plan_file_metadata)
         return None
 
     def create(self, validated_data):
@@ -98,11 +129,7 @@ class FloorPlanSerializer(serializers.ModelSerializer):
         # Handle explicit file removal
         remove_flag = validated_data.pop('plan_file_remove', False)
         if remove_flag and instance.plan_file:
-            try:
-                instance.plan_file.delete(save=False)
-            except Exception:
-                # ignore storage delete errors; continue with nulling field
-                pass
+            # The file is released and deleted once the update commits (platformb.media)
             instance.plan_file = None
 
         # Normalize empty numeric fields coming as empty strings
@@ -165,6 +192,7 @@ class LotSerializer(serializers.ModelSerializer):
         source='get_lot_numbers_list'
     )
     lot_rendering_url = serializers.SerializerMethodField()
+    lot_rendering_variants = serializers.SerializerMethodField()
     floor_plans = FloorPlanSerializer(many=True, read_only=True)
     # Accept list[int] for JSON, or JSON string for multipart
     floor_plan_ids = FloorPlanIdsFlexibleField(write_only=True, required=False, source='floor_plans')
@@ -186,9 +214,12 @@ class LotSerializer(serializers.ModelSerializer):
         if obj.lot_rendering:
             request = self.context.get('request')
             if request:
-                return request.build_absolute_uri(obj.lot_rendering.url)
-            return obj.lot_rendering.url
+                return request.build_absolute_uri(download_url(obj.lot_rendering, obj.lot_rendering_metadata))
+            return download_url(obj.lot_rendering, obj.lot_rendering_metadata)
         return None
+
+    def get_lot_rendering_variants(self, obj):
+        return _absolute_variant_urls(self, obj.lot_rendering, obj.lot_rendering_variants)
     
     def to_representation(self, instance):
         data = super().to_representation(instance)
@@ -249,11 +280,68 @@ class DocumentSerializer(serializers.ModelSerializer):
         if obj.document:
             request = self.context.get('request')
             if request:
-                return request.build_absolute_uri(obj.document.url)
-            return obj.document.url
+                return request.build_absolute_uri(download_url(obj.document, obj.document_metadata))
+            return download_url(obj.document, obj.document_metadata)
         return None
 
 
+def _clean_filename(value):
+    value = os.path.basename(value.replace('\\', '/')).strip()
+    if not value:
+        raise serializers.ValidationError('A file name is required.')
+    return value
+
+
+class DirectUploadSerializer(serializers.ModelSerializer):
+    """Issues a direct-to-storage upload; the client PUTs the file to upload_url"""
+    upload_url = serializers.SerializerMethodField()
+    method = serializers.SerializerMethodField()
+
+    class Meta:
+        model = DirectUpload
+        fields = ['id', 'target', 'filename', 'size', 'upload_url', 'method', 'expires_at']
+        read_only_fields = ['expires_at']
+
+    def validate_filename(self, value):
+        return _clean_filename(value)
+
+    def validate(self, attrs):
+        check_size(attrs['target'], attrs['size'])
+        return attrs
+
+    def get_upload_url(self, obj):
+        return upload_url(self.context['request'], obj)
+
+    def get_method(self, obj):
+        return 'PUT'
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    """A resumable upload; `offset` is the number of bytes received so far"""
+    offset = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'target', 'filename', 'size', 'sha256', 'offset', 'created_at', 'updated_at']
+        read_only_fields = ['created_at', 'updated_at']
+
+    def validate_filename(self, value):
+        return _clean_filename(value)
+
+    def validate_sha256(self, value):
+        value = value.lower()
+        if len(value) != 64 or any(char not in '0123456789abcdef' for char in value):
+            raise serializers.ValidationError('Expected a hex-encoded SHA-256 digest.')
+        return value
+
+    def validate(self, attrs):
+        check_size(attrs['target'], attrs['size'])
+        return attrs
+
+    def get_offset(self, obj):
+        return received_bytes(obj)
+
+
 class ContactSerializer(serializers.ModelSerializer):
     class Meta:
         model = Contact
@@ -265,10 +353,6 @@ class ContactSerializer(serializers.ModelSerializer):
             'phone': {'required': False, 'allow_blank': True},
             'order': {'required': False},
         }
-    
-    def validate(self, data):
-        print(f"ContactSerializer validate called with data: {data}")
-        return data
 
 class AmenitySerializer(serializers.ModelSerializer):
     class Meta:
@@ -289,29 +373,29 @@ class ProjectSerializer(serializers.ModelSerializer):
     amenities = AmenitySerializer(many=True, read_only=True)
     
     def get_legal_documents(self, obj):
-        legal_docs = obj.documents.filter(document_type='Document').order_by('title')
+        # Use the list pre-filtered by Project.objects.for_detail() when available
+        legal_docs = getattr(obj, 'legal_documents_list', None)
+        if legal_docs is None:
+            legal_docs = obj.documents.filter(document_type='Document').order_by('title')
         return DocumentSerializer(legal_docs, many=True, context=self.context).data
     
     def get_marketing_documents(self, obj):
-        marketing_docs = obj.documents.filter(document_type='Marketing Material').order_by('title')
+        marketing_docs = getattr(obj, 'marketing_documents_list', None)
+        if marketing_docs is None:
+            marketing_docs = obj.documents.filter(document_type='Marketing Material').order_by('title')
         return DocumentSerializer(marketing_docs, many=True, context=self.context).data
     
     def to_representation(self, instance):
-        """Override to debug contacts field"""
+        """Render contacts explicitly, since `contacts` is redeclared below as a write-only list"""
         data = super().to_representation(instance)
-        # Debug: Check if contacts exist
-        try:
-            contacts_count = instance.contacts.count()
-            print(f"Debug: Project {instance.name} has {contacts_count} contacts")
-            data['contacts'] = ContactSerializer(instance.contacts.all(), many=True, context=self.context).data
-        except Exception as e:
-            print(f"Debug: Error getting contacts for {instance.name}: {e}")
-            data['contacts'] = []
+        data['contacts'] = ContactSerializer(instance.contacts.all(), many=True, context=self.context).data
         return data
 
     def get_inquiries(self, obj):
-        inquiries_qs = obj.inquiries.all().order_by('-created_at')
-        return ProjectInquirySerializer(inquiries_qs, many=True, context=self.context).data
+        inquiries = getattr(obj, 'ordered_inquiries', None)
+        if inquiries is None:
+            inquiries = obj.inquiries.all().order_by('-created_at')
+        return ProjectInquirySerializer(inquiries, many=True, context=self.context).data
     
     # Related object serializers
     city = CitySerializer(read_only=True)
@@ -426,7 +510,60 @@ class ProjectSerializer(serializers.ModelSerializer):
             'slug': {'read_only': True},
         }
 
+    # Fields written by bulk_update() for existing child rows
+    FLOOR_PLAN_UPDATE_FIELDS = [
+        'name', 'house_type', 'square_footage', 'bedrooms', 'bathrooms',
+        'garage_spaces', 'availability_status', 'plan_file',
+    ]
+    CONTACT_UPDATE_FIELDS = ['name', 'email', 'phone', 'order']
+
+    @staticmethod
+    def _normalize_floor_plan_data(floor_plan_data):
+        """Coerce the string form values of a new floor plan to model types"""
+        for key, cast in (('square_footage', int), ('bedrooms', int), ('bathrooms', float), ('garage_spaces', int)):
+            value = floor_plan_data.get(key)
+            if value is not None and str(value).strip():
+                floor_plan_data[key] = cast(value)
+            else:
+                floor_plan_data[key] = None
+
+        # Only validate that house_type and availability_status are present (they have defaults)
+        if not floor_plan_data.get('house_type'):
+            floor_plan_data['house_type'] = 'Single Family'
+        if not floor_plan_data.get('availability_status'):
+            floor_plan_data['availability_status'] = 'Available'
+        return floor_plan_data
+
+    # Payload keys holding uploads, and the model they are stored for
+    UPLOAD_MODELS = {
+        'uploaded_renderings': Rendering,
+        'uploaded_site_plan': SitePlan,
+        'floor_plans': FloorPlan,
+        'uploaded_legal_documents': Document,
+        'uploaded_marketing_documents': Document,
+        'uploaded_features_finishes': FeatureFinish,
+    }
+
+    def _store_uploads(self, validated_data):
+        """
+        Write the uploaded files to storage before the rows. The transaction
+        then only writes rows and commits soon after they are stamped, which
+        the delta sync feed relies on (projects.sync).
+        """
+        for key, model in self.UPLOAD_MODELS.items():
+            rows = validated_data.get(key) or []
+            store_uploaded_files(model, [rows] if isinstance(rows, dict) else rows)
+
     def create(self, validated_data):
+        self._store_uploads(validated_data)
+        return self._create(validated_data)
+
+    def update(self, instance, validated_data):
+        self._store_uploads(validated_data)
+        return self._update(instance, validated_data)
+
+    @transaction.atomic
+    def _create(self, validated_data):
         # Extract data
         uploaded_renderings = validated_data.pop('uploaded_renderings', [])
         uploaded_site_plan = validated_data.pop('uploaded_site_plan', {})
@@ -449,79 +586,45 @@ class ProjectSerializer(serializers.ModelSerializer):
         project = Project.objects.create(**validated_data)
         
         # Create renderings
-        for rendering_data in uploaded_renderings:
-            Rendering.objects.create(project=project, **rendering_data)
+        Rendering.objects.bulk_create([
+            Rendering(project=project, **rendering_data) for rendering_data in uploaded_renderings
+        ])
         
         # Create site plan
         if uploaded_site_plan:
             SitePlan.objects.create(project=project, **uploaded_site_plan)
         
-        # Create floor plans first
-        created_floor_plans = {}
+        # Create floor plans
+        new_floor_plans = []
         for floor_plan_data in floor_plans_data:
             try:
-                # Handle file uploads - extract files from the request
-                plan_file = floor_plan_data.pop('plan_file', None)
                 floor_plan_data.pop('existing_plan_file', None)
-                
-                # Convert string numbers to appropriate types (only if not empty)
-                if floor_plan_data.get('square_footage') and floor_plan_data['square_footage'].strip():
-                    floor_plan_data['square_footage'] = int(floor_plan_data['square_footage'])
-                else:
-                    floor_plan_data['square_footage'] = None
-                if floor_plan_data.get('bedrooms') and floor_plan_data['bedrooms'].strip():
-                    floor_plan_data['bedrooms'] = int(floor_plan_data['bedrooms'])
-                else:
-                    floor_plan_data['bedrooms'] = None
-                if floor_plan_data.get('bathrooms') and floor_plan_data['bathrooms'].strip():
-                    floor_plan_data['bathrooms'] = float(floor_plan_data['bathrooms'])
-                else:
-                    floor_plan_data['bathrooms'] = None
-                if floor_plan_data.get('garage_spaces') and floor_plan_data['garage_spaces'].strip():
-                    floor_plan_data['garage_spaces'] = int(floor_plan_data['garage_spaces'])
-                else:
-                    floor_plan_data['garage_spaces'] = None
-
-                # Only validate that house_type and availability_status are present (they have defaults)
-                if not floor_plan_data.get('house_type'):
-                    floor_plan_data['house_type'] = 'Single Family'
-                if not floor_plan_data.get('availability_status'):
-                    floor_plan_data['availability_status'] = 'Available'
-                
-                # Handle file for new floor plan
-                if plan_file:
-                    floor_plan_data['plan_file'] = plan_file
-                
-                floor_plan = FloorPlan.objects.create(project=project, **floor_plan_data)
-                created_floor_plans[floor_plan.id] = floor_plan
+                new_floor_plans.append(FloorPlan(project=project, **self._normalize_floor_plan_data(floor_plan_data)))
             except Exception as e:
-                import logging
-                logging.error(f"Error creating floor plan: {e}")
+                logger.error(f"Error creating floor plan: {e}")
                 raise serializers.ValidationError(f"Error creating floor plan: {e}")
+        FloorPlan.objects.bulk_create(new_floor_plans)
         
-        # Create legal documents
-        for document_data in uploaded_legal_documents:
-            Document.objects.create(project=project, **document_data)
-        
-        # Create marketing documents
-        for document_data in uploaded_marketing_documents:
-            Document.objects.create(project=project, **document_data)
+        # Create legal and marketing documents
+        Document.objects.bulk_create([
+            Document(project=project, **document_data)
+            for document_data in uploaded_legal_documents + uploaded_marketing_documents
+        ])
         
         # Create contacts
-        for contact_data in contacts_data:
-            Contact.objects.create(project=project, **contact_data)
+        Contact.objects.bulk_create([Contact(project=project, **contact_data) for contact_data in contacts_data])
         
         # Set amenities
         if amenity_ids:
             project.amenities.set(amenity_ids)
         
         # Create features & finishes (images)
-        for ff in uploaded_features_finishes:
-            FeatureFinish.objects.create(project=project, **ff)
+        FeatureFinish.objects.bulk_create([FeatureFinish(project=project, **ff) for ff in uploaded_features_finishes])
         
         return project
 
-    def update(self, instance, validated_data):
+    @transaction.atomic
+    def _update(self, instance, validated_data):
         # Extract data
         uploaded_renderings = validated_data.pop('uploaded_renderings', [])
         uploaded_site_plan = validated_data.pop('uploaded_site_plan', {})
@@ -551,8 +654,9 @@ class ProjectSerializer(serializers.ModelSerializer):
             instance.renderings.exclude(id__in=existing_images).delete()
         
         # Add new renderings
-        for rendering_data in uploaded_renderings:
-            Rendering.objects.create(project=instance, **rendering_data)
+        Rendering.objects.bulk_create([
+            Rendering(project=instance, **rendering_data) for rendering_data in uploaded_renderings
+        ])
         
         # Handle site plan
         if uploaded_site_plan:
@@ -561,9 +665,17 @@ class ProjectSerializer(serializers.ModelSerializer):
                 defaults=uploaded_site_plan
             )
         
-        # Handle floor plans (both existing and new)
-        existing_floor_plan_ids = set()
-        newly_created_floor_plan_ids = set()
+        # Handle floor plans (both existing and new) against one fetch of the
+        # project's current floor plans, keyed by id and by name
+        floor_plans_by_id = {}
+        floor_plans_by_name = {}
+        for floor_plan in instance.floor_plans.order_by('pk'):
+            floor_plans_by_id[floor_plan.pk] = floor_plan
+            if floor_plan.name:
+                floor_plans_by_name.setdefault(floor_plan.name, floor_plan)
+
+        floor_plans_to_update = {}
+        floor_plans_to_create = []
         for plan_data in floor_plans_data:
             plan_id = plan_data.get('id')
             
@@ -573,7 +685,9 @@ class ProjectSerializer(serializers.ModelSerializer):
             
             if plan_id:
                 try:
-                    floor_plan = FloorPlan.objects.get(id=plan_id, project=instance)
+                    floor_plan = floor_plans_by_id.get(int(plan_id))
+                    if floor_plan is None:
+                        raise FloorPlan.DoesNotExist('FloorPlan matching query does not exist.')
                     for attr, value in plan_data.items():
                         if attr != 'id' and hasattr(floor_plan, attr):
                             if attr in ['square_footage', 'bedrooms', 'garage_spaces'] and value and str(value).strip():
@@ -591,111 +705,93 @@ class ProjectSerializer(serializers.ModelSerializer):
                         # Keep existing file
                         pass
                     elif plan_data.get('plan_file') and plan_data['plan_file'].get('markedForDeletion'):
-                        # Remove the file if marked for deletion
-                        if floor_plan.plan_file:
-                            floor_plan.plan_file.delete(save=False)
+                        # Remove the file if marked for deletion (deleted once the update commits)
                         floor_plan.plan_file = None
                     
-                    floor_plan.save()
-                    existing_floor_plan_ids.add(plan_id)
+                    floor_plans_to_update[floor_plan.pk] = floor_plan
                 except Exception as e:
-                    import logging
-                    logging.error(f"Error updating floor plan: {e}")
+                    logger.error(f"Error updating floor plan: {e}")
                     raise serializers.ValidationError(f"Error updating floor plan: {e}")
             else:
                 try:
-                    # Convert string numbers to appropriate types (only if not empty)
-                    if plan_data.get('square_footage') and plan_data['square_footage'].strip():
-                        plan_data['square_footage'] = int(plan_data['square_footage'])
-                    else:
-                        plan_data['square_footage'] = None
-                    if plan_data.get('bedrooms') and plan_data['bedrooms'].strip():
-                        plan_data['bedrooms'] = int(plan_data['bedrooms'])
-                    else:
-                        plan_data['bedrooms'] = None
-                    if plan_data.get('bathrooms') and plan_data['bathrooms'].strip():
-                        plan_data['bathrooms'] = float(plan_data['bathrooms'])
-                    else:
-                        plan_data['bathrooms'] = None
-                    if plan_data.get('garage_spaces') and plan_data['garage_spaces'].strip():
-                        plan_data['garage_spaces'] = int(plan_data['garage_spaces'])
-                    else:
-                        plan_data['garage_spaces'] = None
-                    # Only validate that house_type and availability_status are present (they have defaults)
-                    if not plan_data.get('house_type'):
-                        plan_data['house_type'] = 'Single Family'
-                    if not plan_data.get('availability_status'):
-                        plan_data['availability_status'] = 'Available'
+                    plan_data = self._normalize_floor_plan_data(plan_data)
                     
                     # Handle file for new floor plan
                     if plan_file:
                         plan_data['plan_file'] = plan_file
 
                     # De-duplication: if a floor plan with same name already exists for this project, update it
-                    existing_by_name = None
-                    name_value = plan_data.get('name')
-                    if name_value:
-                        existing_by_name = FloorPlan.objects.filter(project=instance, name=name_value).first()
+                    existing_by_name = floor_plans_by_name.get(plan_data.get('name')) if plan_data.get('name') else None
 
                     if existing_by_name:
                         for attr, value in plan_data.items():
                             if hasattr(existing_by_name, attr):
                                 setattr(existing_by_name, attr, value)
-                        existing_by_name.save()
-                        newly_created_floor_plan_ids.add(existing_by_name.id)
+                        if existing_by_name.pk:
+                            floor_plans_to_update[existing_by_name.pk] = existing_by_name
                     else:
-                        new_floor_plan = FloorPlan.objects.create(project=instance, **plan_data)
-                        newly_created_floor_plan_ids.add(new_floor_plan.id)
+                        new_floor_plan = FloorPlan(project=instance, **plan_data)
+                        floor_plans_to_create.append(new_floor_plan)
+                        if new_floor_plan.name:
+                            floor_plans_by_name[new_floor_plan.name] = new_floor_plan
                 except Exception as e:
-                    import logging
-                    logging.error(f"Error creating floor plan: {e}")
+                    logger.error(f"Error creating floor plan: {e}")
                     raise serializers.ValidationError(f"Error creating floor plan: {e}")
+
+        if floor_plans_to_update:
+            floor_plans_to_update = list(floor_plans_to_update.values())
+            FloorPlan.objects.bulk_update(floor_plans_to_update, self.FLOOR_PLAN_UPDATE_FIELDS)
+        FloorPlan.objects.bulk_create(floor_plans_to_create)
+
         # Only delete floor plans explicitly requested for deletion
         if deleted_floor_plan_ids:
             instance.floor_plans.filter(id__in=deleted_floor_plan_ids).delete()
         
-
-        
-        # Handle legal documents - delete removed ones and add new ones
+        # Handle legal documents - delete removed ones
         if existing_legal_documents is not None:
             # Delete legal documents that are not in the existing_legal_documents list
             instance.documents.filter(document_type='Document').exclude(id__in=existing_legal_documents).delete()
         
-        # Add new legal documents
-        for document_data in uploaded_legal_documents:
-            Document.objects.create(project=instance, **document_data)
-        
-        # Handle marketing documents - delete removed ones and add new ones
+        # Handle marketing documents - delete removed ones
         if existing_marketing_documents is not None:
             # Delete marketing documents that are not in the existing_marketing_documents list
             instance.documents.filter(document_type='Marketing Material').exclude(id__in=existing_marketing_documents).delete()
         
-        # Add new marketing documents
-        for document_data in uploaded_marketing_documents:
-            Document.objects.create(project=instance, **document_data)
+        # Add new legal and marketing documents
+        Document.objects.bulk_create([
+            Document(project=instance, **document_data)
+            for document_data in uploaded_legal_documents + uploaded_marketing_documents
+        ])
         
-        # Handle contacts (both existing and new)
-        existing_contact_ids = set()
+        # Handle contacts (both existing and new) against one fetch of the current contacts
+        contacts_by_id = {contact.pk: contact for contact in instance.contacts.all()}
+        contacts_to_update = {}
+        contacts_to_create = []
         for contact_data in contacts_data:
             contact_id = contact_data.get('id')
             if contact_id:
                 # Update existing contact
                 try:
-                    contact = Contact.objects.get(id=contact_id, project=instance)
-                    for attr, value in contact_data.items():
-                        if attr != 'id' and hasattr(contact, attr):
-                            setattr(contact, attr, value)
-                    contact.save()
-                    existing_contact_ids.add(contact_id)
-                except Contact.DoesNotExist:
+                    contact = contacts_by_id.get(int(contact_id))
+                except (TypeError, ValueError):
+                    contact = None
+                if contact is None:
                     continue
+                for attr, value in contact_data.items():
+                    if attr != 'id' and hasattr(contact, attr):
+                        setattr(contact, attr, value)
+                contacts_to_update[contact.pk] = contact
             else:
                 # Create new contact
-                contact = Contact.objects.create(project=instance, **contact_data)
-                existing_contact_ids.add(contact.id)
-        
+                contacts_to_create.append(Contact(project=instance, **contact_data))
+
+        if contacts_to_update:
+            Contact.objects.bulk_update(list(contacts_to_update.values()), self.CONTACT_UPDATE_FIELDS)
+        Contact.objects.bulk_create(contacts_to_create)
+
         # Delete contacts that are no longer in the data
-        instance.contacts.exclude(id__in=existing_contact_ids).delete()
+        kept_contact_ids = set(contacts_to_update) | {contact.pk for contact in contacts_to_create}
+        instance.contacts.exclude(id__in=kept_contact_ids).delete()
         
         # Set amenities
         if amenity_ids is not None:
@@ -706,17 +802,17 @@ class ProjectSerializer(serializers.ModelSerializer):
             instance.features_finishes.exclude(id__in=existing_features_finishes).delete()
         
         # Add newly uploaded features & finishes
-        for ff in uploaded_features_finishes:
-            FeatureFinish.objects.create(project=instance, **ff)
+        FeatureFinish.objects.bulk_create([FeatureFinish(project=instance, **ff) for ff in uploaded_features_finishes])
         
         return instance
 
 # Simplified serializers for list views
 class ProjectListSerializer(serializers.ModelSerializer):
     city_name = serializers.CharField(source='city.name', read_only=True)
-    total_lots = serializers.IntegerField(read_only=True)
-    available_lots = serializers.IntegerField(read_only=True)
-    total_floor_plans = serializers.IntegerField(read_only=True)
+    # Stored counters, so list pages don't issue COUNT queries per project
+    total_lots = serializers.IntegerField(source='lots_count', read_only=True)
+    available_lots = serializers.IntegerField(source='available_lots_count', read_only=True)
+    total_floor_plans = serializers.IntegerField(source='floor_plans_count', read_only=True)
     
     class Meta:
         model = Project
@@ -757,4 +853,45 @@ class LotListSerializer(serializers.ModelSerializer):
 class ProjectInquirySerializer(serializers.ModelSerializer):
     class Meta:
         model = ProjectInquires
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+class InquirySubmissionSerializer(serializers.ModelSerializer):
+    """
+    Validates a public inquiry for projects.inquiry_buffer without querying
+    the database; the view checks the project.
+    """
+    project = serializers.IntegerField(required=False, allow_null=True)
+
+    class Meta:
+        model = ProjectInquires
+        fields = ['project', 'name', 'email', 'phone', 'message']
+
+# Flat serializers for the delta sync endpoint (related rows as ids)
+class ProjectSyncSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Project
+        # Inventory counters change without touching updated_at; replicas derive them from lots
+        exclude = [
+            'lots_count', 'available_lots_count', 'reserved_lots_count', 'sold_lots_count',
+            'coming_soon_lots_count', 'move_in_ready_lots_count', 'floor_plans_count',
+        ]
+
+class LotSyncSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Lot
+        fields = '__all__'
+
+class FloorPlanSyncSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = FloorPlan
+        fields = '__all__'
+
+class DocumentSyncSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Document
+        fields = '__all__'
+
+class ContactSyncSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Contact
+        fields = '__all__'
@@ -1,58 +1,265 @@
-import os
-from django.db.models.signals import post_delete
+from django.conf import settings
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
 from django.dispatch import receiver
-from .models import Rendering, Document, FloorPlan, Lot
+from platformb.media import connect_file_cleanup, record_file_metadata
+from .cache import invalidate_catalog, invalidate_projects
+from .events import publish_availability
+from .images import delete_variants, expire_stale_variants, schedule_variants
+from .models import (
+    Rendering, Document, FloorPlan, Lot, Project, City, State, Amenity,
+    FeatureFinish, Contact, SitePlan, ProjectInquires, DeletedRecord
+)
+from .search import index_projects
+from .tasks import notify_inquiry_contacts
 
 
-@receiver(post_delete, sender=Rendering)
-def delete_rendering_file(sender, instance, **kwargs):
+# Uploaded files are removed after commit, off the request thread (platformb.media)
+connect_file_cleanup(Rendering, Document, FloorPlan, Lot, FeatureFinish, SitePlan)
+
+
+@receiver(pre_save, sender=Rendering)
+@receiver(pre_save, sender=FeatureFinish)
+@receiver(pre_save, sender=FloorPlan)
+@receiver(pre_save, sender=Document)
+@receiver(pre_save, sender=SitePlan)
+@receiver(pre_save, sender=Lot)
+def record_media_metadata(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Store size, type, dimensions and hash of new uploads (before they are written to storage).
+    """
+    if not raw:
+        record_file_metadata(instance, update_fields)
+
+
+@receiver(pre_save, sender=Rendering)
+@receiver(pre_save, sender=FeatureFinish)
+@receiver(pre_save, sender=Lot)
+def expire_image_variants(sender, instance, raw=False, **kwargs):
+    """
+    Drop the resized variants of an image that is being replaced or cleared.
+    """
+    if not raw:
+        expire_stale_variants(instance)
+
+
+@receiver(post_save, sender=Rendering)
+@receiver(post_save, sender=FeatureFinish)
+@receiver(post_save, sender=Lot)
+def generate_image_variants(sender, instance, raw=False, **kwargs):
     """
-    Delete the file from filesystem when a Rendering instance is deleted.
+    Render resized variants of a new image off the request path.
     """
-    if instance.image:
-        try:
-            if os.path.isfile(instance.image.path):
-                os.remove(instance.image.path)
-        except (ValueError, OSError):
-            # ValueError: if image.path doesn't exist
-            # OSError: if file doesn't exist or can't be deleted
-            pass
+    if not raw:
+        schedule_variants(instance)
 
 
-@receiver(post_delete, sender=Document)
-def delete_document_file(sender, instance, **kwargs):
+@receiver(post_delete, sender=Rendering)
+@receiver(post_delete, sender=FeatureFinish)
+@receiver(post_delete, sender=Lot)
+def delete_image_variants(sender, instance, **kwargs):
     """
-    Delete the file from filesystem when a Document instance is deleted.
+    Remove the resized variants along with the original image.
     """
-    if instance.document:
-        try:
-            if os.path.isfile(instance.document.path):
-                os.remove(instance.document.path)
-        except (ValueError, OSError):
-            pass
+    delete_variants(instance)
 
 
+@receiver(post_save, sender=Lot)
+@receiver(post_delete, sender=Lot)
+@receiver(post_save, sender=FloorPlan)
 @receiver(post_delete, sender=FloorPlan)
-def delete_floor_plan_file(sender, instance, **kwargs):
+def refresh_project_inventory_counts(sender, instance, origin=None, **kwargs):
+    """
+    Keep the denormalized Project inventory counters in sync when a single
+    lot or floor plan is saved or deleted.
+    """
+    # Queryset deletes recount once in InventoryQuerySet.delete(), and cascades
+    # from a deleted project/city/state have nothing left to count.
+    if origin is not None and origin is not instance:
+        return
+    # A lot moved to another project leaves the old one a lot short
+    Project.refresh_inventory_counts([instance.project_id, getattr(instance, '_previous_project_id', None)])
+
+
+@receiver(post_save, sender=Project)
+def refresh_project_search_document(sender, instance, raw=False, **kwargs):
+    """
+    Rebuild the project's full-text search document after it is saved.
+    """
+    if raw:
+        return
+    index_projects([instance.pk])
+
+
+@receiver(post_save, sender=City)
+@receiver(post_save, sender=State)
+def refresh_location_search_documents(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    City and state names are part of every project's search document, so
+    re-index the projects located in a city or state when it is renamed.
+    """
+    if raw or kwargs.get('created'):
+        return
+    if update_fields is not None and not {'name', 'abbreviation'} & set(update_fields):
+        return
+    if sender is City:
+        projects = Project.objects.filter(city=instance)
+    else:
+        projects = Project.objects.filter(city__state=instance)
+    index_projects(projects)
+
+
+@receiver(pre_save, sender=Project)
+def remember_previous_slug(sender, instance, raw=False, **kwargs):
+    """
+    Keep the stored slug so a renamed project's old cache entry is expired too.
+    """
+    if raw or instance.pk is None:
+        return
+    instance._previous_slug = Project.objects.filter(pk=instance.pk).values_list('slug', flat=True).first()
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+def invalidate_project_payload(sender, instance, **kwargs):
+    """
+    Expire the cached detail payload of a saved or deleted project.
+    """
+    invalidate_projects([instance.slug, getattr(instance, '_previous_slug', None)])
+
+
+PROJECT_CHILD_MODELS = (Lot, FloorPlan, Rendering, Document, FeatureFinish, Contact, SitePlan, ProjectInquires)
+
+
+def remember_previous_project(sender, instance, raw=False, update_fields=None, **kwargs):
     """
-    Delete the file from filesystem when a FloorPlan instance is deleted.
+    Keep the stored project of a child row, so moving the row to another
+    project refreshes the project it leaves too.
     """
-    if instance.plan_file:
-        try:
-            if os.path.isfile(instance.plan_file.path):
-                os.remove(instance.plan_file.path)
-        except (ValueError, OSError):
-            pass
+    if raw or instance.pk is None:
+        return
+    if update_fields is not None and not {'project', 'project_id'} & set(update_fields):
+        return
+    instance._previous_project_id = (
+        sender._default_manager.filter(pk=instance.pk).values_list('project_id', flat=True).first()
+    )
+
+
+def invalidate_parent_project_payload(sender, instance, origin=None, **kwargs):
+    """
+    Expire the cached detail payload of the project a child row belongs to.
+    """
+    # Cascades from a deleted project invalidate through the project itself, and
+    # queryset deletes/updates through InventoryQuerySet or the project save
+    # that performs them.
+    if origin is not None and origin is not instance:
+        return
+    Project.invalidate_cached_payloads([instance.project_id, getattr(instance, '_previous_project_id', None)])
+
+
+for child_model in PROJECT_CHILD_MODELS:
+    pre_save.connect(remember_previous_project, sender=child_model)
+    post_save.connect(invalidate_parent_project_payload, sender=child_model)
+    post_delete.connect(invalidate_parent_project_payload, sender=child_model)
+
+
+@receiver(m2m_changed, sender=Project.amenities.through)
+def invalidate_project_amenities(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Expire cached payloads when amenities are added to or removed from projects.
+    """
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        invalidate_projects([instance.slug])
+    elif pk_set is None:
+        # amenity.project_set.clear(): the affected projects are no longer known
+        invalidate_catalog()
+    else:
+        Project.invalidate_cached_payloads(pk_set)
+
+
+@receiver(m2m_changed, sender=Lot.floor_plans.through)
+def invalidate_lot_floor_plans(sender, instance, action, **kwargs):
+    """
+    Expire the cached payload when a lot's floor plan links change.
+    """
+    if action.startswith('post_'):
+        Project.invalidate_cached_payloads([instance.project_id])
+
+
+@receiver(post_save, sender=City)
+@receiver(post_delete, sender=City)
+@receiver(post_save, sender=State)
+@receiver(post_delete, sender=State)
+@receiver(post_save, sender=Amenity)
+@receiver(post_delete, sender=Amenity)
+def invalidate_catalog_payloads(sender, instance, **kwargs):
+    """
+    Cities, states and amenities are embedded in many project payloads.
+    """
+    invalidate_catalog()
+
+
+SYNC_RECORD_TYPES = {
+    Project: 'projects',
+    Lot: 'lots',
+    FloorPlan: 'floor_plans',
+    Document: 'documents',
+    Contact: 'contacts',
+}
+
+
+def record_deletion(sender, instance, origin=None, **kwargs):
+    """
+    Leave a tombstone for the delta sync feed.
+    """
+    # Replicas drop a deleted project's children along with it
+    if isinstance(origin, Project) and origin is not instance:
+        return
+    DeletedRecord.objects.create(
+        record_type=SYNC_RECORD_TYPES[sender],
+        record_id=instance.pk,
+        project_id=instance.pk if sender is Project else instance.project_id,
+    )
+
+
+for sync_model in SYNC_RECORD_TYPES:
+    post_delete.connect(record_deletion, sender=sync_model)
+
+
+@receiver(post_save, sender=Lot)
+@receiver(post_save, sender=FloorPlan)
+def publish_availability_change(sender, instance, created, raw=False, **kwargs):
+    """
+    Push lot / floor plan availability to live subscribers once committed.
+    """
+    if raw:
+        return
+    if created:
+        action = 'created'
+    elif instance.availability_changed():
+        action = 'status_changed'
+    else:
+        return
+    instance.mark_availability_published()
+    publish_availability(sender.EVENT_KIND, action, [(instance.pk, instance.project_id, instance.availability_status)])
 
 
 @receiver(post_delete, sender=Lot)
-def delete_lot_rendering_file(sender, instance, **kwargs):
+@receiver(post_delete, sender=FloorPlan)
+def publish_availability_removal(sender, instance, origin=None, **kwargs):
+    """
+    Tell live subscribers a lot / floor plan is gone (not for whole-project deletes).
+    """
+    if isinstance(origin, Project):
+        return
+    publish_availability(sender.EVENT_KIND, 'deleted', [(instance.pk, instance.project_id, instance.availability_status)])
+
+
+@receiver(post_save, sender=ProjectInquires)
+def queue_inquiry_notification(sender, instance, created, raw=False, **kwargs):
     """
-    Delete the file from filesystem when a Lot instance is deleted.
+    Email new inquiries to the project's contacts from a background job.
     """
-    if instance.lot_rendering:
-        try:
-            if os.path.isfile(instance.lot_rendering.path):
-                os.remove(instance.lot_rendering.path)
-        except (ValueError, OSError):
-            pass
+    if created and not raw and getattr(settings, 'INQUIRY_NOTIFICATIONS', False):
+        notify_inquiry_contacts.enqueue(inquiry_id=instance.pk)
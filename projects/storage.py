@@ -0,0 +1,146 @@
+"""
+Content-addressed storage for project media.
+
+Uploads to the FileFields using ``blob_storage`` are stored once per distinct
+content, as ``blobs/<sha256[:2]>/<sha256><ext>``, whatever field, project or
+file name they were uploaded under. Uploading content that is already stored
+only returns the existing name; nothing is written again.
+
+MediaBlob rows count how many rows reference each blob. The counts are kept
+by the file hooks of platformb.media (retain() when a row gains a file,
+release() when it drops it), and delete() leaves a blob (and the resized
+variants made from it) in place while anything still references it. Rows must
+therefore drop files by clearing the field or being deleted, never with
+FieldFile.delete(): that would be refused while the row's own reference is
+counted, and the reference would never be released.
+
+Blob names drop the name a file was uploaded under; it is kept as `filename`
+in the row's media metadata, and download_url() passes it to serve_media so
+downloads are saved under it (Content-Disposition).
+
+Storing content reserves its blob for MEDIA_BLOB_RESERVATION seconds first,
+since the row that will reference it commits (and retains it) later. delete()
+decides under a lock on the blob's MediaBlob row, so a blob reused meanwhile is
+either seen as reserved and kept, or deleted before the reservation, in which
+case storing it writes the file again. Blobs whose reservation outlived every
+reference are left to collect_orphaned_media.
+"""
+import hashlib
+import os
+from collections import Counter
+from datetime import timedelta
+from urllib.parse import urlencode
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+
+from .images import VARIANTS_ROOT
+
+BLOB_ROOT = 'blobs'
+
+
+def get_reservation():
+    return getattr(settings, 'MEDIA_BLOB_RESERVATION', 60 * 60 * 24)
+
+
+def blob_name(digest, original_name):
+    extension = os.path.splitext(original_name)[1].lower()
+    return f'{BLOB_ROOT}/{digest[:2]}/{digest}{extension}'
+
+
+def download_url(file, metadata):
+    """URL of a stored file, asking for it to be saved under its uploaded name when the stored name differs"""
+    filename = (metadata or {}).get('filename')
+    if not filename or filename == os.path.basename(file.name):
+        return file.url
+    return f"{file.url}?{urlencode({'filename': filename})}"
+
+
+def source_blob(name):
+    """The blob `name` is, or was derived from (resized variants); None for other files"""
+    if name.startswith(f'{VARIANTS_ROOT}/{BLOB_ROOT}/'):
+        name = name[len(VARIANTS_ROOT) + 1:].rsplit('/', 1)[0]
+    return name if name.startswith(f'{BLOB_ROOT}/') else None
+
+
+@deconstructible(path='projects.storage.ContentAddressedStorage')
+class ContentAddressedStorage(FileSystemStorage):
+    blob_root = BLOB_ROOT
+
+    def _save(self, name, content):
+        if name.startswith(f'{VARIANTS_ROOT}/'):
+            # Resized variants are named after their blob already
+            return super()._save(name, content)
+
+        # Uploads hashed while they were received (projects.uploads) or for their metadata
+        digest = getattr(content, 'sha256', None)
+        if digest is None:
+            sha256 = hashlib.sha256()
+            for chunk in content.chunks():
+                sha256.update(chunk)
+            digest = sha256.hexdigest()
+        target = blob_name(digest, name)
+        # Reserve before looking: a delete() that got in first has removed the file by now
+        self._update_or_create(target, {'reserved_until': timezone.now() + timedelta(seconds=get_reservation())})
+        if self.exists(target):
+            return target
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        return super()._save(target, content)
+
+    @staticmethod
+    def _update_or_create(name, update, create=None):
+        MediaBlob = apps.get_model('projects', 'MediaBlob')
+        if MediaBlob.objects.filter(name=name).update(**update):
+            return
+        try:
+            with transaction.atomic():
+                MediaBlob.objects.create(name=name, **(update if create is None else create))
+        except IntegrityError:
+            # Created by a concurrent upload of the same content
+            MediaBlob.objects.filter(name=name).update(**update)
+
+    def retain(self, names):
+        for name, count in Counter(name for name in names if source_blob(name) == name).items():
+            self._update_or_create(name, {'ref_count': F('ref_count') + count}, {'ref_count': count})
+
+    def release(self, names):
+        # Rows are removed by delete(), along with their file
+        MediaBlob = apps.get_model('projects', 'MediaBlob')
+        for name, count in Counter(name for name in names if source_blob(name) == name).items():
+            MediaBlob.objects.filter(name=name).update(ref_count=Greatest(F('ref_count') - count, Value(0)))
+
+    @staticmethod
+    def _in_use(blob):
+        return blob.ref_count > 0 or (blob.reserved_until is not None and blob.reserved_until > timezone.now())
+
+    def is_referenced(self, name):
+        blob = source_blob(name)
+        if blob is None:
+            return False
+        MediaBlob = apps.get_model('projects', 'MediaBlob')
+        row = MediaBlob.objects.filter(name=blob).first()
+        return row is not None and self._in_use(row)
+
+    def delete(self, name):
+        blob = source_blob(name)
+        if blob is None:
+            return super().delete(name)
+        MediaBlob = apps.get_model('projects', 'MediaBlob')
+        with transaction.atomic():
+            # Locked (or created, if lost) until the file is gone, so _save() can't reuse it meanwhile
+            row, created = MediaBlob.objects.select_for_update().get_or_create(name=blob)
+            if self._in_use(row):
+                return
+            super().delete(name)
+            if name == blob or created:
+                row.delete()
+
+
+blob_storage = ContentAddressedStorage()
@@ -0,0 +1,186 @@
+"""
+Delta sync ("changes since") feed for client-side replicas of projects,
+lots, floor plans, documents and contacts.
+
+Each record type is read in (updated_at, id) keyset order, and deletions come
+from DeletedRecord tombstones in (deleted_at, id) order. The cursor handed to
+the client stores the last position of every type, so a page boundary never
+skips or repeats rows, even when a bulk write gives many rows the same
+timestamp.
+
+Rows are only served once they are SYNC_SETTLE_SECONDS old. Timestamps are
+taken before the writing transaction commits, so without this window a
+cursor could move past a row that becomes visible later. On PostgreSQL the
+horizon also stays behind the start of the oldest transaction that has
+written and not committed yet, however long it runs; writers keep slow work
+such as storing uploads out of their transactions.
+"""
+import base64
+import datetime
+import json
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotFound, ValidationError
+
+from .models import Project, Lot, FloorPlan, Document, Contact, DeletedRecord
+from .serializers import (
+    ProjectSyncSerializer, LotSyncSerializer, FloorPlanSyncSerializer,
+    DocumentSyncSerializer, ContactSyncSerializer
+)
+
+
+DELETED = 'deleted'
+
+
+class CursorExpired(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = 'Deletions since this cursor are no longer retained; start a full sync without a cursor.'
+    default_code = 'cursor_expired'
+
+
+@dataclass(frozen=True)
+class SyncType:
+    name: str
+    model: type
+    serializer_class: type
+    # Lookup that scopes the rows to one project
+    project_lookup: str = 'project'
+    prefetch: tuple = ()
+
+
+SYNC_TYPES = (
+    SyncType('projects', Project, ProjectSyncSerializer, project_lookup='pk', prefetch=('amenities',)),
+    SyncType('lots', Lot, LotSyncSerializer, prefetch=('floor_plans',)),
+    SyncType('floor_plans', FloorPlan, FloorPlanSyncSerializer),
+    SyncType('documents', Document, DocumentSyncSerializer),
+    SyncType('contacts', Contact, ContactSyncSerializer),
+)
+
+
+def get_page_size():
+    return getattr(settings, 'SYNC_PAGE_SIZE', 500)
+
+
+def get_settle_window():
+    return datetime.timedelta(seconds=getattr(settings, 'SYNC_SETTLE_SECONDS', 5))
+
+
+def get_tombstone_retention():
+    return datetime.timedelta(days=getattr(settings, 'SYNC_TOMBSTONE_RETENTION_DAYS', 90))
+
+
+def oldest_open_write():
+    """Start of the oldest other transaction that has written and not committed yet (PostgreSQL only)"""
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT min(xact_start) FROM pg_stat_activity '
+            'WHERE backend_xid IS NOT NULL AND datname = current_database() AND pid <> pg_backend_pid()'
+        )
+        return cursor.fetchone()[0]
+
+
+def encode_cursor(positions):
+    payload = {name: [moment.isoformat(), pk] for name, (moment, pk) in positions.items()}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(value):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(value.encode('ascii')).decode('utf-8'))
+        positions = {}
+        for name, (moment, pk) in payload.items():
+            moment = parse_datetime(moment)
+            if moment is None:
+                raise ValueError(name)
+            positions[name] = (moment, int(pk))
+    except (TypeError, ValueError, AttributeError, UnicodeError):
+        raise NotFound('Invalid cursor')
+    return positions
+
+
+def _after(position, time_field):
+    moment, pk = position
+    return Q(**{f'{time_field}__gt': moment}) | Q(**{time_field: moment, 'pk__gt': pk})
+
+
+class ChangeFeed:
+    """One page of changes after a cursor (or a timestamp), optionally limited to one project"""
+
+    def __init__(self, request, cursor=None, since=None, project=None):
+        self.request = request
+        self.project = project
+        self.page_size = get_page_size()
+        self.horizon = timezone.now() - get_settle_window()
+        oldest_write = oldest_open_write()
+        if oldest_write is not None:
+            # Its rows may be stamped any time after it started (less clock skew)
+            self.horizon = min(self.horizon, oldest_write - get_settle_window())
+
+        if cursor:
+            self.positions = decode_cursor(cursor)
+        elif since:
+            since = parse_datetime(since)
+            if since is None:
+                raise ValidationError({'since': 'Expected an ISO 8601 timestamp.'})
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since, datetime.timezone.utc)
+            self.positions = {name: (since, 0) for name in [*(t.name for t in SYNC_TYPES), DELETED]}
+        else:
+            # Full sync: every live row, and no deletions from before it started
+            self.positions = {DELETED: (self.horizon, 0)}
+
+        deleted_position = self.positions.get(DELETED)
+        if deleted_position and deleted_position[0] < timezone.now() - get_tombstone_retention():
+            raise CursorExpired()
+
+    def _page(self, queryset, name, time_field):
+        position = self.positions.get(name)
+        queryset = queryset.filter(**{f'{time_field}__lte': self.horizon})
+        if position is not None:
+            queryset = queryset.filter(_after(position, time_field))
+        rows = list(queryset.order_by(time_field, 'pk')[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if rows:
+            position = self.positions[name] = (getattr(rows[-1], time_field), rows[-1].pk)
+        if not has_more and (position is None or position < (self.horizon, 0)):
+            # Nothing else up to the horizon: move there, so a quiet feed's cursor never
+            # falls behind the tombstone retention window
+            self.positions[name] = (self.horizon, 0)
+        return rows, has_more
+
+    def collect(self):
+        context = {'request': self.request}
+        has_more = False
+        changes = {}
+        for sync_type in SYNC_TYPES:
+            queryset = sync_type.model._default_manager.prefetch_related(*sync_type.prefetch)
+            if self.project is not None:
+                queryset = queryset.filter(**{sync_type.project_lookup: self.project.pk})
+            rows, more = self._page(queryset, sync_type.name, 'updated_at')
+            has_more = has_more or more
+            changes[sync_type.name] = sync_type.serializer_class(rows, many=True, context=context).data
+
+        tombstones = DeletedRecord.objects.all()
+        if self.project is not None:
+            tombstones = tombstones.filter(project_id=self.project.pk)
+        rows, more = self._page(tombstones, DELETED, 'deleted_at')
+        has_more = has_more or more
+        deleted = {sync_type.name: [] for sync_type in SYNC_TYPES}
+        for tombstone in rows:
+            deleted[tombstone.record_type].append(tombstone.record_id)
+
+        return {
+            'cursor': encode_cursor(self.positions),
+            'has_more': has_more,
+            'changes': changes,
+            'deleted': deleted,
+        }
@@ -0,0 +1,46 @@
+"""
+Background jobs of the projects app (run by ``manage.py run_jobs``, see jobs.queue).
+"""
+from django.apps import apps
+from django.conf import settings
+from django.core.mail import EmailMessage
+
+from jobs.queue import task
+from .images import needs_variants, render_and_store_variants
+from .models import ProjectInquires
+
+
+@task(queue='images')
+def generate_image_variants(model, pk, attname):
+    """Render the resized variants of one image field of a row (projects.images)"""
+    model = apps.get_model(model)
+    instance = model._default_manager.filter(pk=pk).first()
+    variants_attname = model.IMAGE_VARIANT_FIELDS[attname]
+    # Gone, or already handled by a job for a later save of the row
+    if instance is not None and needs_variants(instance, attname, variants_attname):
+        render_and_store_variants(instance, attname, variants_attname)
+
+
+@task
+def notify_inquiry_contacts(inquiry_id):
+    """Email a new inquiry to the contacts of its project"""
+    inquiry = ProjectInquires.objects.select_related('project').filter(pk=inquiry_id).first()
+    if inquiry is None or inquiry.project is None:
+        return
+    recipients = list(inquiry.project.contacts.exclude(email='').values_list('email', flat=True))
+    if not recipients:
+        return
+    lines = [
+        f'Name: {inquiry.name}',
+        f'Email: {inquiry.email}',
+        f'Phone: {inquiry.phone}',
+        '',
+        inquiry.message,
+    ]
+    EmailMessage(
+        subject=f'New inquiry for {inquiry.project.name}',
+        body='\n'.join(lines),
+        from_email=getattr(settings, 'INQUIRY_NOTIFICATION_FROM_EMAIL', None),
+        to=recipients,
+        reply_to=[inquiry.email] if inquiry.email else None,
+    ).send()
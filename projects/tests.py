@@ -1,3 +1,1637 @@
-from django.test import TestCase
+import asyncio
+import base64
+import csv
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import tracemalloc
+import unittest
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile, TemporaryUploadedFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
+
+try:
+    from PIL import Image as PILImage
+except ImportError:  # pragma: no cover - Pillow is an optional dependency
+    PILImage = None
+
+from accounts.models import User
+from jobs.models import Job
+from .cache import CacheStats, check_shared_cache
+from .events import format_event, get_broadcaster, project_topic
+from .exports import csv_chunks
+from .images import check_pillow, render_variants, store_variants, variant_name, variant_names, variants_enabled
+from platformb.media import MediaCleanupWorker, cleanup_worker, delete_files
+from platformb.utils import next_unique_value
+from . import inquiry_buffer
+from .direct_uploads import store_upload
+from .models import (
+    State, City, Project, Lot, FloorPlan, Document, Contact, DirectUpload, FeatureFinish, ProjectInquires,
+    ProjectSearchDocument, Rendering, MediaBlob, UploadSession,
+)
+from .resumable_uploads import append_chunk, receive_chunk, store_session
+from .serializers import DocumentSerializer, FeatureFinishSerializer, ProjectSerializer
+from .storage import ContentAddressedStorage, blob_name, blob_storage
+from .tasks import generate_image_variants
+from .uploads import LimitedTemporaryFileUploadHandler, UploadTooLarge
+from .views import LotListCreateView, ProjectInquiryExportView, ProjectLotsView
+
+
+class ProjectListQueryBudgetTests(TestCase):
+    """List endpoints must not load lots/inquiries or rich text columns"""
+
+    LOT_COUNT = 1000
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='agent', email='agent@example.com', password='pass')
+        state = State.objects.create(name='Ontario', abbreviation='ON')
+        cls.city = City.objects.create(name='Toronto', state=state)
+        cls.project = Project.objects.create(
+            name='The Villas', project_address='1 Main St', city=cls.city, is_featured=True,
+            project_description='<p>' + 'x' * 50000 + '</p>',
+        )
+        Lot.objects.bulk_create([
+            Lot(project=cls.project, lot_number=str(i), description='y' * 200,
+                availability_status='Available' if i % 2 else 'Sold')
+            for i in range(cls.LOT_COUNT)
+        ])
+        FloorPlan.objects.bulk_create([FloorPlan(project=cls.project, name=f'Plan {i}') for i in range(20)])
+        Document.objects.create(project=cls.project, title='Brochure')
+        Contact.objects.create(project=cls.project, name='Sales')
+        ProjectInquires.objects.bulk_create([
+            ProjectInquires(project=cls.project, name=f'Buyer {i}', message='z' * 500) for i in range(200)
+        ])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assert_lean_list(self, url):
+        tracemalloc.start()
+        try:
+            # COUNT(*) for the paginator + one SELECT for the page
+            with self.assertNumQueries(2):
+                response = self.client.get(url)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        self.assertEqual(response.status_code, 200)
+        result = response.json()['results'][0]
+        self.assertEqual(result['total_lots'], self.LOT_COUNT)
+        self.assertEqual(result['available_lots'], self.LOT_COUNT // 2)
+        self.assertEqual(result['total_floor_plans'], 20)
+        # Loading the 1,000 lots (or 200 inquiries) would cost several MB
+        self.assertLess(peak, 1024 * 1024)
+
+    def test_project_list(self):
+        self.assert_lean_list(reverse('project-list'))
+
+    def test_featured_projects(self):
+        self.assert_lean_list(reverse('featured-projects'))
+
+    def test_city_projects(self):
+        self.assert_lean_list(reverse('city-projects', kwargs={'city_slug': self.city.slug}))
+
+    def test_list_defers_rich_text(self):
+        project = Project.objects.for_list().get(pk=self.project.pk)
+        self.assertIn('project_description', project.get_deferred_fields())
+
+
+@unittest.skipUnless(connection.vendor in ('sqlite', 'postgresql'), 'Query plan checks need SQLite or PostgreSQL')
+class QueryPlanIndexTests(TestCase):
+    """
+    The hot filter/order shapes must be served by their composite indexes
+    without a separate sort step, so ordering changes can't silently fall
+    back to full scans.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        state = State.objects.create(name='Ontario', abbreviation='ON')
+        cls.city = City.objects.create(name='Toronto', state=state)
+        cls.project = Project.objects.create(
+            name='The Villas', project_address='1 Main St', city=cls.city, is_featured=True
+        )
+        for i in range(20):
+            Project.objects.create(name=f'Project {i}', project_address=f'{i} Main St', city=cls.city)
+            Project.objects.create(
+                name=f'Archived {i}', project_address=f'{i} Side St', city=cls.city, is_active=False
+            )
+        Lot.objects.bulk_create([Lot(project=cls.project, lot_number=str(i), order=i % 5) for i in range(50)])
+        Document.objects.bulk_create([
+            Document(project=cls.project, title=f'Doc {i}', document_type='Document') for i in range(10)
+        ])
+        ProjectInquires.objects.bulk_create([ProjectInquires(project=cls.project, name=f'Buyer {i}') for i in range(10)])
+        # Give the planner real statistics instead of empty-table defaults
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def explain(self, queryset):
+        if connection.vendor == 'postgresql':
+            # Tiny test tables would otherwise always be sequentially scanned
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        return queryset.explain()
+
+    def assert_uses_index(self, queryset, index_name):
+        plan = self.explain(queryset)
+        self.assertIn(index_name, plan)
+        if connection.vendor == 'sqlite':
+            self.assertNotIn('USE TEMP B-TREE FOR ORDER BY', plan)
+        else:
+            self.assertNotIn('Sort Key', plan)
+
+    def test_active_project_list(self):
+        self.assert_uses_index(Project.objects.filter(is_active=True), 'project_active_updated_idx')
+        self.assert_uses_index(
+            Project.objects.filter(is_active=True).order_by('-updated_at', 'id'), 'project_active_updated_idx'
+        )
+
+    def test_featured_projects(self):
+        self.assert_uses_index(
+            Project.objects.filter(is_active=True, is_featured=True), 'project_active_featured_idx'
+        )
+
+    def test_city_projects(self):
+        self.assert_uses_index(Project.objects.filter(city=self.city, is_active=True), 'project_city_active_idx')
+
+    def view_queryset(self, view_class, query=None, **kwargs):
+        """The queryset a list view runs for a GET with `query`"""
+        view = view_class()
+        view.setup(APIRequestFactory().get('/', query or {}), **kwargs)
+        view.request = view.initialize_request(view.request)
+        view.format_kwarg = None
+        return view.filter_queryset(view.get_queryset())
+
+    def test_project_lots(self):
+        for view_class in (LotListCreateView, ProjectLotsView):
+            self.assert_uses_index(
+                self.view_queryset(view_class, project_slug=self.project.slug), 'lot_project_order_idx'
+            )
+        self.assert_uses_index(
+            self.view_queryset(LotListCreateView, {'availability_status': 'Available'}, project_slug=self.project.slug),
+            'lot_project_status_order_idx',
+        )
+
+    def test_project_documents_by_type(self):
+        self.assert_uses_index(
+            Document.objects.filter(project=self.project, document_type='Document').order_by('title'),
+            'document_project_type_idx'
+        )
+
+    def test_project_inquiries(self):
+        self.assert_uses_index(ProjectInquires.objects.filter(project=self.project), 'inquiry_project_created_idx')
+
+
+class SyncFeedTests(TestCase):
+    """Cursors of clients that keep polling must stay valid"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='agent', email='agent@example.com', password='pass')
+        state = State.objects.create(name='Ontario', abbreviation='ON')
+        city = City.objects.create(name='Toronto', state=state)
+        cls.project = Project.objects.create(name='The Villas', project_address='1 Main St', city=city)
+        cls.other = Project.objects.create(name='The Towers', project_address='2 Main St', city=city)
+        cls.other_lot = Lot.objects.create(project=cls.other, lot_number='1')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.start = timezone.now()
+
+    def poll(self, days, **params):
+        with mock.patch('django.utils.timezone.now', return_value=self.start + timedelta(days=days, minutes=1)):
+            response = self.client.get(reverse('sync-changes'), params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_quiet_feed_outlives_tombstone_retention(self):
+        first = self.poll(0)
+        self.assertEqual(len(first['changes']['projects']), 2)
+        # No deletions for longer than SYNC_TOMBSTONE_RETENTION_DAYS (90), polled in between
+        second = self.poll(60, cursor=first['cursor'])
+        third = self.poll(120, cursor=second['cursor'])
+        self.assertEqual(third['changes']['projects'], [])
+        self.assertFalse(third['has_more'])
+
+    def test_project_feed_ignores_other_projects_deletions(self):
+        first = self.poll(0, project=self.project.slug)
+        with mock.patch('django.utils.timezone.now', return_value=self.start + timedelta(days=60)):
+            self.other_lot.delete()
+        second = self.poll(61, project=self.project.slug, cursor=first['cursor'])
+        self.assertEqual(second['deleted']['lots'], [])
+        third = self.poll(150, project=self.project.slug, cursor=second['cursor'])
+        self.assertEqual(third['deleted']['lots'], [])
+
+    def test_expired_cursor(self):
+        first = self.poll(0)
+        with mock.patch('django.utils.timezone.now', return_value=self.start + timedelta(days=120)):
+            response = self.client.get(reverse('sync-changes'), {'cursor': first['cursor']})
+        self.assertEqual(response.status_code, 410)
+
+
+class ProjectDetailCacheTests(TestCase):
+    """Invalidations made by one process must reach the cache of every other"""
+
+    @classmethod
+    def setUpTestData(cls):
+        state = State.objects.create(name='Ontario', abbreviation='ON')
+        cls.project = Project.objects.create(
+            name='The Villas', project_address='1 Main St', city=City.objects.create(name='Toronto', state=state),
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('public-project-detail', args=[self.project.slug])
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir, ignore_errors=True)
+        # File-based: shared by separate cache instances, like Redis between processes
+        self.use_cache('django.core.cache.backends.filebased.FileBasedCache', self.cache_dir)
+
+    def use_cache(self, backend, location=''):
+        cache_override = override_settings(CACHES={'default': {'BACKEND': backend, 'LOCATION': location}})
+        cache_override.enable()
+        self.addCleanup(cache_override.disable)
+
+    def rename_in_other_process(self, other_cache, name):
+        with mock.patch('projects.cache.get_cache', return_value=other_cache), \
+                self.captureOnCommitCallbacks(execute=True):
+            self.project.name = name
+            self.project.save()
+
+    def test_write_in_other_process_invalidates_payload(self):
+        self.assertEqual(self.client.get(self.url)['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get(self.url)['X-Cache'], 'HIT')
+
+        self.rename_in_other_process(FileBasedCache(self.cache_dir, {}), 'The Villas II')
+
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['name'], 'The Villas II')
+
+    def test_process_local_cache_is_bypassed(self):
+        self.use_cache('django.core.cache.backends.locmem.LocMemCache', 'worker')
+        self.assertEqual([warning.id for warning in check_shared_cache(None)], ['projects.W001'])
+        self.assertEqual(self.client.get(self.url)['X-Cache'], 'BYPASS')
+
+        self.rename_in_other_process(LocMemCache('other-process', {}), 'The Villas II')
+
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Cache'], 'BYPASS')
+        self.assertEqual(response.json()['name'], 'The Villas II')
+
+    def test_etag_is_revalidated_after_write_in_other_process(self):
+        etag = self.client.get(self.url)['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.rename_in_other_process(FileBasedCache(self.cache_dir, {}), 'The Villas II')
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['name'], 'The Villas II')
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_no_validators_with_process_local_cache(self):
+        self.use_cache('django.core.cache.backends.locmem.LocMemCache', 'worker')
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+        self.assertNotIn('Last-Modified', response)
+
+    def test_unreachable_cache_is_bypassed(self):
+        down = mock.patch.multiple(
+            FileBasedCache, **{name: mock.DEFAULT for name in ('get', 'get_many', 'add', 'set', 'set_many')},
+        )
+        with down as methods, self.assertLogs('projects.cache', 'WARNING'):
+            for method in methods.values():
+                method.side_effect = ConnectionError('Connection refused')
+            response = self.client.get(self.url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['X-Cache'], 'BYPASS')
+            self.assertNotIn('ETag', response)
+
+            self.rename_in_other_process(FileBasedCache(self.cache_dir, {}), 'The Villas II')
+            self.assertEqual(self.client.get(self.url).json()['name'], 'The Villas II')
+
+    def test_stats_are_summed_over_processes(self):
+        worker, other_worker = CacheStats('detail'), CacheStats('detail')
+        for hit in (True, True, False):
+            worker.record(hit)
+        other_worker.record(False)
+        other_worker.flush()
+        self.assertEqual(worker.as_dict(), {'hits': 2, 'misses': 2, 'hit_ratio': 0.5})
+
+
+class TemporaryMediaMixin:
+    """Stores uploads in a temporary MEDIA_ROOT for the test"""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+
+class ProjectWriteTests(TemporaryMediaMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='agent', email='agent@example.com', password='pass')
+        state = State.objects.create(name='Ontario', abbreviation='ON')
+        cls.city = City.objects.create(name='Toronto', state=state)
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_uploads_are_stored_before_the_write_transaction(self):
+        """Rows are stamped for the sync feed inside the transaction; storing large files must not delay its commit"""
+        depths = []
+        store = ContentAddressedStorage._save
+
+        def save(storage, name, content):
+            depths.append(len(connection.atomic_blocks))
+            return store(storage, name, content)
+
+        depth = len(connection.atomic_blocks)
+        with mock.patch.object(ContentAddressedStorage, '_save', save):
+            response = self.client.post(reverse('project-list'), {
+                'name': 'The Villas',
+                'project_address': '1 Main St',
+                'city_id': self.city.pk,
+                'uploaded_images': [SimpleUploadedFile('front.jpg', b'front'), SimpleUploadedFile('back.jpg', b'back')],
+                'uploaded_legal_documents': [SimpleUploadedFile('terms.pdf', b'terms')],
+            }, format='multipart')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(depths, [depth] * 3)
+        rendering = Rendering.objects.filter(project__slug=response.json()['slug']).first()
+        self.assertEqual(rendering.image_metadata['size'], len(rendering.image.read()))
+
+
+@mock.patch.object(cleanup_worker, 'enqueue', side_effect=delete_files)
+class ContentAddressedStorageTests(TemporaryMediaMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        state = State.objects.create(name='Ontario', abbreviation='ON')
+        cls.project = Project.objects.create(
+            name='The Villas', project_address='1 Main St', city=City.objects.create(name='Toronto', state=state),
+        )
+
+    def create_rendering(self, name, content):
+        return Rendering.objects.create(project=self.project, image=SimpleUploadedFile(name, content))
+
+    def expire_reservation(self, name):
+        MediaBlob.objects.filter(name=name).update(reserved_until=timezone.now() - timedelta(seconds=1))
+
+    def test_same_content_is_stored_once(self, enqueue):
+        first = self.create_rendering('kitchen.jpg', b'same image')
+        second = self.create_rendering('kitchen-copy.JPG', b'same image')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(MediaBlob.objects.get(name=first.image.name).ref_count, 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(blob_storage.exists(second.image.name))
+        self.assertEqual(MediaBlob.objects.get(name=second.image.name).ref_count, 1)
+
+    def test_unreferenced_blob_is_deleted(self, enqueue):
+        rendering = self.create_rendering('kitchen.jpg', b'kitchen')
+        name = rendering.image.name
+        self.expire_reservation(name)
+        with self.captureOnCommitCallbacks(execute=True):
+            rendering.delete()
+        self.assertFalse(blob_storage.exists(name))
+        self.assertFalse(MediaBlob.objects.filter(name=name).exists())
+
+    @override_settings(MEDIA_SERVE=True, MEDIA_SENDFILE=None)
+    def test_downloads_keep_the_uploaded_name(self, enqueue):
+        document = Document.objects.create(
+            project=self.project, title='Brochure', document=SimpleUploadedFile('Spring Brochure.pdf', b'%PDF brochure'),
+        )
+        self.assertEqual(document.document_metadata['filename'], 'Spring Brochure.pdf')
+        url = DocumentSerializer(document).data['document_url']
+        self.assertEqual(url, f'{document.document.url}?filename=Spring+Brochure.pdf')
+
+        response = self.client.get(url)
+        self.addCleanup(response.close)
+        self.assertEqual(response['Content-Disposition'], 'inline; filename="Spring Brochure.pdf"')
+        # Other rows sharing the blob keep their own names
+        copy = Document.objects.create(
+            project=self.project, title='Copy', document=SimpleUploadedFile('copy.pdf', b'%PDF brochure'),
+        )
+        self.assertEqual(copy.document.name, document.document.name)
+        self.assertTrue(DocumentSerializer(copy).data['document_url'].endswith('?filename=copy.pdf'))
+
+    def test_blob_reused_while_being_deleted_is_kept(self, enqueue):
+        rendering = self.create_rendering('kitchen.jpg', b'kitchen')
+        name = rendering.image.name
+        self.expire_reservation(name)
+        # Stored for a row that has not committed (nor counted its reference) yet
+        self.assertEqual(blob_storage.save('kitchen-again.jpg', ContentFile(b'kitchen')), name)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            rendering.delete()
+        self.assertTrue(blob_storage.exists(name))
+
+    def test_blob_deleted_before_reuse_is_written_again(self, enqueue):
+        rendering = self.create_rendering('kitchen.jpg', b'kitchen')
+        name = rendering.image.name
+        self.expire_reservation(name)
+        with self.captureOnCommitCallbacks(execute=True):
+            rendering.delete()
+
+        self.assertEqual(blob_storage.save('kitchen-again.jpg', ContentFile(b'kitchen')), name)
+        with blob_storage.open(name) as stored:
+            self.assertEqual(stored.read(), b'kitchen')
+
+    def test_deleted_lot_releases_its_blob(self, enqueue):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username='agent', email='agent@example.com', password='pass'))
+        lot = Lot.objects.create(project=self.project, lot_number='1', lot_rendering=SimpleUploadedFile('lot.jpg', b'lot'))
+        name = lot.lot_rendering.name
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.delete(reverse('project-lot-detail', args=[self.project.slug, lot.pk]))
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(MediaBlob.objects.get(name=name).ref_count, 0)
+        # Kept while reserved, then collected
+        self.assertTrue(blob_storage.exists(name))
+        self.expire_reservation(name)
+        checkpoint = os.path.join(blob_storage.location, 'gc.json')
+        call_command('collect_orphaned_media', '--apply', '--min-age=0', f'--checkpoint={checkpoint}', stdout=io.StringIO())
+        self.assertFalse(blob_storage.exists(name))
+        self.assertFalse(MediaBlob.objects.filter(name=name).exists())
+
+
+@mock.patch.object(inquiry_buffer.flusher, 'notify')
+class InquiryBufferTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='agent', email='agent@example.com', password='pass')
+        state = State.objects.create(name='Ontario', abbreviation='ON')
+        cls.project = Project.objects.create(
+            name='The Villas', project_address='1 Main St', city=City.objects.create(name='Toronto', state=state),
+        )
+
+    def setUp(self):
+        self.buffer_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.buffer_dir, ignore_errors=True)
+        buffer_override = override_settings(
+            INQUIRY_BUFFER_ENABLED=True, INQUIRY_BUFFER_DIR=self.buffer_dir, INQUIRY_BUFFER_FSYNC=False,
+            INQUIRY_NOTIFICATIONS=False,
+        )
+        buffer_override.enable()
+        self.addCleanup(buffer_override.disable)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('project-inquiries', args=[self.project.slug])
+
+    def submit(self, message='Is lot 4 available?'):
+        return self.client.post(self.url, {'name': 'Buyer', 'email': 'buyer@example.com', 'message': message})
+
+    def buffered_lines(self, name=inquiry_buffer.BUFFER_NAME):
+        with open(os.path.join(self.buffer_dir, name), 'rb') as fh:
+            return fh.read().splitlines()
+
+    def test_submissions_are_stored_on_flush(self, notify):
+        response = self.submit()
+        self.assertEqual(response.status_code, 202, response.content)
+        self.assertNotIn('id', response.json())
+        self.assertFalse(ProjectInquires.objects.exists())
+
+        self.assertEqual(inquiry_buffer.flush(), 1)
+        inquiry = ProjectInquires.objects.get()
+        self.assertEqual((inquiry.project, inquiry.email), (self.project, 'buyer@example.com'))
+        self.assertEqual(os.listdir(self.buffer_dir), [inquiry_buffer.LOCK_NAME])
+
+    def test_unknown_project_is_rejected(self, notify):
+        response = self.client.post(reverse('project-inquiries', args=['nowhere']), {'name': 'Buyer'})
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(INQUIRY_BUFFER_ENABLED=False)
+    def test_disabled_buffer_creates_rows(self, notify):
+        response = self.submit()
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(ProjectInquires.objects.filter(pk=response.json()['id']).exists())
+
+    def test_repeats_within_window_are_stored_once(self, notify):
+        self.submit()
+        self.submit()
+        self.submit(message='And lot 5?')
+        self.assertEqual(inquiry_buffer.flush(), 2)
+        # Repeats flushed separately (e.g. received by another process) conflict on the dedup key
+        self.submit()
+        self.assertEqual(inquiry_buffer.flush(), 0)
+        self.assertEqual(ProjectInquires.objects.count(), 2)
+
+        with mock.patch('time.time', return_value=time.time() + 60 * 10):
+            self.submit()
+        self.assertEqual(inquiry_buffer.flush(), 1)
+
+    def test_interrupted_flush_is_replayed_without_duplicates(self, notify):
+        self.submit()
+        self.submit(message='And lot 5?')
+        directory = self.buffer_dir
+        inquiry_buffer._rotate(os.path.join(directory, inquiry_buffer.BUFFER_NAME), directory)
+        [segment] = [name for name in os.listdir(directory) if name.endswith(inquiry_buffer.SEGMENT_SUFFIX)]
+        # The process stopped after storing the first record of the segment
+        inquiry_buffer._store(inquiry_buffer._read_segment(os.path.join(directory, segment))[:1])
+
+        self.assertEqual(inquiry_buffer.flush(), 1)
+        self.assertEqual(ProjectInquires.objects.count(), 2)
+
+    def test_append_racing_a_rotation_goes_to_the_new_buffer(self, notify):
+        self.submit()
+        buffer_path = os.path.join(self.buffer_dir, inquiry_buffer.BUFFER_NAME)
+        segment_path = buffer_path + inquiry_buffer.SEGMENT_SUFFIX
+        lock = inquiry_buffer._lock
+        rotated = []
+
+        def rotate_then_lock(fd, exclusive=False):
+            # The buffer is renamed between the writer's open() and its lock
+            if not rotated:
+                rotated.append(os.replace(buffer_path, segment_path))
+            lock(fd, exclusive)
+
+        with mock.patch.object(inquiry_buffer, '_lock', rotate_then_lock):
+            self.submit(message='And lot 5?')
+        self.assertEqual(len(self.buffered_lines(segment_path)), 1)
+        self.assertIn(b'And lot 5?', self.buffered_lines()[0])
+
+    @override_settings(INQUIRY_BUFFER_BATCH_SIZE=2, INQUIRY_BUFFER_FLUSH_INTERVAL=60)
+    def test_flusher_flushes_once_a_batch_is_waiting(self, notify):
+        flushed = threading.Event()
+        flusher = inquiry_buffer.InquiryFlusher()
+        with mock.patch.object(inquiry_buffer, 'flush', side_effect=flushed.set), \
+                mock.patch.object(inquiry_buffer, 'close_old_connections'):
+            flusher.notify()
+            self.assertFalse(flushed.wait(0.2))
+            flusher.notify()
+            self.assertTrue(flushed.wait(5))
+
+
+class AvailabilityStreamTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='agent', email='agent@example.com', password='pass')
+        state = State.objects.create(name='Ontario', abbreviation='ON')
+        cls.project = Project.objects.create(
+            name='The Villas', project_address='1 Main St', city=City.objects.create(name='Toronto', state=state),
+        )
+
+    def test_anonymous_subscribers_are_rejected(self):
+        for url in (reverse('availability-stream'), reverse('project-availability-stream', args=[self.project.slug])):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 401, url)
+            self.assertNotEqual(response.get('Content-Type'), 'text/event-stream')
+
+    def test_invalid_token_is_rejected(self):
+        response = self.client.get(reverse('availability-stream'), headers={'Authorization': 'Bearer not-a-token'})
+        self.assertEqual(response.status_code, 401)
+
+    async def test_authenticated_subscriber_receives_events(self):
+        response = await self.async_client.get(
+            reverse('project-availability-stream', args=[self.project.slug]),
+            headers={'Authorization': f'Bearer {AccessToken.for_user(self.user)}'},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        frames = aiter(response.streaming_content)
+        try:
+            # Subscribed once the stream has started
+            self.assertIn(b'connected', await anext(frames))
+            frame = format_event('lot.updated', {'id': 1, 'project_id': self.project.pk, 'availability_status': 'Sold'})
+            get_broadcaster().publish([project_topic(self.project.pk)], frame)
+            received = await asyncio.wait_for(anext(frames), 5)
+        finally:
+            await frames.aclose()
+        self.assertIn(b'event: lot.updated', received)
+
+
+class InventoryCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        state = State.objects.create(name='Ontario', abbreviation='ON')
+        city = City.objects.create(name='Toronto', state=state)
+        cls.old_project = Project.objects.create(name='The Villas', project_address='1 Main St', city=city)
+        cls.new_project = Project.objects.create(name='The Towns', project_address='2 Main St', city=city)
+
+    def test_moving_a_lot_refreshes_both_projects(self):
+        lot = Lot.objects.create(project=self.old_project, lot_number='1', availability_status='Sold')
+        self.old_project.refresh_from_db()
+        self.assertEqual((self.old_project.lots_count, self.old_project.sold_lots_count), (1, 1))
+
+        with mock.patch('projects.models.invalidate_projects') as invalidate:
+            lot.project = self.new_project
+            lot.save()
+        invalidated = {slug for call in invalidate.call_args_list for slug in call.args[0]}
+        self.assertEqual(invalidated, {self.old_project.slug, self.new_project.slug})
+
+        self.old_project.refresh_from_db()
+        self.new_project.refresh_from_db()
+        self.assertEqual((self.old_project.lots_count, self.old_project.sold_lots_count), (0, 0))
+        self.assertEqual((self.new_project.lots_count, self.new_project.sold_lots_count), (1, 1))
+
+    def test_moving_a_floor_plan_with_update_fields(self):
+        plan = FloorPlan.objects.create(project=self.old_project, name='Plan A')
+        plan.project = self.new_project
+        plan.save(update_fields=['project'])
+        self.old_project.refresh_from_db()
+        self.new_project.refresh_from_db()
+        self.assertEqual((self.old_project.floor_plans_count, self.new_project.floor_plans_count), (0, 1))
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='agent', email='agent@example.com', password='pass')
+        state = State.objects.create(name='Ontario', abbreviation='ON')
+        cls.project = Project.objects.create(
+            name='The Villas', project_address='1 Main St', city=City.objects.create(name='Toronto', state=state),
+        )
+        # Repeated (order, lot_number) pairs: only the id tiebreaker tells them apart
+        Lot.objects.bulk_create([
+            Lot(project=cls.project, lot_number=str(i % 7), order=i % 3) for i in range(23)
+        ])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('project-lots', args=[self.project.slug])
+
+    def ids(self, response):
+        self.assertEqual(response.status_code, 200, response.content)
+        return [lot['id'] for lot in response.json()['results']]
+
+    def walk(self, url, link):
+        ids, pages = [], 0
+        while url:
+            response = self.client.get(url)
+            page = self.ids(response)
+            ids.extend(page if link == 'next' else reversed(page))
+            url = response.json()[link]
+            pages += 1
+        return ids, pages
+
+    def test_cursor_pages_match_page_numbers(self):
+        listed = self.ids(self.client.get(self.url, {'page_size': 100}))
+        self.assertEqual(len(listed), 23)
+
+        forward, pages = self.walk(f'{self.url}?pagination=cursor&page_size=5', 'next')
+        self.assertEqual((forward, pages), (listed, 5))
+
+        last_page = self.client.get(f'{self.url}?pagination=cursor&page_size=5')
+        for _ in range(4):
+            last_page = self.client.get(last_page.json()['next'])
+        backward, _ = self.walk(last_page.json()['previous'], 'previous')
+        self.assertEqual(backward[::-1] + self.ids(last_page), listed)
+
+        by_number = []
+        for page in range(1, 6):
+            by_number.extend(self.ids(self.client.get(self.url, {'page': page, 'page_size': 5})))
+        self.assertEqual(by_number, listed)
+
+    def test_invalid_cursor(self):
+        def cursor(payload):
+            return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+        for value in ('not-a-cursor', cursor({'p': [0, '1']}), cursor({'p': ['zero', '1', 1]}), cursor([1])):
+            response = self.client.get(self.url, {'cursor': value})
+            self.assertEqual(response.status_code, 404, value)
+
+
+class ChunkedUploadTests(TemporaryMediaMixin, TestCase):
+    CONTENT = b'0123456789' * 3
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='agent', email='agent@example.com', password='pass')
+        state = State.objects.create(name='Ontario', abbreviation='ON')
+        cls.project = Project.objects.create(
+            name='The Villas', project_address='1 Main St', city=City.objects.create(name='Toronto', state=state),
+        )
+
+    def setUp(self):
+        super().setUp()
+        upload_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, upload_dir, ignore_errors=True)
+        upload_override = override_settings(CHUNKED_UPLOAD_DIR=upload_dir, CHUNKED_UPLOAD_MAX_CHUNK_SIZE=10)
+        upload_override.enable()
+        self.addCleanup(upload_override.disable)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        response = self.client.post(reverse('upload-session-create'), {
+            'target': 'document', 'filename': 'brochure.pdf', 'size': len(self.CONTENT),
+            'sha256': hashlib.sha256(self.CONTENT).hexdigest(),
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.session_id = response.json()['id']
+        self.url = reverse('upload-session', args=[self.session_id])
+
+    def put_chunk(self, start, end):
+        return self.client.put(
+            self.url, self.CONTENT[start:end + 1], content_type='application/octet-stream',
+            headers={'Content-Range': f'bytes {start}-{end}/{len(self.CONTENT)}'},
+        )
+
+    def offset(self):
+        return self.client.get(self.url).json()['offset']
+
+    def test_chunks_must_continue_the_upload(self):
+        response = self.put_chunk(10, 19)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['offset'], 0)
+
+        self.assertEqual(self.put_chunk(0, 9).json()['offset'], 10)
+        # A resent chunk (e.g. its response was lost) is not appended twice
+        response = self.put_chunk(0, 9)
+        self.assertEqual((response.status_code, response.json()['offset']), (409, 10))
+        self.assertEqual(self.offset(), 10)
+
+    def test_chunk_is_read_outside_a_transaction(self):
+        depths = []
+
+        def receive(stream, length):
+            depths.append(len(connection.atomic_blocks))
+            return receive_chunk(stream, length)
+
+        depth = len(connection.atomic_blocks)
+        with mock.patch('projects.views.receive_chunk', receive):
+            self.assertEqual(self.put_chunk(0, 9).status_code, 200)
+        self.assertEqual(depths, [depth])
+
+    def test_racing_chunk_is_not_appended_twice(self):
+        session = UploadSession.objects.get(pk=self.session_id)
+
+        def receive(stream, length):
+            # Another request appends the same chunk while this one is transferred
+            with receive_chunk(io.BytesIO(self.CONTENT[:10]), 10) as other:
+                append_chunk(session, other, 0, 10)
+            return receive_chunk(stream, length)
+
+        with mock.patch('projects.views.receive_chunk', receive):
+            response = self.put_chunk(0, 9)
+        self.assertEqual((response.status_code, response.json()['offset']), (409, 10))
+        self.assertEqual(self.offset(), 10)
+
+    def test_oversized_chunk_is_rejected(self):
+        self.assertEqual(self.put_chunk(0, 19).status_code, 413)
+        self.assertEqual(self.offset(), 0)
+
+    def test_body_must_match_the_range(self):
+        response = self.client.put(
+            self.url, b'short', content_type='application/octet-stream',
+            headers={'Content-Range': f'bytes 0-9/{len(self.CONTENT)}'},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.offset(), 0)
+
+    def test_completed_upload_is_attached(self):
+        complete_url = reverse('upload-session-complete', args=[self.session_id])
+        self.put_chunk(0, 9)
+        self.assertEqual(self.client.post(complete_url, {'project': self.project.slug}).status_code, 409)
+        self.put_chunk(10, 19)
+        self.put_chunk(20, 29)
+
+        response = self.client.post(complete_url, {'project': self.project.slug, 'title': 'Brochure'})
+        self.assertEqual(response.status_code, 201, response.content)
+        document = Document.objects.get(project=self.project)
+        self.assertEqual(document.document.read(), self.CONTENT)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_file_is_stored_outside_a_transaction(self):
+        complete_url = reverse('upload-session-complete', args=[self.session_id])
+        for start in (0, 10, 20):
+            self.put_chunk(start, start + 9)
+        depths, responses = [], []
+
+        def store(session):
+            depths.append(len(connection.atomic_blocks))
+            # The session is claimed: it takes no more chunks and is not completed twice
+            self.assertEqual(UploadSession.objects.get(pk=session.pk).status, UploadSession.COMPLETING)
+            responses.append(self.client.post(complete_url, {'project': self.project.slug}))
+            responses.append(self.client.delete(self.url))
+            return store_session(session)
+
+        depth = len(connection.atomic_blocks)
+        with mock.patch('projects.views.store_session', store):
+            response = self.client.post(complete_url, {'project': self.project.slug, 'title': 'Brochure'})
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(depths, [depth])
+        self.assertEqual([r.status_code for r in responses], [409, 409])
+        self.assertEqual(Document.objects.get(project=self.project).document.read(), self.CONTENT)
+
+    def test_failed_store_leaves_the_session_resumable(self):
+        complete_url = reverse('upload-session-complete', args=[self.session_id])
+        for start in (0, 10, 20):
+            self.put_chunk(start, start + 9)
+
+        with mock.patch('projects.views.store_session', side_effect=OSError):
+            with self.assertRaises(OSError):
+                self.client.post(complete_url, {'project': self.project.slug, 'title': 'Brochure'})
+        self.assertEqual(UploadSession.objects.get(pk=self.session_id).status, UploadSession.RECEIVING)
+
+        response = self.client.post(complete_url, {'project': self.project.slug, 'title': 'Brochure'})
+        self.assertEqual(response.status_code, 201, response.content)
+
+
+class MediaServingTests(TemporaryMediaMixin, TestCase):
+    CONTENT = bytes(range(100))
+
+    def setUp(self):
+        super().setUp()
+        serve_override = override_settings(MEDIA_SERVE=True, MEDIA_SENDFILE=None)
+        serve_override.enable()
+        self.addCleanup(serve_override.disable)
+        name = default_storage.save('documents/brochure.pdf', ContentFile(self.CONTENT))
+        self.url = reverse('media', kwargs={'path': name})
+
+    def get(self, **headers):
+        response = self.client.get(self.url, headers=headers)
+        self.addCleanup(response.close)
+        return response
+
+    def content(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_whole_file(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(self.content(response), self.CONTENT)
+        self.assertEqual(self.get(**{'If-None-Match': response['ETag']}).status_code, 304)
+
+    def test_byte_ranges(self):
+        response = self.get(Range='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/100')
+        self.assertEqual(self.content(response), self.CONTENT[10:20])
+
+        response = self.get(Range='bytes=-5')
+        self.assertEqual(response['Content-Range'], 'bytes 95-99/100')
+        self.assertEqual(self.content(response), self.CONTENT[95:])
+        # Open-ended ranges stop at the end of the file
+        self.assertEqual(self.content(self.get(Range='bytes=90-200')), self.CONTENT[90:])
+
+    def test_unsatisfiable_range(self):
+        for header in ('bytes=100-', 'bytes=-0'):
+            response = self.get(Range=header)
+            self.assertEqual(response.status_code, 416, header)
+            self.assertEqual(response['Content-Range'], 'bytes */100')
+
+    def test_if_range(self):
+        etag, last_modified = self.get()['ETag'], self.get()['Last-Modified']
+        for validator in (etag, last_modified):
+            response = self.get(Range='bytes=0-9', **{'If-Range': validator})
+            self.assertEqual(response.status_code, 206, validator)
+            self.assertEqual(self.content(response), self.CONTENT[:10])
+        # The file changed since the client's copy: the whole file is sent
+        response = self.get(Range='bytes=0-9', **{'If-Range': '"stale"'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.content(response), self.CONTENT)
+
+    @override_settings(MEDIA_SERVE=False)
+    def test_not_served_unless_enabled(self):
+        self.assertEqual(self.get().status_code, 404)
+
+
+@mock.patch.object(cleanup_worker, 'enqueue', side_effect=delete_files)
+class DirectUploadTests(TemporaryMediaMixin, TestCase):
+    CONTENT = b'%PDF brochure'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='agent', email='agent@example.com', password='pass')
+        state = State.objects.create(name='Ontario', abbreviation='ON')
+        cls.project = Project.objects.create(
+            name='The Villas', project_address='1 Main St', city=City.objects.create(name='Toronto', state=state),
+        )
+
+    def setUp(self):
+        super().setUp()
+        reservation_override = override_settings(MEDIA_BLOB_RESERVATION=0)
+        reservation_override.enable()
+        self.addCleanup(reservation_override.disable)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        response = self.client.post(reverse('direct-upload-create'), {
+            'target': 'document', 'filename': 'brochure.pdf', 'size': len(self.CONTENT),
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.upload_id = response.json()['id']
+        self.upload_url = response.json()['upload_url']
+        self.finalize_url = reverse('direct-upload-finalize', args=[self.upload_id])
+
+    def put(self, content, url=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.put(url or self.upload_url, content, content_type='application/octet-stream')
+
+    def test_uploaded_file_is_attached(self, enqueue):
+        self.assertEqual(self.client.post(self.finalize_url, {'project': self.project.slug}).status_code, 409)
+        response = self.put(self.CONTENT)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], f'"{hashlib.sha256(self.CONTENT).hexdigest()}"')
+
+        response = self.client.post(self.finalize_url, {'project': self.project.slug, 'title': 'Brochure'})
+        self.assertEqual(response.status_code, 201, response.content)
+        document = Document.objects.get(project=self.project)
+        self.assertEqual(document.document.read(), self.CONTENT)
+        self.assertEqual(document.document_metadata['size'], len(self.CONTENT))
+        # Finalized uploads take no more files
+        self.assertEqual(self.put(b'%PDF other').status_code, 404)
+        self.assertEqual(self.client.post(self.finalize_url, {'project': self.project.slug}).status_code, 404)
+
+    def test_repeated_upload_replaces_the_stored_file(self, enqueue):
+        self.put(b'%PDF draft')
+        first = DirectUpload.objects.get(pk=self.upload_id).stored_name
+        self.put(self.CONTENT)
+        second = DirectUpload.objects.get(pk=self.upload_id).stored_name
+        self.assertNotEqual(first, second)
+        self.assertFalse(blob_storage.exists(first))
+        self.assertTrue(blob_storage.exists(second))
+
+    def test_body_larger_than_declared_is_rejected(self, enqueue):
+        self.assertEqual(self.put(self.CONTENT + b'!').status_code, 413)
+        self.assertEqual(DirectUpload.objects.get(pk=self.upload_id).stored_name, '')
+
+    def test_invalid_token_is_rejected(self, enqueue):
+        url = reverse('direct-upload-target', args=['not-a-token'])
+        self.assertEqual(self.put(self.CONTENT, url).status_code, 403)
+        token = self.upload_url.rstrip('/').rsplit('/', 1)[1]
+        url = reverse('direct-upload-target', args=[token[:-1] + ('A' if token[-1] != 'A' else 'B')])
+        self.assertEqual(self.put(self.CONTENT, url).status_code, 403)
+
+    def test_expired_upload_is_rejected_and_purged(self, enqueue):
+        self.put(self.CONTENT)
+        stored_name = DirectUpload.objects.get(pk=self.upload_id).stored_name
+        DirectUpload.objects.filter(pk=self.upload_id).update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.put(self.CONTENT).status_code, 410)
+        self.assertEqual(self.client.post(self.finalize_url, {'project': self.project.slug}).status_code, 410)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('direct-upload-create'), {
+                'target': 'document', 'filename': 'other.pdf', 'size': 10,
+            }, format='json')
+        self.assertFalse(DirectUpload.objects.filter(pk=self.upload_id).exists())
+        self.assertFalse(blob_storage.exists(stored_name))
+
+    def test_upload_finalized_while_storing_is_discarded(self, enqueue):
+        def finalize_meanwhile(upload, stream):
+            DirectUpload.objects.filter(pk=upload.pk).delete()
+            return store(upload, stream)
+
+        store = store_upload
+        with mock.patch('projects.views.store_upload', finalize_meanwhile):
+            self.assertEqual(self.put(self.CONTENT).status_code, 410)
+        self.assertFalse(blob_storage.exists(blob_name(hashlib.sha256(self.CONTENT).hexdigest(), 'brochure.pdf')))
+
+
+class UniqueSlugTests(TestCase):
+    def test_smallest_free_suffix_is_used(self):
+        State.objects.create(name='Ontario', abbreviation='ON')
+        State.objects.create(name='Ontario', abbreviation='ON', slug='ontario-2')
+        State.objects.create(name='Ontario', abbreviation='ON', slug='ontario-west')
+        slugs = [State.objects.create(name='Ontario', abbreviation='ON').slug for _ in range(2)]
+        self.assertEqual(slugs, ['ontario-1', 'ontario-3'])
+
+    def test_save_is_retried_when_the_slug_is_taken_meanwhile(self):
+        State.objects.create(name='Ontario', abbreviation='ON')
+        allocations = []
+
+        def stale_then_fresh(queryset, field, base, separator='-'):
+            # The first lookup ran before a concurrent insert took 'ontario'
+            value = base if not allocations else next_unique_value(queryset, field, base, separator)
+            allocations.append(value)
+            return value
+
+        with mock.patch('platformb.utils.next_unique_value', stale_then_fresh):
+            state = State.objects.create(name='Ontario', abbreviation='ON')
+        self.assertEqual(allocations, ['ontario', 'ontario-1'])
+        self.assertEqual(state.slug, 'ontario-1')
+        self.assertEqual(State.objects.count(), 2)
+
+    def test_usernames_are_allocated_without_separator(self):
+        first = User.objects.create(email='agent@example.com')
+        second = User.objects.create(email='agent@example.org')
+        self.assertEqual((first.username, second.username), ('agent', 'agent1'))
+
+
+class NestedProjectWriteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        state = State.objects.create(name='Ontario', abbreviation='ON')
+        cls.city = City.objects.create(name='Toronto', state=state)
+
+    def save(self, data, instance=None):
+        serializer = ProjectSerializer(instance, data=data, partial=instance is not None)
+        serializer.is_valid(raise_exception=True)
+        return serializer.save()
+
+    def project_data(self, children):
+        return {
+            'name': 'The Villas', 'project_address': '1 Main St', 'city_id': self.city.pk,
+            'floor_plans': [{'name': f'Plan {number}', 'bedrooms': '3', 'bathrooms': '2.5'} for number in range(children)],
+            'contacts': [{'name': f'Agent {number}', 'email': f'agent{number}@example.com'} for number in range(children)],
+        }
+
+    def count_queries(self, data, instance=None):
+        with CaptureQueriesContext(connection) as queries:
+            self.save(data, instance)
+        return len(queries)
+
+    def test_create_writes_children_in_bulk(self):
+        self.assertEqual(self.count_queries(self.project_data(2)), self.count_queries(self.project_data(20)))
+        project = Project.objects.get(slug='the-villas-1')
+        self.assertEqual(project.floor_plans.count(), 20)
+        self.assertEqual(project.contacts.count(), 20)
+        plan = project.floor_plans.get(name='Plan 0')
+        self.assertEqual((plan.bedrooms, plan.bathrooms, plan.house_type), (3, 2.5, 'Single Family'))
+
+    def test_update_writes_children_in_bulk(self):
+        small, large = self.save(self.project_data(2)), self.save(self.project_data(20))
+
+        def update_data(project):
+            plans = list(project.floor_plans.order_by('pk'))
+            contacts = list(project.contacts.order_by('pk'))
+            return {
+                'floor_plans': [{'id': plan.pk, 'bedrooms': '4'} for plan in plans[1:]] + [{'name': 'Plan new'}],
+                'deleted_floor_plan_ids': [plans[0].pk],
+                'contacts': [{'id': contact.pk, 'phone': '555-0100'} for contact in contacts[1:]] + [{'name': 'Agent new'}],
+            }
+
+        self.assertEqual(self.count_queries(update_data(small), small), self.count_queries(update_data(large), large))
+        self.assertEqual(list(large.floor_plans.order_by('pk').values_list('bedrooms', flat=True)), [4] * 19 + [None])
+        self.assertFalse(large.floor_plans.filter(name='Plan 0').exists())
+        self.assertEqual(large.contacts.count(), 20)
+        self.assertEqual(large.contacts.filter(phone='555-0100').count(), 19)
+        self.assertFalse(large.contacts.filter(name='Agent 0').exists())
+
+    def test_new_floor_plan_named_like_an_existing_one_updates_it(self):
+        project = self.save(self.project_data(2))
+        self.save({'floor_plans': [{'name': 'Plan 1', 'bedrooms': '5'}]}, project)
+        self.assertEqual(project.floor_plans.count(), 2)
+        self.assertEqual(project.floor_plans.get(name='Plan 1').bedrooms, 5)
+
+    def test_failed_update_writes_nothing(self):
+        project = self.save(self.project_data(2))
+        plan = project.floor_plans.get(name='Plan 0')
+        with self.assertRaises(ValidationError), self.assertLogs('projects.serializers', 'ERROR'):
+            self.save({
+                'name': 'The Villas II',
+                'floor_plans': [{'id': plan.pk, 'bedrooms': '4'}, {'name': 'Plan new', 'bedrooms': 'four'}],
+            }, project)
+        project.refresh_from_db()
+        plan.refresh_from_db()
+        self.assertEqual((project.name, plan.bedrooms), ('The Villas', 3))
+        self.assertEqual(project.floor_plans.count(), 2)
+
+
+class UploadLimitTests(TemporaryMediaMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='agent', email='agent@example.com', password='pass')
+        state = State.objects.create(name='Ontario', abbreviation='ON')
+        cls.city = City.objects.create(name='Toronto', state=state)
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_project(self, **files):
+        return self.client.post(reverse('project-list'), {
+            'name': 'The Villas', 'project_address': '1 Main St', 'city_id': self.city.pk, **files,
+        }, format='multipart')
+
+    def assertNothingStored(self):
+        self.assertFalse(Project.objects.exists())
+        self.assertEqual(list(os.walk(default_storage.location))[0][1:], ([], []))
+
+    @override_settings(UPLOAD_MAX_FIELD_SIZES={'uploaded_images': 10}, UPLOAD_MAX_FILE_SIZE=100)
+    def test_field_limits(self):
+        response = self.create_project(
+            uploaded_images=[SimpleUploadedFile('front.jpg', b'x' * 20)],
+            uploaded_legal_documents=[SimpleUploadedFile('terms.pdf', b'x' * 50)],
+        )
+        self.assertEqual(response.status_code, 413)
+        self.assertIn('uploaded_images', response.json()['detail'])
+        self.assertNothingStored()
+
+        response = self.create_project(uploaded_legal_documents=[SimpleUploadedFile('terms.pdf', b'x' * 101)])
+        self.assertEqual(response.status_code, 413)
+        self.assertNothingStored()
+
+        response = self.create_project(
+            uploaded_images=[SimpleUploadedFile('front.jpg', b'x' * 10)],
+            uploaded_legal_documents=[SimpleUploadedFile('terms.pdf', b'x' * 100)],
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+
+    @override_settings(UPLOAD_MAX_REQUEST_SIZE=1000)
+    def test_declared_length_over_the_request_limit_is_rejected_unread(self):
+        with mock.patch.object(LimitedTemporaryFileUploadHandler, 'receive_data_chunk') as receive:
+            response = self.create_project(uploaded_legal_documents=[SimpleUploadedFile('terms.pdf', b'x' * 1000)])
+        self.assertEqual(response.status_code, 413)
+        receive.assert_not_called()
+        self.assertNothingStored()
+
+    @override_settings(UPLOAD_MAX_REQUEST_SIZE=100, UPLOAD_MAX_FILE_SIZE=None)
+    def test_files_are_spooled_to_disk_under_the_request_limit(self):
+        handler = LimitedTemporaryFileUploadHandler()
+        handler.new_file('uploaded_images', 'front.jpg', 'image/jpeg', None)
+        handler.receive_data_chunk(b'x' * 60, 0)
+        uploaded = handler.file_complete(60)
+        self.addCleanup(uploaded.close)
+        self.assertIsInstance(uploaded, TemporaryUploadedFile)
+        self.assertEqual(uploaded.sha256, hashlib.sha256(b'x' * 60).hexdigest())
+
+        handler.new_file('uploaded_images', 'back.jpg', 'image/jpeg', None)
+        with self.assertRaisesMessage(UploadTooLarge, 'Uploaded files exceed'):
+            handler.receive_data_chunk(b'x' * 60, 0)
+        # The partial file is removed
+        self.assertFalse(os.path.exists(handler.file.temporary_file_path()))
+
+
+class ProjectSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='agent', email='agent@example.com', password='pass')
+        state = State.objects.create(name='Ontario', abbreviation='ON')
+        cls.city = City.objects.create(name='Toronto', state=state)
+        other_city = City.objects.create(name='Ottawa', state=state)
+        cls.lakeside = Project.objects.create(
+            name='Lakeside Villas', project_address='1 Main St', city=cls.city,
+            project_description='<p class="luxury">Quiet homes</p>',
+        )
+        cls.meadows = Project.objects.create(
+            name='The Meadows', project_address='2 Lake Rd', city=other_city,
+            project_description='<p>Walk to the lakeside trail</p>',
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def search(self, terms):
+        response = self.client.get(reverse('project-list'), {'search': terms})
+        self.assertEqual(response.status_code, 200)
+        return [result['slug'] for result in response.json()['results']]
+
+    def test_title_hits_rank_first(self):
+        self.assertEqual(self.search('lakeside'), [self.lakeside.slug, self.meadows.slug])
+
+    def test_every_word_must_match_as_a_prefix(self):
+        self.assertEqual(self.search('vill toron'), [self.lakeside.slug])
+        self.assertEqual(self.search('villas ottawa'), [])
+
+    def test_markup_is_not_searchable(self):
+        self.assertEqual(self.search('luxury'), [])
+        self.assertEqual(self.search('quiet'), [self.lakeside.slug])
+
+    def test_operators_are_ignored(self):
+        self.assertEqual(self.search('meadows"* OR'), [])
+        self.assertEqual(self.search('meadows" *'), [self.meadows.slug])
+        self.assertEqual(len(self.search('"* -')), 2)
+
+    def test_explicit_ordering_wins(self):
+        response = self.client.get(reverse('project-list'), {'search': 'lakeside', 'ordering': 'name'})
+        self.assertEqual([result['slug'] for result in response.json()['results']], [self.lakeside.slug, self.meadows.slug])
+        response = self.client.get(reverse('project-list'), {'search': 'lakeside', 'ordering': '-name'})
+        self.assertEqual([result['slug'] for result in response.json()['results']], [self.meadows.slug, self.lakeside.slug])
+
+    def test_documents_follow_renames(self):
+        self.city.name = 'Mississauga'
+        self.city.save()
+        self.assertEqual(self.search('mississauga'), [self.lakeside.slug])
+        self.lakeside.name = 'Harbour Point'
+        self.lakeside.save()
+        self.assertEqual(self.search('harbour'), [self.lakeside.slug])
+        self.assertEqual(self.search('lakeside'), [self.meadows.slug])
+
+    def test_rebuild_search_index(self):
+        ProjectSearchDocument.objects.all().delete()
+        self.assertEqual(self.search('lakeside'), [])
+        call_command('rebuild_search_index', stdout=io.StringIO())
+        self.assertEqual(self.search('lakeside'), [self.lakeside.slug, self.meadows.slug])
+
+
+@mock.patch.object(cleanup_worker, 'enqueue', side_effect=delete_files)
+class MediaCleanupTests(TemporaryMediaMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        state = State.objects.create(name='Ontario', abbreviation='ON')
+        cls.project = Project.objects.create(
+            name='The Villas', project_address='1 Main St', city=City.objects.create(name='Toronto', state=state),
+        )
+
+    def create_feature(self):
+        return FeatureFinish.objects.create(project=self.project, image=SimpleUploadedFile('kitchen.jpg', b'kitchen'))
+
+    def api_client(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username='agent', email='agent@example.com', password='pass'))
+        return client
+
+    def watch_storage_deletes(self):
+        return mock.patch.object(
+            ContentAddressedStorage, 'delete', autospec=True, side_effect=ContentAddressedStorage.delete,
+        )
+
+    @override_settings(MEDIA_BLOB_RESERVATION=0)
+    def test_deleted_lot_rendering_is_removed_after_commit(self, enqueue):
+        lot = Lot.objects.create(project=self.project, lot_number='1', lot_rendering=SimpleUploadedFile('lot.jpg', b'lot'))
+        name = lot.lot_rendering.name
+        with self.captureOnCommitCallbacks(execute=True), self.watch_storage_deletes() as storage_delete:
+            response = self.api_client().delete(reverse('project-lot-detail', args=[self.project.slug, lot.pk]))
+            self.assertEqual(response.status_code, 204)
+            storage_delete.assert_not_called()
+        self.assertFalse(blob_storage.exists(name))
+
+    @override_settings(MEDIA_BLOB_RESERVATION=0)
+    def test_removed_plan_file_is_deleted_after_commit(self, enqueue):
+        plan = FloorPlan.objects.create(project=self.project, name='Plan A', plan_file=SimpleUploadedFile('a.pdf', b'plan'))
+        name = plan.plan_file.name
+        with self.captureOnCommitCallbacks(execute=True), self.watch_storage_deletes() as storage_delete:
+            response = self.api_client().patch(
+                reverse('floor-plan-detail', args=[plan.pk]), {'plan_file_remove': True}, format='json',
+            )
+            self.assertEqual(response.status_code, 200, response.content)
+            storage_delete.assert_not_called()
+        plan.refresh_from_db()
+        self.assertFalse(plan.plan_file)
+        self.assertFalse(blob_storage.exists(name))
+
+    def test_files_of_deleted_rows_are_deleted_after_commit(self, enqueue):
+        feature = self.create_feature()
+        name = feature.image.name
+        with self.captureOnCommitCallbacks(execute=True):
+            FeatureFinish.objects.get(pk=feature.pk).delete()
+            self.assertTrue(default_storage.exists(name))
+        self.assertFalse(default_storage.exists(name))
+
+    def test_rolled_back_deletion_keeps_the_file(self, enqueue):
+        feature = self.create_feature()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                feature.delete()
+                raise RuntimeError
+        self.assertEqual(callbacks, [])
+        enqueue.assert_not_called()
+        self.assertTrue(default_storage.exists(feature.image.name))
+
+    def test_replaced_file_is_deleted(self, enqueue):
+        feature = FeatureFinish.objects.get(pk=self.create_feature().pk)
+        old_name = feature.image.name
+        with self.captureOnCommitCallbacks(execute=True):
+            feature.image = SimpleUploadedFile('bath.jpg', b'bath')
+            feature.save()
+        self.assertFalse(default_storage.exists(old_name))
+        self.assertTrue(default_storage.exists(feature.image.name))
+
+    def test_worker_deletes_in_batches(self, enqueue):
+        names = [default_storage.save(f'features_finishes/{number}.jpg', ContentFile(b'x')) for number in range(3)]
+        failing = mock.Mock(**{'delete.side_effect': OSError('read-only')})
+        batches = []
+
+        def record_batch(files):
+            batches.append(len(files))
+            delete_files(files)
+
+        worker = MediaCleanupWorker(batch_size=2)
+        with mock.patch('platformb.media.delete_files', record_batch), self.assertLogs('platformb.media', 'WARNING'):
+            worker.enqueue([(failing, 'features_finishes/gone.jpg')] + [(default_storage, name) for name in names])
+            worker.flush()
+        self.assertEqual(batches, [2, 2])
+        self.assertFalse(any(default_storage.exists(name) for name in names))
+
+
+class CollectOrphanedMediaTests(TemporaryMediaMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        state = State.objects.create(name='Ontario', abbreviation='ON')
+        cls.project = Project.objects.create(
+            name='The Villas', project_address='1 Main St', city=City.objects.create(name='Toronto', state=state),
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.checkpoint = os.path.join(default_storage.location, 'gc.json')
+        checkpoint_override = override_settings(MEDIA_GC_CHECKPOINT_FILE=self.checkpoint)
+        checkpoint_override.enable()
+        self.addCleanup(checkpoint_override.disable)
+
+    def save_file(self, name, age_hours=48, storage=default_storage):
+        name = storage.save(name, ContentFile(name.encode()))
+        mtime = time.time() - age_hours * 3600
+        os.utime(storage.path(name), (mtime, mtime))
+        return name
+
+    def collect(self, *args):
+        out = io.StringIO()
+        call_command('collect_orphaned_media', *args, stdout=out)
+        return out.getvalue()
+
+    def test_unreferenced_old_files_are_deleted(self):
+        referenced = FeatureFinish.objects.create(project=self.project, image=self.save_file('features_finishes/kept.jpg'))
+        orphan = self.save_file('features_finishes/orphan.jpg')
+        fresh = self.save_file('features_finishes/fresh.jpg', age_hours=1)
+        unmanaged = self.save_file('exports/report.csv')
+
+        output = self.collect()
+        self.assertIn(orphan, output)
+        self.assertTrue(default_storage.exists(orphan))
+
+        self.assertIn('Deleted 1 file(s)', self.collect('--apply'))
+        self.assertFalse(default_storage.exists(orphan))
+        for name in (referenced.image.name, fresh, unmanaged):
+            self.assertTrue(default_storage.exists(name), name)
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_reserved_blobs_are_kept(self):
+        name = self.save_file('renderings/kitchen.jpg', storage=blob_storage)
+        self.assertIn('Deleted 0 file(s)', self.collect('--apply'))
+        self.assertTrue(blob_storage.exists(name))
+
+        MediaBlob.objects.filter(name=name).update(reserved_until=timezone.now() - timedelta(seconds=1))
+        self.assertIn('Deleted 1 file(s)', self.collect('--apply'))
+        self.assertFalse(blob_storage.exists(name))
+        self.assertFalse(MediaBlob.objects.filter(name=name).exists())
+
+    def test_blob_reserved_during_the_scan_is_kept(self):
+        name = self.save_file('renderings/kitchen.jpg', storage=blob_storage)
+        MediaBlob.objects.filter(name=name).update(reserved_until=timezone.now() - timedelta(seconds=1))
+        is_referenced = ContentAddressedStorage.is_referenced
+
+        def reserved_after_check(storage, blob):
+            referenced = is_referenced(storage, blob)
+            # Reused by an upload right after the collector looked
+            blob_storage.save('renderings/kitchen-copy.jpg', ContentFile(b'renderings/kitchen.jpg'))
+            return referenced
+
+        with mock.patch.object(ContentAddressedStorage, 'is_referenced', reserved_after_check):
+            self.assertIn('Deleted 0 file(s)', self.collect('--apply'))
+        self.assertTrue(blob_storage.exists(name))
+
+    def test_interrupted_scan_resumes(self):
+        orphans = [self.save_file(f'features_finishes/{number}.jpg') for number in range(3)]
+        with open(self.checkpoint, 'w') as fh:
+            json.dump({
+                'mode': 'apply', 'done_dirs': [], 'current_dir': 'features_finishes',
+                'after': os.path.basename(orphans[0]), 'stats': {'scanned': 1, 'orphans': 1, 'bytes': 1, 'deleted': 1},
+            }, fh)
+        self.assertIn('Deleted 3 file(s)', self.collect('--apply'))
+        self.assertEqual([default_storage.exists(name) for name in orphans], [True, False, False])
+        self.assertIn('Deleted 1 file(s)', self.collect('--apply', '--restart'))
+        self.assertFalse(default_storage.exists(orphans[0]))
+
+
+@unittest.skipUnless(variants_enabled(), 'Image variants need Pillow')
+@mock.patch.object(cleanup_worker, 'enqueue', side_effect=delete_files)
+@override_settings(IMAGE_VARIANT_WIDTHS=(320, 640, 1280), IMAGE_VARIANT_FORMATS=('webp', 'jpeg'))
+class ImageVariantTests(TemporaryMediaMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        state = State.objects.create(name='Ontario', abbreviation='ON')
+        cls.project = Project.objects.create(
+            name='The Villas', project_address='1 Main St', city=City.objects.create(name='Toronto', state=state),
+        )
+
+    def image(self, name, size=(800, 400), color='navy'):
+        out = io.BytesIO()
+        PILImage.new('RGB', size, color).save(out, 'PNG')
+        return SimpleUploadedFile(name, out.getvalue(), content_type='image/png')
+
+    def run_variant_jobs(self):
+        for job in Job.objects.filter(task=generate_image_variants.task_path, status=Job.QUEUED):
+            generate_image_variants(**job.kwargs)
+            job.delete()
+
+    def test_variants_are_rendered_by_a_job(self, enqueue):
+        feature = FeatureFinish.objects.create(project=self.project, image=self.image('kitchen.png'))
+        self.assertEqual(feature.image_variants, {})
+        self.run_variant_jobs()
+
+        feature.refresh_from_db()
+        record = feature.image_variants
+        self.assertEqual(record['source'], feature.image.name)
+        # Widths not narrower than the original are skipped
+        self.assertEqual({fmt: sorted(widths) for fmt, widths in record['formats'].items()},
+                         {'webp': ['320', '640'], 'jpeg': ['320', '640']})
+        with default_storage.open(record['formats']['webp']['320']) as fh, PILImage.open(fh) as variant:
+            self.assertEqual((variant.format, variant.size), ('WEBP', (320, 160)))
+
+        data = FeatureFinishSerializer(feature).data
+        self.assertEqual(data['image_variants']['jpeg']['640'], default_storage.url(record['formats']['jpeg']['640']))
+
+    def test_replaced_image_drops_its_variants(self, enqueue):
+        feature = FeatureFinish.objects.create(project=self.project, image=self.image('kitchen.png'))
+        self.run_variant_jobs()
+        feature.refresh_from_db()
+        old_variants = variant_names(feature.image_variants)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            feature.image = self.image('bath.png', color='teal')
+            feature.save()
+        self.assertEqual(feature.image_variants, {})
+        self.assertFalse(any(default_storage.exists(name) for name in old_variants))
+        self.run_variant_jobs()
+        feature.refresh_from_db()
+        self.assertEqual(feature.image_variants['source'], feature.image.name)
+
+    def test_variants_of_a_replaced_source_are_discarded(self, enqueue):
+        feature = FeatureFinish.objects.create(project=self.project, image=self.image('kitchen.png'))
+        rendered = render_variants(feature.image.path, (320,), ('jpeg',), 80)
+        store_variants(
+            FeatureFinish, feature.pk, self.project.pk, 'image', 'image_variants',
+            'features_finishes/replaced.png', default_storage, rendered,
+        )
+        feature.refresh_from_db()
+        self.assertEqual(feature.image_variants, {})
+        self.assertFalse(default_storage.exists(variant_name('features_finishes/replaced.png', '320', 'jpeg')))
+
+    def test_rows_sharing_a_blob_share_its_variants(self, enqueue):
+        first = Rendering.objects.create(project=self.project, image=self.image('front.png'))
+        second = Rendering.objects.create(project=self.project, image=self.image('front-copy.png'))
+        self.run_variant_jobs()
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.image_variants, second.image_variants)
+
+        # Variants are kept while another row still uses the blob
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(all(blob_storage.exists(name) for name in variant_names(second.image_variants)))
+
+    def test_missing_pillow_is_reported_at_startup(self, enqueue):
+        self.assertEqual(check_pillow(None), [])
+        with mock.patch('projects.images.Image', None):
+            self.assertEqual([warning.id for warning in check_pillow(None)], ['projects.W002'])
+
+
+class MediaMetadataTests(TemporaryMediaMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        state = State.objects.create(name='Ontario', abbreviation='ON')
+        cls.project = Project.objects.create(
+            name='The Villas', project_address='1 Main St', city=City.objects.create(name='Toronto', state=state),
+        )
+
+    def document(self):
+        return Document.objects.create(
+            project=self.project, title='Brochure', document=SimpleUploadedFile('brochure.pdf', b'%PDF brochure'),
+        )
+
+    def test_file_metadata(self):
+        document = self.document()
+        self.assertEqual(document.document_metadata, {
+            'filename': 'brochure.pdf', 'size': 13, 'content_type': 'application/pdf', 'sha256': hashlib.sha256(b'%PDF brochure').hexdigest(),
+        })
+
+    @unittest.skipIf(PILImage is None, 'Image dimensions need Pillow')
+    def test_image_dimensions_follow_exif_orientation(self):
+        out = io.BytesIO()
+        exif = PILImage.Exif()
+        exif[0x0112] = 6  # rotated 90 degrees
+        PILImage.new('RGB', (40, 20)).save(out, 'JPEG', exif=exif)
+        rendering = Rendering.objects.create(project=self.project, image=SimpleUploadedFile('front.jpg', out.getvalue()))
+        metadata = rendering.image_metadata
+        self.assertEqual((metadata['width'], metadata['height'], metadata['content_type']), (20, 40, 'image/jpeg'))
+        self.assertEqual(metadata['size'], len(out.getvalue()))
+
+    def test_hash_computed_while_receiving_is_reused(self):
+        upload = SimpleUploadedFile('brochure.pdf', b'%PDF brochure')
+        upload.sha256 = hashlib.sha256(b'%PDF brochure').hexdigest()
+        with mock.patch('hashlib.sha256', side_effect=AssertionError('hashed again')):
+            document = Document.objects.create(project=self.project, title='Brochure', document=upload)
+        self.assertEqual(document.document_metadata['sha256'], upload.sha256)
+
+    def test_metadata_follows_the_file(self):
+        document = Document.objects.get(pk=self.document().pk)
+        with mock.patch('platformb.media.file_metadata') as file_metadata:
+            document.title = 'Price list'
+            document.save()
+        file_metadata.assert_not_called()
+
+        document.document = SimpleUploadedFile('prices.pdf', b'%PDF prices 2026')
+        document.save()
+        self.assertEqual(document.document_metadata['size'], 16)
+        document.document = None
+        document.save()
+        self.assertEqual(document.document_metadata, {})
+
+    def test_bulk_created_rows_record_metadata(self):
+        Document.objects.bulk_create([
+            Document(project=self.project, document=SimpleUploadedFile(f'{number}.pdf', b'x' * number))
+            for number in (1, 2)
+        ])
+        self.assertEqual(
+            sorted(metadata['size'] for metadata in Document.objects.values_list('document_metadata', flat=True)), [1, 2]
+        )
+
+
+@override_settings(EXPORT_CHUNK_SIZE=2)
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='agent', email='agent@example.com', password='pass')
+        state = State.objects.create(name='Ontario', abbreviation='ON')
+        city = City.objects.create(name='Toronto', state=state)
+        cls.project = Project.objects.create(name='The Villas', project_address='1 Main St', city=city)
+        other = Project.objects.create(name='The Meadows', project_address='2 Lake Rd', city=city)
+        ProjectInquires.objects.bulk_create(
+            [ProjectInquires(project=cls.project, name=f'Buyer {number}', message='Hello') for number in range(4)]
+            + [
+                ProjectInquires(project=cls.project, name='=HYPERLINK("http://example.com")', phone='+1 555 0100'),
+                ProjectInquires(project=other, name='Elsewhere'),
+            ]
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('project-inquiry-export', args=[self.project.slug, 'csv'])
+
+    def test_csv_is_streamed_in_chunks(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertRegex(response['Content-Disposition'], r'^attachment; filename="inquiries-\d{8}-\d{6}\.csv"$')
+        self.assertEqual((response['Cache-Control'], response['X-Accel-Buffering']), ('no-store', 'no'))
+        chunks = [chunk.decode() for chunk in response.streaming_content]
+        # The header and two rows, then two rows at a time
+        self.assertEqual([chunk.count('\n') for chunk in chunks], [3, 2, 1])
+        rows = list(csv.reader(io.StringIO(''.join(chunks))))
+        self.assertEqual(rows[0], list(ProjectInquiryExportView.export_columns))
+        self.assertEqual(len(rows), 6)
+
+    def test_formula_cells_are_escaped(self):
+        content = b''.join(self.client.get(self.url).streaming_content).decode()
+        escaped = list(csv.DictReader(io.StringIO(content)))[-1]
+        self.assertEqual(escaped['name'], '\'=HYPERLINK("http://example.com")')
+        # Phone numbers look like formulas but are left alone
+        self.assertEqual((escaped['phone'], escaped['email']), ('+1 555 0100', ''))
+
+    def test_only_real_formulas_are_escaped(self):
+        values = [
+            '+1 (416) 555-0100', '-5', '-0.25', '+44 20 7946 0958',
+            '+SUM(A1:A2)', "-2+3+cmd|' /C calc'!A0", '=1+1', '@SUM(A1)', '-', '+',
+        ]
+        content = ''.join(csv_chunks([{'value': value} for value in values], ['value'], 100))
+        self.assertEqual([row['value'] for row in csv.DictReader(io.StringIO(content))], [
+            '+1 (416) 555-0100', '-5', '-0.25', '+44 20 7946 0958',
+            "'+SUM(A1:A2)", "'-2+3+cmd|' /C calc'!A0", "'=1+1", "'@SUM(A1)", "'-", "'+",
+        ])
+
+    def test_ndjson_keeps_raw_values(self):
+        response = self.client.get(reverse('project-inquiry-export', args=[self.project.slug, 'ndjson']))
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        chunks = list(response.streaming_content)
+        self.assertEqual(len(chunks), 3)
+        records = [json.loads(line) for line in b''.join(chunks).decode().splitlines()]
+        self.assertEqual(len(records), 5)
+        self.assertEqual(records[-1]['name'], '=HYPERLINK("http://example.com")')
+        self.assertEqual(records[0]['project_slug'], self.project.slug)
+
+    def test_filters_apply(self):
+        response = self.client.get(reverse('project-inquiry-export-all', args=['ndjson']), {'search': 'Buyer 1'})
+        lines = b''.join(response.streaming_content).splitlines()
+        self.assertEqual([json.loads(line)['name'] for line in lines], ['Buyer 1'])
+
+    def test_unknown_format_and_anonymous_requests_are_rejected(self):
+        xlsx_url = reverse('project-inquiry-export', args=[self.project.slug, 'xlsx'])
+        self.assertEqual(self.client.get(xlsx_url).status_code, 404)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    async def test_asgi_export_is_pulled_chunk_by_chunk(self):
+        response = await self.async_client.get(
+            self.url, headers={'Authorization': f'Bearer {AccessToken.for_user(self.user)}'},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        chunks = [chunk async for chunk in response.streaming_content]
+        self.assertEqual(len(chunks), 3)
+        self.assertIn(b'Buyer 3', b''.join(chunks))
@@ -0,0 +1,126 @@
+import hashlib
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.parsers import MultiPartParser
+
+from platformb.media import file_fields, file_metadata
+
+
+class UploadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Upload exceeds the allowed size.'
+    default_code = 'upload_too_large'
+
+
+def _format_size(num_bytes):
+    return f'{num_bytes / (1024 * 1024):.0f} MB'
+
+
+def field_size_limit(field_name):
+    """Byte limit of an uploaded file field (UPLOAD_MAX_FIELD_SIZES, else UPLOAD_MAX_FILE_SIZE)"""
+    # Longest prefix first so the most specific entry wins
+    field_limits = sorted(
+        getattr(settings, 'UPLOAD_MAX_FIELD_SIZES', {}).items(),
+        key=lambda item: len(item[0]),
+        reverse=True
+    )
+    for prefix, limit in field_limits:
+        if field_name.startswith(prefix):
+            return limit
+    return getattr(settings, 'UPLOAD_MAX_FILE_SIZE', None)
+
+
+class LimitedTemporaryFileUploadHandler(TemporaryFileUploadHandler):
+    """
+    Streams every uploaded file part straight to a temporary file (never to
+    memory) and enforces byte limits while the body is read:
+
+    * UPLOAD_MAX_REQUEST_SIZE: total bytes of the request / of all its files
+    * UPLOAD_MAX_FIELD_SIZES: per-field limits, matched by field name prefix
+      (e.g. ``uploaded_images`` or ``floor_plans`` for ``floor_plans[0].plan_file``)
+    * UPLOAD_MAX_FILE_SIZE: limit for fields without a specific entry
+
+    Each file's SHA-256 is computed from the chunks as they arrive and set as
+    ``sha256`` on the uploaded file, so recording its metadata does not read
+    it again (platformb.media.file_metadata).
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.request_limit = getattr(settings, 'UPLOAD_MAX_REQUEST_SIZE', None)
+        self.request_received = 0
+        self.field_received = 0
+        self.field_limit = None
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        # Reject oversized bodies up front when the client declares their length
+        if self.request_limit and content_length and content_length > self.request_limit:
+            raise UploadTooLarge(f'Request body exceeds {_format_size(self.request_limit)}.')
+        return super().handle_raw_input(input_data, META, content_length, boundary, encoding)
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.field_received = 0
+        self.field_limit = field_size_limit(field_name)
+        self.field_digest = hashlib.sha256()
+
+    def _reject(self, message):
+        # The partial file is not handed to the request, so nothing else would close (and remove) it
+        self.file.close()
+        raise UploadTooLarge(message)
+
+    def receive_data_chunk(self, raw_data, start):
+        self.field_received += len(raw_data)
+        self.request_received += len(raw_data)
+        if self.field_limit and self.field_received > self.field_limit:
+            self._reject(f"'{self.field_name}' exceeds {_format_size(self.field_limit)}.")
+        if self.request_limit and self.request_received > self.request_limit:
+            self._reject(f'Uploaded files exceed {_format_size(self.request_limit)}.')
+        self.field_digest.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        uploaded = super().file_complete(file_size)
+        uploaded.sha256 = self.field_digest.hexdigest()
+        return uploaded
+
+
+class StreamingMultiPartParser(MultiPartParser):
+    """MultiPartParser that spools file parts to disk under the configured size limits"""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = parser_context['request']
+        request._request.upload_handlers = [LimitedTemporaryFileUploadHandler(request._request)]
+        return super().parse(stream, media_type, parser_context)
+
+
+def store_uploaded_file(field, upload):
+    """
+    Write an upload to the storage of `field` now; returns the value for the
+    field, carrying the file's metadata.
+    """
+    pending = field.attr_class(None, field, upload.name)
+    pending.file, pending._committed = upload, False
+    metadata = file_metadata(pending)
+    name = field.storage.save(field.generate_filename(None, upload.name), upload)
+    stored = field.attr_class(None, field, name)
+    stored.known_metadata = metadata
+    return stored
+
+
+def store_uploaded_files(model, rows):
+    """
+    Replace the uploads among `rows` (dicts of `model` field values) with
+    files already written to storage, so that writing large files does not
+    hold the transaction that saves the rows open.
+    """
+    fields = file_fields(model)
+    for row in rows:
+        for field in fields:
+            upload = row.get(field.name)
+            if isinstance(upload, UploadedFile):
+                row[field.name] = store_uploaded_file(field, upload)
@@ -14,6 +14,7 @@ urlpatterns = [
     # Project endpoints
     path('projects/', views.ProjectListCreateView.as_view(), name='project-list'),
     path('projects/featured/', views.FeaturedProjectsView.as_view(), name='featured-projects'),
+    path('projects/cache-stats/', views.ProjectCacheStatsView.as_view(), name='project-cache-stats'),
     path('projects/<slug:slug>/', views.ProjectDetailView.as_view(), name='project-detail'),
     path('public/projects/<slug:slug>/', views.PublicProjectDetailView.as_view(), name='public-project-detail'),
     
@@ -41,6 +42,23 @@ urlpatterns = [
     path('projects/<slug:project_slug>/floor-plans/create/', views.ProjectFloorPlanCreateView.as_view(), name='project-floor-plan-create'),
     path('projects/<slug:project_slug>/floor-plans/<int:pk>/', views.ProjectFloorPlanDetailView.as_view(), name='project-floor-plan-detail'),
     
+    # Live availability (server-sent events)
+    path('availability/stream/', views.availability_stream, name='availability-stream'),
+    path('projects/<slug:project_slug>/availability/stream/', views.project_availability_stream, name='project-availability-stream'),
+
+    # Direct-to-storage uploads
+    path('uploads/', views.DirectUploadCreateView.as_view(), name='direct-upload-create'),
+    path('uploads/<uuid:pk>/finalize/', views.DirectUploadFinalizeView.as_view(), name='direct-upload-finalize'),
+    # Local stand-in for the storage endpoint the upload URLs point at
+    path('uploads/target/<str:token>/', views.direct_upload_target, name='direct-upload-target'),
+    # Resumable chunked uploads
+    path('uploads/sessions/', views.UploadSessionCreateView.as_view(), name='upload-session-create'),
+    path('uploads/sessions/<uuid:pk>/', views.UploadSessionView.as_view(), name='upload-session'),
+    path('uploads/sessions/<uuid:pk>/complete/', views.UploadSessionCompleteView.as_view(), name='upload-session-complete'),
+
+    # Delta sync
+    path('sync/changes/', views.SyncChangesView.as_view(), name='sync-changes'),
+
     # Rendering endpoints
     path('renderings/', views.RenderingListCreateView.as_view(), name='rendering-list'),
     path('renderings/<int:pk>/', views.RenderingDetailView.as_view(), name='rendering-detail'),
@@ -55,6 +73,7 @@ urlpatterns = [
     # Lot endpoints
     path('lots/', views.LotListCreateView.as_view(), name='lot-list'),
     path('lots/<int:pk>/', views.LotDetailView.as_view(), name='lot-detail'),
+    path('lots/export.<str:export_format>', views.LotExportView.as_view(), name='lot-export'),
     
     # Project-specific lot endpoints
     path('projects/<slug:project_slug>/lots/<int:id>/', views.LotDetailView.as_view(), name='project-lot-detail'),
@@ -62,10 +81,12 @@ urlpatterns = [
     # Project-specific inquiries
     path('projects/<slug:project_slug>/inquiries/', views.ProjectInquiriesView.as_view(), name='project-inquiries'),
     path('projects/<slug:project_slug>/inquiries/<int:pk>/', views.ProjectInquiryDetailProjectScopedView.as_view(), name='project-inquiry-detail-project'),
+    path('projects/<slug:project_slug>/inquiries/export.<str:export_format>', views.ProjectInquiryExportView.as_view(), name='project-inquiry-export'),
     
     # Floor Plan endpoints
     path('floor-plans/', views.FloorPlanListCreateView.as_view(), name='floor-plan-list'),
     path('floor-plans/<int:pk>/', views.FloorPlanDetailView.as_view(), name='floor-plan-detail'),
+    path('floor-plans/export.<str:export_format>', views.FloorPlanExportView.as_view(), name='floor-plan-export'),
     
     # Document endpoints
     path('documents/', views.DocumentListCreateView.as_view(), name='document-list'),
@@ -78,4 +99,5 @@ urlpatterns = [
     # Project Inquiry endpoints
     path('inquiries/', views.ProjectInquiryListCreateView.as_view(), name='project-inquiry-list'),
     path('inquiries/<int:pk>/', views.ProjectInquiryDetailView.as_view(), name='project-inquiry-detail'),
+    path('inquiries/export.<str:export_format>', views.ProjectInquiryExportView.as_view(), name='project-inquiry-export-all'),
 ]
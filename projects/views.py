@@ -1,24 +1,62 @@
 
 from rest_framework import generics, filters, status
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAdminUser
 from rest_framework.response import Response
+from rest_framework.exceptions import APIException, NotAuthenticated, ValidationError
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
-import json
+from rest_framework.parsers import FormParser, JSONParser
 from .models import (
     State, City, Rendering, SitePlan, Lot, FloorPlan, 
-    Document, Project, Amenity, Contact, FeatureFinish, ProjectInquires
+    Document, Project, Amenity, Contact, FeatureFinish, ProjectInquires, DirectUpload, UploadSession
 )
 from .serializers import (
     StateSerializer, CitySerializer,
     RenderingSerializer, SitePlanSerializer, LotSerializer, FloorPlanSerializer,
     DocumentSerializer, ProjectSerializer, AmenitySerializer, ContactSerializer,
     ProjectListSerializer, RenderingListSerializer, FloorPlanListSerializer,
-    FeatureFinishSerializer, ProjectInquirySerializer
+    FeatureFinishSerializer, ProjectInquirySerializer, DirectUploadSerializer, UploadSessionSerializer,
+    InquirySubmissionSerializer
 )
+from .cache import detail_stats, get_project_detail
+from .conditional import ConditionalGetMixin
+from .direct_uploads import (
+    UploadClosed, expire_uploads, expiry_time, read_token, store_upload, stored_file, target_field
+)
+from .resumable_uploads import (
+    ChunkRejected, append_chunk, discard, expire_sessions, file_digest, get_max_chunk_size,
+    parse_content_range, part_path, received_bytes, receive_chunk, store_session
+)
+from . import inquiry_buffer
+from .exports import FORMATS, export_response
+from .events import ALL_PROJECTS_TOPIC, get_broadcaster, project_topic, stream_events
+from .pagination import KeysetOrPageNumberPagination
+from .payloads import decode_project_payload
+from .search import ProjectSearchFilter
+from .sync import ChangeFeed
+from .uploads import StreamingMultiPartParser, UploadTooLarge
+from asgiref.sync import sync_to_async
+from django.core import signing
+from django.db import transaction
+from django.db.models import F
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.http import quote_etag
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_http_methods
 
 
+def project_id_subquery(slug):
+    """
+    The id of the project with `slug`, as an uncorrelated subquery. Filtering
+    child rows on it instead of joining on project__slug lets the database
+    read a (project, ...) index in order rather than sort.
+    """
+    return Project.objects.filter(slug=slug).values('pk')[:1]
+
 
 # State Views
 class StateListCreateView(generics.ListCreateAPIView):
@@ -47,11 +85,11 @@ class CityDetailView(generics.RetrieveUpdateDestroyAPIView):
     lookup_field = 'slug'
 
 # Project Views
-class ProjectListCreateView(generics.ListCreateAPIView):
+class ProjectListCreateView(ConditionalGetMixin, generics.ListCreateAPIView):
     queryset = Project.objects.filter(is_active=True)
-    parser_classes = (MultiPartParser, FormParser, JSONParser)
-    filter_backends = [filters.SearchFilter, DjangoFilterBackend, filters.OrderingFilter]
-    search_fields = ['name', 'project_type', 'project_address', 'city__name']
+    parser_classes = (StreamingMultiPartParser, FormParser, JSONParser)
+    # ?search= is relevance-ranked full-text search over name, type, address, city, state and description
+    filter_backends = [ProjectSearchFilter, DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = {
         'project_type': ['exact'],
         'status': ['exact'],
@@ -61,13 +99,11 @@ class ProjectListCreateView(generics.ListCreateAPIView):
         'is_featured': ['exact'],
     }
     ordering_fields = ['price_starting_from', 'price_ending_at', 'name', 'id']
+    pagination_class = KeysetOrPageNumberPagination
+    keyset_ordering = ('-updated_at', 'id')
 
     def get_queryset(self):
-        queryset = super().get_queryset()
-        # Add prefetch_related for better performance
-        return queryset.select_related('city').prefetch_related(
-            'renderings', 'lots', 'floor_plans', 'documents', 'contacts', 'features_finishes', 'inquiries'
-        )
+        return super().get_queryset().for_list()
     
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -81,202 +117,33 @@ class ProjectListCreateView(generics.ListCreateAPIView):
 
     def create(self, request, *args, **kwargs):
         try:
-            # Debug: Print received data
-            print("Received data:", request.data)
-            print("Received files:", request.FILES)
-            
-            # Parse form data
-            data = {}
-            
-            # Handle basic fields
-            for key, value in request.data.items():
-                if key.startswith('uploaded_') or key.startswith('existing_'):
-                    continue
-                if key == 'city_id':
-                    data['city_id'] = int(value)
-                else:
-                    data[key] = value
-            
-            # Handle lots (both existing and new)
-            lots_data = []
-            
-            # First, try to get lots as a JSON array (new format)
-            if 'lots' in request.data:
-                try:
-                    lots_data = json.loads(request.data['lots'])
-                    # Handle lot rendering files for each lot
-                    for index, lot_data in enumerate(lots_data):
-                        lot_rendering_key = f'lots[{index}].lot_rendering'
-                        if lot_rendering_key in request.FILES:
-                            lot_data['lot_rendering'] = request.FILES[lot_rendering_key]
-                except json.JSONDecodeError:
-                    lots_data = []
-            
-            # If no lots JSON found, fall back to individual lots[index] fields (legacy format)
-            if not lots_data:
-                for key, value in request.data.items():
-                    if key.startswith('lots[') and key.endswith(']'):
-                        try:
-                            lot_data = json.loads(value)
-                            # Handle lot rendering file
-                            lot_rendering_key = key.replace(']', '.lot_rendering]')
-                            if lot_rendering_key in request.FILES:
-                                lot_data['lot_rendering'] = request.FILES[lot_rendering_key]
-                            lots_data.append(lot_data)
-                        except json.JSONDecodeError:
-                            continue
-            
-            data['lots'] = lots_data
-            
-            # Handle floor plans (both existing and new)
-            floor_plans_data = []
-            
-            # First, try to get floor_plans as a JSON array (new format)
-            if 'floor_plans' in request.data:
-                try:
-                    floor_plans_data = json.loads(request.data['floor_plans'])
-                    # Handle plan files for each floor plan
-                    for index, plan_data in enumerate(floor_plans_data):
-                        plan_file_key = f'floor_plans[{index}].plan_file'
-                        if plan_file_key in request.FILES:
-                            plan_data['plan_file'] = request.FILES[plan_file_key]
-                except json.JSONDecodeError:
-                    floor_plans_data = []
-            
-            # If no floor_plans JSON found, fall back to individual floor_plans[index] fields (legacy format)
-            if not floor_plans_data:
-                for key, value in request.data.items():
-                    if key.startswith('floor_plans[') and key.endswith(']'):
-                        try:
-                            plan_data = json.loads(value)
-                            # Handle plan file
-                            plan_file_key = key.replace(']', '.plan_file]')
-                            if plan_file_key in request.FILES:
-                                plan_data['plan_file'] = request.FILES[plan_file_key]
-                            floor_plans_data.append(plan_data)
-                        except json.JSONDecodeError:
-                            continue
-            
-            data['floor_plans'] = floor_plans_data
-            
-            # Handle contacts - JSON approach for consistency
-            contacts_data = []
-            if 'contacts' in request.data:
-                try:
-                    contacts_data = json.loads(request.data['contacts'])
-                except json.JSONDecodeError:
-                    contacts_data = []
-            data['contacts'] = contacts_data
-            
-            # Handle amenity_ids
-            if 'amenity_ids' in request.data:
-                try:
-                    amenity_ids = json.loads(request.data['amenity_ids'])
-                    data['amenity_ids'] = amenity_ids
-                except json.JSONDecodeError:
-                    data['amenity_ids'] = []
-            
-            # Handle Features & Finishes (JSON array)
-            if 'features_finishes_write' in request.data:
-                try:
-                    data['features_finishes_write'] = json.loads(request.data['features_finishes_write'])
-                except json.JSONDecodeError:
-                    data['features_finishes_write'] = []
-            
-            # Handle uploaded renderings
-            uploaded_renderings = []
-            for key, value in request.FILES.items():
-                if key == 'uploaded_images':
-                    uploaded_renderings.append({'image': value})
-            data['uploaded_renderings'] = uploaded_renderings
-
-            # Handle uploaded features & finishes (images)
-            uploaded_features_finishes = []
-            for key, value in request.FILES.items():
-                if key == 'uploaded_features_finishes':
-                    uploaded_features_finishes.append({'image': value})
-            data['uploaded_features_finishes'] = uploaded_features_finishes
-            
-            # Handle uploaded legal documents
-            uploaded_legal_documents = []
-            legal_doc_titles = {}
-            for key, value in request.data.items():
-                if key.startswith('uploaded_legal_documents_titles['):
-                    index = key.split('[')[1].split(']')[0]
-                    legal_doc_titles[int(index)] = value
-            
-            for key, value in request.FILES.items():
-                if key == 'uploaded_legal_documents':
-                    doc_index = len(uploaded_legal_documents)
-                    uploaded_legal_documents.append({
-                        'document': value,
-                        'title': legal_doc_titles.get(doc_index, ''),
-                        'document_type': 'Document'
-                    })
-            data['uploaded_legal_documents'] = uploaded_legal_documents
-            
-            # Handle uploaded marketing documents
-            uploaded_marketing_documents = []
-            marketing_doc_titles = {}
-            for key, value in request.data.items():
-                if key.startswith('uploaded_marketing_documents_titles['):
-                    index = key.split('[')[1].split(']')[0]
-                    marketing_doc_titles[int(index)] = value
-            
-            for key, value in request.FILES.items():
-                if key == 'uploaded_marketing_documents':
-                    doc_index = len(uploaded_marketing_documents)
-                    uploaded_marketing_documents.append({
-                        'document': value,
-                        'title': marketing_doc_titles.get(doc_index, ''),
-                        'document_type': 'Marketing Material'
-                    })
-            data['uploaded_marketing_documents'] = uploaded_marketing_documents
-            
-            # Handle existing document IDs
-            if 'existing_legal_documents' in request.data:
-                try:
-                    data['existing_legal_documents'] = json.loads(request.data['existing_legal_documents'])
-                except json.JSONDecodeError:
-                    data['existing_legal_documents'] = []
-            
-            if 'existing_marketing_documents' in request.data:
-                try:
-                    data['existing_marketing_documents'] = json.loads(request.data['existing_marketing_documents'])
-                except json.JSONDecodeError:
-                    data['existing_marketing_documents'] = []
-
-            if 'existing_features_finishes' in request.data:
-                try:
-                    data['existing_features_finishes'] = json.loads(request.data['existing_features_finishes'])
-                except json.JSONDecodeError:
-                    data['existing_features_finishes'] = []
-            
-            # Debug: Print final data
-            print("Final data for serializer:", data)
-            
+            data = decode_project_payload(request.data).to_serializer_data()
             serializer = self.get_serializer(data=data)
             serializer.is_valid(raise_exception=True)
             self.perform_create(serializer)
             headers = self.get_success_headers(serializer.data)
             return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
             
+        except UploadTooLarge:
+            raise
         except Exception as e:
             return Response(
                 {'error': str(e)}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-class ProjectDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ProjectDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Project.objects.all()
     serializer_class = ProjectSerializer
-    parser_classes = (MultiPartParser, FormParser, JSONParser)
+    parser_classes = (StreamingMultiPartParser, FormParser, JSONParser)
     lookup_field = 'slug'
+    conditional_slug_kwarg = 'slug'
 
     def get_queryset(self):
-        return super().get_queryset().select_related('city').prefetch_related(
-            'renderings', 'lots', 'floor_plans', 'documents', 'contacts', 'features_finishes', 'inquiries'
-        )
+        queryset = super().get_queryset()
+        if self.request.method == 'GET':
+            return queryset.for_detail()
+        return queryset
     
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -285,225 +152,81 @@ class ProjectDetailView(generics.RetrieveUpdateDestroyAPIView):
 
     def update(self, request, *args, **kwargs):
         try:
-            # Debug: Print received data
-            print("Update - Received data:", request.data)
-            print("Update - Received files:", request.FILES)
-            
-            # Parse form data
-            data = {}
-            
-            # Handle basic fields
-            for key, value in request.data.items():
-                if key.startswith('lots[') or key.startswith('floor_plans[') or key.startswith('existing_'):
-                    continue
-                if key == 'city_id':
-                    data['city_id'] = int(value)
-                else:
-                    data[key] = value
-            
-            # Handle lots (both existing and new) - similar to create method
-            lots_data = []
-            
-            # First, try to get lots as a JSON array (new format)
-            if 'lots' in request.data:
-                try:
-                    lots_data = json.loads(request.data['lots'])
-                    # Handle lot rendering files for each lot
-                    for index, lot_data in enumerate(lots_data):
-                        lot_rendering_key = f'lots[{index}].lot_rendering'
-                        if lot_rendering_key in request.FILES:
-                            lot_data['lot_rendering'] = request.FILES[lot_rendering_key]
-                except json.JSONDecodeError:
-                    lots_data = []
-            
-            # If no lots JSON found, fall back to individual lots[index] fields (legacy format)
-            if not lots_data:
-                for key, value in request.data.items():
-                    if key.startswith('lots[') and key.endswith(']'):
-                        try:
-                            lot_data = json.loads(value)
-                            # Handle lot rendering file
-                            lot_rendering_key = key.replace(']', '.lot_rendering]')
-                            if lot_rendering_key in request.FILES:
-                                lot_data['lot_rendering'] = request.FILES[lot_rendering_key]
-                            lots_data.append(lot_data)
-                        except json.JSONDecodeError:
-                            continue
-            
-            data['lots'] = lots_data
-            
-            # Handle floor plans (both existing and new) - similar to create method
-            floor_plans_data = []
-            
-            # First, try to get floor_plans as a JSON array (new format)
-            if 'floor_plans' in request.data:
-                try:
-                    floor_plans_data = json.loads(request.data['floor_plans'])
-                    # Handle plan files for each floor plan
-                    for index, plan_data in enumerate(floor_plans_data):
-                        plan_file_key = f'floor_plans[{index}].plan_file'
-                        if plan_file_key in request.FILES:
-                            plan_data['plan_file'] = request.FILES[plan_file_key]
-                except json.JSONDecodeError:
-                    floor_plans_data = []
-            
-            # If no floor_plans JSON found, fall back to individual floor_plans[index] fields (legacy format)
-            if not floor_plans_data:
-                for key, value in request.data.items():
-                    if key.startswith('floor_plans[') and key.endswith(']'):
-                        try:
-                            plan_data = json.loads(value)
-                            # Handle plan file
-                            plan_file_key = key.replace(']', '.plan_file]')
-                            if plan_file_key in request.FILES:
-                                plan_data['plan_file'] = request.FILES[plan_file_key]
-                            floor_plans_data.append(plan_data)
-                        except json.JSONDecodeError:
-                            continue
-            
-            data['floor_plans'] = floor_plans_data
-
-            # Explicit deletions (optional)
-            if 'deleted_floor_plan_ids' in request.data:
-                try:
-                    data['deleted_floor_plan_ids'] = json.loads(request.data['deleted_floor_plan_ids'])
-                except json.JSONDecodeError:
-                    data['deleted_floor_plan_ids'] = []
-            if 'deleted_lot_ids' in request.data:
-                try:
-                    data['deleted_lot_ids'] = json.loads(request.data['deleted_lot_ids'])
-                except json.JSONDecodeError:
-                    data['deleted_lot_ids'] = []
-            
-            # Handle contacts
-            contacts_data = []
-            if 'contacts' in request.data:
-                try:
-                    contacts_data = json.loads(request.data['contacts'])
-                except json.JSONDecodeError:
-                    contacts_data = []
-            data['contacts'] = contacts_data
-            
-            # Handle amenity_ids
-            if 'amenity_ids' in request.data:
-                try:
-                    amenity_ids = json.loads(request.data['amenity_ids'])
-                    data['amenity_ids'] = amenity_ids
-                except json.JSONDecodeError:
-                    data['amenity_ids'] = []
-            
-            # Handle Features & Finishes (JSON array)
-            if 'features_finishes_write' in request.data:
-                try:
-                    data['features_finishes_write'] = json.loads(request.data['features_finishes_write'])
-                except json.JSONDecodeError:
-                    data['features_finishes_write'] = []
-            
-            # Handle uploaded renderings
-            uploaded_renderings = []
-            for key, value in request.FILES.items():
-                if key == 'uploaded_images':
-                    uploaded_renderings.append({'image': value})
-            data['uploaded_renderings'] = uploaded_renderings
-
-            # Handle uploaded features & finishes (images)
-            uploaded_features_finishes = []
-            for key, value in request.FILES.items():
-                if key == 'uploaded_features_finishes':
-                    uploaded_features_finishes.append({'image': value})
-            data['uploaded_features_finishes'] = uploaded_features_finishes
-            
-            # Handle uploaded legal documents
-            uploaded_legal_documents = []
-            legal_doc_titles = {}
-            for key, value in request.data.items():
-                if key.startswith('uploaded_legal_documents_titles['):
-                    index = key.split('[')[1].split(']')[0]
-                    legal_doc_titles[int(index)] = value
-            
-            for key, value in request.FILES.items():
-                if key == 'uploaded_legal_documents':
-                    doc_index = len(uploaded_legal_documents)
-                    uploaded_legal_documents.append({
-                        'document': value,
-                        'title': legal_doc_titles.get(doc_index, ''),
-                        'document_type': 'Document'
-                    })
-            data['uploaded_legal_documents'] = uploaded_legal_documents
-            
-            # Handle uploaded marketing documents
-            uploaded_marketing_documents = []
-            marketing_doc_titles = {}
-            for key, value in request.data.items():
-                if key.startswith('uploaded_marketing_documents_titles['):
-                    index = key.split('[')[1].split(']')[0]
-                    marketing_doc_titles[int(index)] = value
-            
-            for key, value in request.FILES.items():
-                if key == 'uploaded_marketing_documents':
-                    doc_index = len(uploaded_marketing_documents)
-                    uploaded_marketing_documents.append({
-                        'document': value,
-                        'title': marketing_doc_titles.get(doc_index, ''),
-                        'document_type': 'Marketing Material'
-                    })
-            data['uploaded_marketing_documents'] = uploaded_marketing_documents
-            
-            # Handle existing files
-            existing_images = request.data.get('existing_images', '[]')
-            existing_legal_documents = request.data.get('existing_legal_documents', '[]')
-            existing_marketing_documents = request.data.get('existing_marketing_documents', '[]')
-            existing_features_finishes = request.data.get('existing_features_finishes', '[]')
-            
-            try:
-                data['existing_images'] = json.loads(existing_images)
-                data['existing_legal_documents'] = json.loads(existing_legal_documents)
-                data['existing_marketing_documents'] = json.loads(existing_marketing_documents)
-                data['existing_features_finishes'] = json.loads(existing_features_finishes)
-            except json.JSONDecodeError:
-                data['existing_images'] = []
-                data['existing_legal_documents'] = []
-                data['existing_marketing_documents'] = []
-                data['existing_features_finishes'] = []
-            
-            # Debug: Print final data
-            print("Update - Final data for serializer:", data)
-            print("Update - Deleted lot IDs:", data.get('deleted_lot_ids', []))
-            print("Update - Deleted floor plan IDs:", data.get('deleted_floor_plan_ids', []))
-            
+            data = decode_project_payload(request.data, for_update=True).to_serializer_data()
             serializer = self.get_serializer(self.get_object(), data=data, partial=True)
             serializer.is_valid(raise_exception=True)
             self.perform_update(serializer)
-            return Response(serializer.data)
+            # Re-read through the optimized detail pipeline for the response
+            instance = Project.objects.for_detail().get(pk=serializer.instance.pk)
+            return Response(self.get_serializer(instance).data)
             
+        except UploadTooLarge:
+            raise
         except Exception as e:
-            print("Update error:", str(e))
             return Response(
                 {'error': str(e)}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-class PublicProjectDetailView(generics.RetrieveAPIView):
+class PublicProjectDetailView(ConditionalGetMixin, generics.RetrieveAPIView):
     queryset = Project.objects.all()
     serializer_class = ProjectSerializer
     permission_classes = [AllowAny]
     lookup_field = 'slug'
+    conditional_slug_kwarg = 'slug'
 
     def get_queryset(self):
-        return super().get_queryset().select_related('city').prefetch_related(
-            'renderings', 'lots', 'floor_plans', 'documents', 'contacts', 'features_finishes', 'inquiries'
-        )
+        return super().get_queryset().for_detail()
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context['request'] = self.request
         return context
 
+    def retrieve(self, request, *args, **kwargs):
+        # File URLs are absolute, so payloads are cached per host
+        cached = get_project_detail(kwargs[self.lookup_field], variant=request.build_absolute_uri('/'))
+        hit = cached.hit
+        if not hit:
+            cached.store(self.get_serializer(self.get_object()).data)
+        response = Response(cached.data)
+        response['X-Cache'] = 'BYPASS' if cached.bypassed else 'HIT' if hit else 'MISS'
+        return response
+
+
+class ProjectCacheStatsView(APIView):
+    """Hit/miss counters of the public project detail cache (all processes)"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({'public_project_detail': detail_stats.as_dict()})
+
+class SyncChangesView(APIView):
+    """
+    Delta sync: projects, lots, floor plans, documents and contacts created,
+    updated or deleted since `?cursor=` (from the previous response) or
+    `?since=` (ISO timestamp). Without either it pages through a full
+    snapshot. `?project=<slug>` limits the feed to one project; keep
+    requesting with the returned cursor while `has_more` is true.
+    """
+
+    def get(self, request):
+        project = None
+        if request.query_params.get('project'):
+            project = get_object_or_404(Project, slug=request.query_params['project'])
+        feed = ChangeFeed(
+            request,
+            cursor=request.query_params.get('cursor'),
+            since=request.query_params.get('since'),
+            project=project,
+        )
+        return Response(feed.collect())
+
 # Rendering Views
 class RenderingListCreateView(generics.ListCreateAPIView):
     queryset = Rendering.objects.all()
     serializer_class = RenderingListSerializer
-    parser_classes = (MultiPartParser, FormParser)
+    parser_classes = (StreamingMultiPartParser, FormParser)
     filter_backends = [filters.SearchFilter, DjangoFilterBackend]
     search_fields = ['title', 'project__name']
     filterset_fields = ['project']
@@ -511,13 +234,13 @@ class RenderingListCreateView(generics.ListCreateAPIView):
 class RenderingDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Rendering.objects.all()
     serializer_class = RenderingSerializer
-    parser_classes = (MultiPartParser, FormParser)
+    parser_classes = (StreamingMultiPartParser, FormParser)
 
 # Features & Finishes Views (mirror Rendering)
 class FeatureFinishListCreateView(generics.ListCreateAPIView):
     queryset = FeatureFinish.objects.all()
     serializer_class = FeatureFinishSerializer
-    parser_classes = (MultiPartParser, FormParser)
+    parser_classes = (StreamingMultiPartParser, FormParser)
     filter_backends = [filters.SearchFilter, DjangoFilterBackend]
     search_fields = ['title', 'project__name']
     filterset_fields = ['project']
@@ -525,37 +248,41 @@ class FeatureFinishListCreateView(generics.ListCreateAPIView):
 class FeatureFinishDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = FeatureFinish.objects.all()
     serializer_class = FeatureFinishSerializer
-    parser_classes = (MultiPartParser, FormParser)
+    parser_classes = (StreamingMultiPartParser, FormParser)
 
 
 # Site Plan Views
 class SitePlanListCreateView(generics.ListCreateAPIView):
     queryset = SitePlan.objects.all()
     serializer_class = SitePlanSerializer
-    parser_classes = (MultiPartParser, FormParser)
+    parser_classes = (StreamingMultiPartParser, FormParser)
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['project']
 
 class SitePlanDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = SitePlan.objects.all()
     serializer_class = SitePlanSerializer
-    parser_classes = (MultiPartParser, FormParser)
+    parser_classes = (StreamingMultiPartParser, FormParser)
 
 # Lot Views
-class LotListCreateView(generics.ListCreateAPIView):
+class LotListCreateView(ConditionalGetMixin, generics.ListCreateAPIView):
     serializer_class = LotSerializer
-    parser_classes = (MultiPartParser, FormParser, JSONParser)
+    parser_classes = (StreamingMultiPartParser, FormParser, JSONParser)
     filter_backends = [filters.SearchFilter, DjangoFilterBackend]
     search_fields = ['lot_number', 'project__name']
     filterset_fields = ['project', 'availability_status']
+    pagination_class = KeysetOrPageNumberPagination
+    keyset_ordering = ('order', 'lot_number', 'id')
     
 
 
     def get_queryset(self):
         project_slug = self.kwargs.get('project_slug')
+        # Page and keyset mode list lots in the same order, that of lot_project_order_idx
+        queryset = Lot.objects.select_related('project').prefetch_related('floor_plans').order_by(*self.keyset_ordering)
         if project_slug:
-            return Lot.objects.filter(project__slug=project_slug).order_by('lot_number')
-        return Lot.objects.all().order_by('lot_number')
+            return queryset.filter(project=project_id_subquery(project_slug))
+        return queryset
 
     def perform_create(self, serializer):
         project_slug = self.kwargs.get('project_slug')
@@ -567,7 +294,7 @@ class LotListCreateView(generics.ListCreateAPIView):
 
 class LotDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = LotSerializer
-    parser_classes = (MultiPartParser, FormParser, JSONParser)
+    parser_classes = (StreamingMultiPartParser, FormParser, JSONParser)
     lookup_field = 'id'
 
     def get_queryset(self):
@@ -583,31 +310,28 @@ class LotDetailView(generics.RetrieveUpdateDestroyAPIView):
             serializer.instance.lot_rendering = lot_rendering
         serializer.save()
 
-    def perform_destroy(self, instance):
-        # Delete the lot rendering file if it exists
-        if instance.lot_rendering:
-            instance.lot_rendering.delete(save=False)
-        instance.delete()
-
 # Floor Plan Views
 class FloorPlanListCreateView(generics.ListCreateAPIView):
     queryset = FloorPlan.objects.all()
     serializer_class = FloorPlanListSerializer
-    parser_classes = (MultiPartParser, FormParser, JSONParser)
+    parser_classes = (StreamingMultiPartParser, FormParser, JSONParser)
     filter_backends = [filters.SearchFilter, DjangoFilterBackend]
     search_fields = ['name', 'project__name']
     filterset_fields = ['project', 'house_type', 'availability_status']
+    pagination_class = KeysetOrPageNumberPagination
+    # FloorPlan.name is nullable, so the keyset uses the primary key
+    keyset_ordering = ('id',)
 
 class FloorPlanDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = FloorPlan.objects.all()
     serializer_class = FloorPlanSerializer
-    parser_classes = (MultiPartParser, FormParser, JSONParser)
+    parser_classes = (StreamingMultiPartParser, FormParser, JSONParser)
 
 # Document Views
 class DocumentListCreateView(generics.ListCreateAPIView):
     queryset = Document.objects.all()
     serializer_class = DocumentSerializer
-    parser_classes = (MultiPartParser, FormParser)
+    parser_classes = (StreamingMultiPartParser, FormParser)
     filter_backends = [filters.SearchFilter, DjangoFilterBackend]
     search_fields = ['title', 'project__name']
     filterset_fields = ['project', 'document_type']
@@ -615,10 +339,10 @@ class DocumentListCreateView(generics.ListCreateAPIView):
 class DocumentDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Document.objects.all()
     serializer_class = DocumentSerializer
-    parser_classes = (MultiPartParser, FormParser)
+    parser_classes = (StreamingMultiPartParser, FormParser)
 
 # Additional API Views for specific functionality
-class ProjectRenderingsView(generics.ListAPIView):
+class ProjectRenderingsView(ConditionalGetMixin, generics.ListAPIView):
     serializer_class = RenderingSerializer
     
     def get_queryset(self):
@@ -627,31 +351,22 @@ class ProjectRenderingsView(generics.ListAPIView):
 
 class ProjectRenderingCreateView(generics.CreateAPIView):
     serializer_class = RenderingSerializer
-    parser_classes = (MultiPartParser, FormParser, JSONParser)
-    
-    def create(self, request, *args, **kwargs):
-        print("ProjectRenderingCreateView - Received data:", request.data)
-        print("ProjectRenderingCreateView - Received files:", request.FILES)
-        print("ProjectRenderingCreateView - Content type:", request.content_type)
-        print("ProjectRenderingCreateView - Project slug:", self.kwargs.get('project_slug'))
-        return super().create(request, *args, **kwargs)
+    parser_classes = (StreamingMultiPartParser, FormParser, JSONParser)
     
     def perform_create(self, serializer):
         project_slug = self.kwargs.get('project_slug')
         project = get_object_or_404(Project, slug=project_slug)
-        print("ProjectRenderingCreateView - Saving rendering for project:", project.name)
         serializer.save(project=project)
-        print("ProjectRenderingCreateView - Rendering saved successfully")
 
 class ProjectRenderingDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = RenderingSerializer
-    parser_classes = (MultiPartParser, FormParser, JSONParser)
+    parser_classes = (StreamingMultiPartParser, FormParser, JSONParser)
     
     def get_queryset(self):
         project_slug = self.kwargs.get('project_slug')
         return Rendering.objects.filter(project__slug=project_slug)
 
-class ProjectFeatureFinishesView(generics.ListAPIView):
+class ProjectFeatureFinishesView(ConditionalGetMixin, generics.ListAPIView):
     serializer_class = FeatureFinishSerializer
     
     def get_queryset(self):
@@ -660,7 +375,7 @@ class ProjectFeatureFinishesView(generics.ListAPIView):
 
 class ProjectFeatureFinishCreateView(generics.CreateAPIView):
     serializer_class = FeatureFinishSerializer
-    parser_classes = (MultiPartParser, FormParser, JSONParser)
+    parser_classes = (StreamingMultiPartParser, FormParser, JSONParser)
     
     def perform_create(self, serializer):
         project_slug = self.kwargs.get('project_slug')
@@ -669,13 +384,13 @@ class ProjectFeatureFinishCreateView(generics.CreateAPIView):
 
 class ProjectFeatureFinishDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = FeatureFinishSerializer
-    parser_classes = (MultiPartParser, FormParser, JSONParser)
+    parser_classes = (StreamingMultiPartParser, FormParser, JSONParser)
     
     def get_queryset(self):
         project_slug = self.kwargs.get('project_slug')
         return FeatureFinish.objects.filter(project__slug=project_slug)
 
-class ProjectFloorPlansView(generics.ListAPIView):
+class ProjectFloorPlansView(ConditionalGetMixin, generics.ListAPIView):
     serializer_class = FloorPlanSerializer
     
     def get_queryset(self):
@@ -684,15 +399,7 @@ class ProjectFloorPlansView(generics.ListAPIView):
 
 class ProjectFloorPlanCreateView(generics.CreateAPIView):
     serializer_class = FloorPlanSerializer
-    parser_classes = (MultiPartParser, FormParser, JSONParser)
-    
-    def create(self, request, *args, **kwargs):
-        print("ProjectFloorPlanCreateView - Received data:", request.data)
-        print("ProjectFloorPlanCreateView - Received files:", request.FILES)
-        print("ProjectFloorPlanCreateView - Content type:", request.content_type)
-        print("ProjectFloorPlanCreateView - Project field value:", request.data.get('project'))
-        print("ProjectFloorPlanCreateView - Project field type:", type(request.data.get('project')))
-        return super().create(request, *args, **kwargs)
+    parser_classes = (StreamingMultiPartParser, FormParser, JSONParser)
     
     def perform_create(self, serializer):
         project_slug = self.kwargs.get('project_slug')
@@ -701,29 +408,23 @@ class ProjectFloorPlanCreateView(generics.CreateAPIView):
 
 class ProjectFloorPlanDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = FloorPlanSerializer
-    parser_classes = (MultiPartParser, FormParser, JSONParser)
-    
-    def update(self, request, *args, **kwargs):
-        print("ProjectFloorPlanDetailView - Received data:", request.data)
-        print("ProjectFloorPlanDetailView - Received files:", request.FILES)
-        print("ProjectFloorPlanDetailView - Content type:", request.content_type)
-        return super().update(request, *args, **kwargs)
+    parser_classes = (StreamingMultiPartParser, FormParser, JSONParser)
     
     def get_queryset(self):
         project_slug = self.kwargs.get('project_slug')
         return FloorPlan.objects.filter(project__slug=project_slug)
 
 # Project-specific lot views
-class ProjectLotsView(generics.ListAPIView):
+class ProjectLotsView(ConditionalGetMixin, generics.ListAPIView):
     serializer_class = LotSerializer
     
     def get_queryset(self):
         project_slug = self.kwargs.get('project_slug')
-        return Lot.objects.filter(project__slug=project_slug).order_by('lot_number')
+        return Lot.objects.filter(project=project_id_subquery(project_slug)).order_by('order', 'lot_number', 'id')
 
 
 
-class ProjectDocumentsView(generics.ListAPIView):
+class ProjectDocumentsView(ConditionalGetMixin, generics.ListAPIView):
     serializer_class = DocumentSerializer
     
     def get_queryset(self):
@@ -731,9 +432,9 @@ class ProjectDocumentsView(generics.ListAPIView):
         return Document.objects.filter(project__slug=project_slug)
 
 # New separate tab views
-class ProjectContactsView(generics.ListCreateAPIView):
+class ProjectContactsView(ConditionalGetMixin, generics.ListCreateAPIView):
     serializer_class = ContactSerializer
-    parser_classes = (MultiPartParser, FormParser, JSONParser)
+    parser_classes = (StreamingMultiPartParser, FormParser, JSONParser)
     
     def get_queryset(self):
         project_slug = self.kwargs.get('project_slug')
@@ -743,13 +444,11 @@ class ProjectContactsView(generics.ListCreateAPIView):
     def perform_create(self, serializer):
         project_slug = self.kwargs.get('project_slug')
         project = get_object_or_404(Project, slug=project_slug)
-        print(f"Creating contact for project: {project.name} (slug: {project_slug})")
-        print(f"Contact data: {serializer.validated_data}")
         serializer.save(project=project)
 
-class ProjectMarketingDocumentsView(generics.ListCreateAPIView):
+class ProjectMarketingDocumentsView(ConditionalGetMixin, generics.ListCreateAPIView):
     serializer_class = DocumentSerializer
-    parser_classes = (MultiPartParser, FormParser, JSONParser)
+    parser_classes = (StreamingMultiPartParser, FormParser, JSONParser)
     
     def get_queryset(self):
         project_slug = self.kwargs.get('project_slug')
@@ -763,9 +462,9 @@ class ProjectMarketingDocumentsView(generics.ListCreateAPIView):
         project = get_object_or_404(Project, slug=project_slug)
         serializer.save(project=project, document_type='Marketing Material')
 
-class ProjectLegalDocumentsView(generics.ListCreateAPIView):
+class ProjectLegalDocumentsView(ConditionalGetMixin, generics.ListCreateAPIView):
     serializer_class = DocumentSerializer
-    parser_classes = (MultiPartParser, FormParser, JSONParser)
+    parser_classes = (StreamingMultiPartParser, FormParser, JSONParser)
     
     def get_queryset(self):
         project_slug = self.kwargs.get('project_slug')
@@ -782,7 +481,7 @@ class ProjectLegalDocumentsView(generics.ListCreateAPIView):
 # Detail views for individual items
 class ContactDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = ContactSerializer
-    parser_classes = (MultiPartParser, FormParser, JSONParser)
+    parser_classes = (StreamingMultiPartParser, FormParser, JSONParser)
     
     def get_queryset(self):
         project_slug = self.kwargs.get('project_slug')
@@ -790,7 +489,7 @@ class ContactDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 class MarketingDocumentDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = DocumentSerializer
-    parser_classes = (MultiPartParser, FormParser, JSONParser)
+    parser_classes = (StreamingMultiPartParser, FormParser, JSONParser)
     
     def get_queryset(self):
         project_slug = self.kwargs.get('project_slug')
@@ -801,7 +500,7 @@ class MarketingDocumentDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 class LegalDocumentDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = DocumentSerializer
-    parser_classes = (MultiPartParser, FormParser, JSONParser)
+    parser_classes = (StreamingMultiPartParser, FormParser, JSONParser)
     
     def get_queryset(self):
         project_slug = self.kwargs.get('project_slug')
@@ -811,17 +510,15 @@ class LegalDocumentDetailView(generics.RetrieveUpdateDestroyAPIView):
         )
 
 # Featured Projects View
-class FeaturedProjectsView(generics.ListAPIView):
+class FeaturedProjectsView(ConditionalGetMixin, generics.ListAPIView):
     serializer_class = ProjectListSerializer
     queryset = Project.objects.filter(is_featured=True, is_active=True)
     
     def get_queryset(self):
-        return super().get_queryset().select_related('city').prefetch_related(
-            'renderings', 'lots', 'floor_plans', 'contacts', 'inquiries'
-        )
+        return super().get_queryset().for_list()
 
 # City Projects View
-class CityProjectsView(generics.ListAPIView):
+class CityProjectsView(ConditionalGetMixin, generics.ListAPIView):
     serializer_class = ProjectListSerializer
     
     def get_queryset(self):
@@ -829,9 +526,7 @@ class CityProjectsView(generics.ListAPIView):
         return Project.objects.filter(
             city__slug=city_slug, 
             is_active=True
-        ).select_related('city').prefetch_related(
-            'renderings', 'lots', 'floor_plans', 'contacts', 'inquiries'
-        )
+        ).for_list()
 
 # Amenity Views
 class AmenityListCreateView(generics.ListCreateAPIView):
@@ -849,9 +544,36 @@ class AmenityDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 
 # Project Inquiry Views
-class ProjectInquiryListCreateView(generics.ListCreateAPIView):
+class BufferedInquiryCreateMixin:
+    """
+    Accept inquiries into projects.inquiry_buffer (202) instead of inserting
+    them during the request, when INQUIRY_BUFFER_ENABLED. The response echoes
+    the submission without the id and created_at of the 201 response, since
+    the row does not exist yet; repeats within the dedup window are accepted
+    but stored once.
+    """
+
+    def submission_project_id(self, data):
+        project_id = data.get('project')
+        if project_id is not None and inquiry_buffer.resolve_project_id(pk=project_id) is None:
+            raise ValidationError({'project': [f'Invalid pk "{project_id}" - object does not exist.']})
+        return project_id
+
+    def create(self, request, *args, **kwargs):
+        if not inquiry_buffer.buffer_enabled():
+            return super().create(request, *args, **kwargs)
+        serializer = InquirySubmissionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = dict(serializer.validated_data, project=self.submission_project_id(serializer.validated_data))
+        inquiry_buffer.append(data)
+        return Response(InquirySubmissionSerializer(data).data, status=status.HTTP_202_ACCEPTED)
+
+
+class ProjectInquiryListCreateView(BufferedInquiryCreateMixin, generics.ListCreateAPIView):
     queryset = ProjectInquires.objects.all()
     serializer_class = ProjectInquirySerializer
+    pagination_class = KeysetOrPageNumberPagination
+    keyset_ordering = ('-created_at', 'id')
 
 class ProjectInquiryDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = ProjectInquires.objects.all()
@@ -859,13 +581,21 @@ class ProjectInquiryDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 
 # Project-scoped Inquiry Views
-class ProjectInquiriesView(generics.ListCreateAPIView):
+class ProjectInquiriesView(BufferedInquiryCreateMixin, generics.ListCreateAPIView):
     serializer_class = ProjectInquirySerializer
+    pagination_class = KeysetOrPageNumberPagination
+    keyset_ordering = ('-created_at', 'id')
 
     def get_queryset(self):
         project_slug = self.kwargs.get('project_slug')
         return ProjectInquires.objects.filter(project__slug=project_slug).order_by('-created_at')
 
+    def submission_project_id(self, data):
+        project_id = inquiry_buffer.resolve_project_id(slug=self.kwargs.get('project_slug'))
+        if project_id is None:
+            raise Http404('No Project matches the given query.')
+        return project_id
+
     def perform_create(self, serializer):
         project_slug = self.kwargs.get('project_slug')
         project = get_object_or_404(Project, slug=project_slug)
@@ -878,3 +608,338 @@ class ProjectInquiryDetailProjectScopedView(generics.RetrieveUpdateDestroyAPIVie
     def get_queryset(self):
         project_slug = self.kwargs.get('project_slug')
         return ProjectInquires.objects.filter(project__slug=project_slug)
+
+
+# Streaming exports (projects.exports): ?<filters> as on the list endpoints
+class ExportView(generics.GenericAPIView):
+    """Streams the filtered `export_columns` of the queryset as CSV or NDJSON"""
+    export_columns = ()
+    export_name = None
+
+    def perform_content_negotiation(self, request, force=False):
+        # The export format comes from the URL; the response is not rendered by DRF
+        return super().perform_content_negotiation(request, force=True)
+
+    def get_queryset(self):
+        queryset = super().get_queryset().annotate(project_slug=F('project__slug')).order_by('pk')
+        project_slug = self.kwargs.get('project_slug')
+        if project_slug:
+            queryset = queryset.filter(project__slug=project_slug)
+        return queryset
+
+    def get(self, request, *args, **kwargs):
+        export_format = kwargs['export_format']
+        if export_format not in FORMATS:
+            raise Http404(f'Unknown export format {export_format!r}.')
+        queryset = self.filter_queryset(self.get_queryset())
+        return export_response(request, queryset, self.export_columns, export_format, self.export_name)
+
+
+class LotExportView(ExportView):
+    queryset = Lot.objects.all()
+    filter_backends = [filters.SearchFilter, DjangoFilterBackend]
+    search_fields = LotListCreateView.search_fields
+    filterset_fields = LotListCreateView.filterset_fields
+    export_name = 'lots'
+    export_columns = (
+        'id', 'project_id', 'project_slug', 'lot_number', 'lot_numbers', 'availability_status', 'lot_size',
+        'price', 'est_completion', 'description', 'order', 'created_at', 'updated_at',
+    )
+
+
+class FloorPlanExportView(ExportView):
+    queryset = FloorPlan.objects.all()
+    filter_backends = [filters.SearchFilter, DjangoFilterBackend]
+    search_fields = FloorPlanListCreateView.search_fields
+    filterset_fields = FloorPlanListCreateView.filterset_fields
+    export_name = 'floor-plans'
+    export_columns = (
+        'id', 'project_id', 'project_slug', 'name', 'house_type', 'square_footage', 'bedrooms', 'bathrooms',
+        'garage_spaces', 'availability_status', 'created_at', 'updated_at',
+    )
+
+
+class ProjectInquiryExportView(ExportView):
+    queryset = ProjectInquires.objects.all()
+    filter_backends = [filters.SearchFilter, DjangoFilterBackend]
+    search_fields = ['name', 'email', 'phone']
+    filterset_fields = {
+        'project': ['exact'],
+        'created_at': ['gte', 'lte'],
+    }
+    export_name = 'inquiries'
+    export_columns = ('id', 'project_id', 'project_slug', 'name', 'email', 'phone', 'message', 'created_at')
+
+
+# Live availability streams (server-sent events, served through ASGI)
+def _authenticate_stream(request):
+    """
+    Authenticate a plain (async) view the way API views are (JWT or session);
+    returns the 401/403 response to send, or None.
+    """
+    authenticators = [auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+    drf_request = Request(request, authenticators=authenticators)
+    try:
+        if drf_request.user.is_authenticated:
+            return None
+        error = NotAuthenticated()
+    except APIException as exc:
+        error = exc
+    response = JsonResponse({'detail': error.detail}, status=error.status_code)
+    # As APIView answers: 401 with the first authenticator's challenge, else 403
+    challenge = authenticators[0].authenticate_header(drf_request) if authenticators else None
+    if challenge:
+        response['WWW-Authenticate'] = challenge
+    else:
+        response.status_code = status.HTTP_403_FORBIDDEN
+    return response
+
+
+def _event_stream_response(topics):
+    broadcaster = get_broadcaster()
+    if not broadcaster.has_capacity():
+        return HttpResponse('Too many live subscribers, retry later.', status=503, headers={'Retry-After': '30'})
+    response = StreamingHttpResponse(stream_events(broadcaster, topics), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Disable proxy buffering (nginx) so events are flushed immediately
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@require_GET
+async def availability_stream(request):
+    """Lot and floor plan availability changes across all projects"""
+    denied = await sync_to_async(_authenticate_stream)(request)
+    if denied is not None:
+        return denied
+    return _event_stream_response([ALL_PROJECTS_TOPIC])
+
+
+@require_GET
+async def project_availability_stream(request, project_slug):
+    """Lot and floor plan availability changes of one project"""
+    denied = await sync_to_async(_authenticate_stream)(request)
+    if denied is not None:
+        return denied
+    project_id = await Project.objects.filter(slug=project_slug).values_list('pk', flat=True).afirst()
+    if project_id is None:
+        raise Http404('No Project matches the given query.')
+    return _event_stream_response([project_topic(project_id)])
+
+
+# Direct-to-storage uploads (projects.direct_uploads)
+class DirectUploadCreateView(generics.CreateAPIView):
+    serializer_class = DirectUploadSerializer
+
+    def perform_create(self, serializer):
+        expire_uploads(DirectUpload)
+        serializer.save(created_by=self.request.user, expires_at=expiry_time())
+
+
+class UploadAttachMixin:
+    """
+    Attach an uploaded file to its row: with `object_id` the file of that row
+    is replaced, otherwise a row is created in `project` (slug); a project's
+    site plan is replaced if it has one. Other fields are validated by the
+    row's serializer.
+    """
+    target_serializers = {
+        'rendering': RenderingSerializer,
+        'document': DocumentSerializer,
+        'floor_plan': FloorPlanSerializer,
+        'site_plan': SitePlanSerializer,
+    }
+
+    def attach(self, request, target, store):
+        """Validate the row, then call `store()` for the file field's value and save it"""
+        return self.prepare_attach(request, target)(store())
+
+    def prepare_attach(self, request, target):
+        """Validate the row; returns a function saving it with the file field's value"""
+        field = target_field(target)
+        serializer_class = self.target_serializers[target]
+        context = {'request': request}
+        data = {key: value for key, value in request.data.items() if key not in ('project', 'object_id', field.name)}
+        save_kwargs = {}
+        object_id = request.data.get('object_id')
+        if object_id:
+            try:
+                object_id = int(object_id)
+            except (TypeError, ValueError):
+                raise ValidationError({'object_id': ['A valid integer is required.']})
+            instance = get_object_or_404(field.model, pk=object_id)
+        else:
+            if not request.data.get('project'):
+                raise ValidationError({'project': ['This field is required.']})
+            save_kwargs['project'] = get_object_or_404(Project, slug=request.data['project'])
+            instance = None
+            if field.model is SitePlan:
+                instance = SitePlan.objects.filter(project=save_kwargs['project']).first()
+        serializer = serializer_class(instance, data=data, partial=True, context=context)
+        serializer.is_valid(raise_exception=True)
+
+        def save(file):
+            serializer.save(**save_kwargs, **{field.name: file})
+            return Response(serializer.data, status=status.HTTP_200_OK if instance else status.HTTP_201_CREATED)
+        return save
+
+
+class DirectUploadFinalizeView(UploadAttachMixin, APIView):
+    """Attach a stored direct upload to its row (one time only)"""
+
+    def post(self, request, pk):
+        with transaction.atomic():
+            upload = get_object_or_404(DirectUpload.objects.select_for_update(), pk=pk, created_by=request.user)
+            if upload.is_expired:
+                return Response({'detail': 'This upload has expired.'}, status=status.HTTP_410_GONE)
+            if not upload.stored_name:
+                return Response({'detail': 'The file has not been uploaded yet.'}, status=status.HTTP_409_CONFLICT)
+            response = self.attach(request, upload.target, lambda: stored_file(upload))
+            upload.delete()
+        return response
+
+
+@csrf_exempt
+@require_http_methods(['PUT'])
+def direct_upload_target(request, token):
+    """
+    Local stand-in for the storage endpoint of direct uploads: stores the
+    raw request body for the upload the signed token was issued to. The
+    token is the only credential, as with a presigned storage URL.
+    """
+    try:
+        upload_id = read_token(token)
+    except signing.BadSignature:
+        return HttpResponse('Invalid or expired upload URL.', status=403, content_type='text/plain')
+    upload = DirectUpload.objects.filter(pk=upload_id).first()
+    if upload is None:
+        # Finalized (or purged) uploads take no more files
+        raise Http404('No upload matches the given URL.')
+    if upload.is_expired:
+        return HttpResponse('This upload has expired.', status=410, content_type='text/plain')
+    try:
+        content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        content_length = 0
+    try:
+        if content_length > upload.size:
+            raise UploadTooLarge(f'Upload exceeds the declared {upload.size} bytes.')
+        store_upload(upload, request)
+    except UploadTooLarge as exc:
+        return HttpResponse(str(exc.detail), status=413, content_type='text/plain')
+    except UploadClosed as exc:
+        return HttpResponse(str(exc), status=410, content_type='text/plain')
+    response = HttpResponse(status=200)
+    response['ETag'] = quote_etag(upload.metadata['sha256'])
+    return response
+
+
+# Resumable chunked uploads (projects.resumable_uploads)
+class UploadSessionCreateView(generics.CreateAPIView):
+    serializer_class = UploadSessionSerializer
+
+    def perform_create(self, serializer):
+        expire_sessions(UploadSession)
+        serializer.save(created_by=self.request.user)
+
+
+class UploadSessionView(APIView):
+    """
+    GET: the session and its offset, to resume from. PUT: the next chunk,
+    with Content-Range ``bytes <start>-<end>/<size>``; a chunk that does not
+    start at the offset is rejected with 409 and the offset. DELETE: abort.
+    """
+
+    def get_session(self, request, pk):
+        return get_object_or_404(UploadSession, pk=pk, created_by=request.user)
+
+    def get(self, request, pk):
+        return Response(UploadSessionSerializer(self.get_session(request, pk)).data)
+
+    def put(self, request, pk):
+        session = self.get_session(request, pk)
+        if session.status == UploadSession.COMPLETING:
+            return Response({'detail': 'The upload is being completed.'}, status=status.HTTP_409_CONFLICT)
+        byte_range = parse_content_range(request.headers.get('Content-Range'), session.size)
+        if byte_range is None:
+            return Response(
+                {'detail': f'Content-Range must be "bytes <start>-<end>/{session.size}".'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        start, length = byte_range
+        if length > get_max_chunk_size():
+            raise UploadTooLarge(f'Chunks may not exceed {get_max_chunk_size()} bytes.')
+        offset = received_bytes(session)
+        if start != offset:
+            # Checked before reading the body, so a misplaced chunk is not transferred
+            return Response({'detail': f'Expected a chunk starting at byte {offset}.', 'offset': offset}, status=status.HTTP_409_CONFLICT)
+
+        # Received and appended outside any transaction; append_chunk checks the offset again under a file lock
+        chunk = receive_chunk(request.stream, length)
+        if chunk is None:
+            return Response(
+                {'detail': 'The request body does not match Content-Range.', 'offset': offset},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            append_chunk(session, chunk, start, length)
+        except ChunkRejected as exc:
+            return Response({'detail': str(exc), 'offset': exc.offset}, status=status.HTTP_409_CONFLICT)
+        finally:
+            chunk.close()
+        session.updated_at = timezone.now()
+        if not UploadSession.objects.filter(pk=session.pk).update(updated_at=session.updated_at):
+            # Aborted meanwhile
+            discard(session)
+            raise Http404('No UploadSession matches the given query.')
+        return Response(UploadSessionSerializer(session).data)
+
+    def delete(self, request, pk):
+        session = self.get_session(request, pk)
+        if session.status == UploadSession.COMPLETING:
+            return Response({'detail': 'The upload is being completed.'}, status=status.HTTP_409_CONFLICT)
+        discard(session)
+        session.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class UploadSessionCompleteView(UploadAttachMixin, APIView):
+    """
+    Verify the checksum of a fully received session and attach the file to its
+    row. The session is claimed in a short transaction; hashing and storing the
+    file happen outside of any.
+    """
+
+    def post(self, request, pk):
+        with transaction.atomic():
+            session = get_object_or_404(UploadSession.objects.select_for_update(), pk=pk, created_by=request.user)
+            if session.status == UploadSession.COMPLETING:
+                return Response({'detail': 'The upload is already being completed.'}, status=status.HTTP_409_CONFLICT)
+            offset = received_bytes(session)
+            if offset != session.size:
+                return Response(
+                    {'detail': f'Received {offset} of {session.size} bytes.', 'offset': offset},
+                    status=status.HTTP_409_CONFLICT
+                )
+            # Validated before the file is stored, so an invalid row leaves the session resumable
+            save = self.prepare_attach(request, session.target)
+            session.status = UploadSession.COMPLETING
+            session.save(update_fields=['status', 'updated_at'])
+
+        try:
+            if file_digest(part_path(session)) != session.sha256:
+                discard(session)
+                session.delete()
+                return Response(
+                    {'detail': 'The assembled file does not match its SHA-256; upload it again.'},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY
+                )
+            file = store_session(session)
+        except BaseException:
+            UploadSession.objects.filter(pk=session.pk).update(status=UploadSession.RECEIVING)
+            raise
+
+        with transaction.atomic():
+            response = save(file)
+            session.delete()
+        return response